@@ -0,0 +1,30 @@
+"""Last reviewed commit per review
+
+Adds the head SHA and per-file blob SHAs of the last reviewed commit, so
+later pushes only re-review the files that changed.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_reviewed_sha', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('file_shas', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_column('file_shas')
+        batch_op.drop_column('last_reviewed_sha')
@@ -0,0 +1,34 @@
+"""Finding dedup keys on review comments
+
+Adds the fingerprint and context hash findings are deduplicated by, and
+the other locations a collapsed finding was raised at.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('review_comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('context_hash', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('locations', sa.JSON(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_review_comments_fingerprint'), ['fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('review_comments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_comments_fingerprint'))
+        batch_op.drop_column('locations')
+        batch_op.drop_column('context_hash')
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,48 @@
+"""Finding history
+
+Adds the finding_history table used to skip repeated findings.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('finding_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('repository_id', sa.Integer(), nullable=True),
+    sa.Column('fingerprint', sa.String(), nullable=False),
+    sa.Column('context_hash', sa.String(), nullable=False),
+    sa.Column('state', sa.Enum('POSTED', 'RESOLVED', 'IGNORED', name='findingstate'), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('review_id', sa.Integer(), nullable=True),
+    sa.Column('occurrences', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['repository_id'], ['repositories.id'], ),
+    sa.ForeignKeyConstraint(['review_id'], ['reviews.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('repository_id', 'fingerprint', 'context_hash', name='uq_finding_history_key')
+    )
+    with op.batch_alter_table('finding_history', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_finding_history_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_finding_history_repository_id'), ['repository_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('finding_history', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_finding_history_repository_id'))
+        batch_op.drop_index(batch_op.f('ix_finding_history_id'))
+
+    op.drop_table('finding_history')
+    sa.Enum(name='findingstate').drop(op.get_bind(), checkfirst=True)
@@ -4,6 +4,7 @@ from .security import SecurityAgent
 from .performance import PerformanceAgent
 from .style import StyleAgent
 from .orchestrator import ReviewOrchestrator
+from .scheduler import ReviewScheduler
 
 __all__ = [
     "BaseAgent",
@@ -11,5 +12,6 @@ __all__ = [
     "SecurityAgent",
     "PerformanceAgent",
     "StyleAgent",
-    "ReviewOrchestrator"
+    "ReviewOrchestrator",
+    "ReviewScheduler"
 ]
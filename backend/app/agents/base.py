@@ -1,23 +1,45 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
-import time
 import asyncio
-from app.services.gemini import GeminiService
+import re
+import time
+from app.core.config import settings
+from app.core.metrics import span
+from app.agents.findings import JSON_OUTPUT_INSTRUCTIONS, parse_json_findings, parse_text_findings
+from app.services.gemini import get_gemini_service
+from app.services.llm_cache import LLMResponseCache, get_llm_cache
+
+# Marks the start of a file's section in multi-file prompts and responses
+FILE_MARKER = "### File:"
+_FILE_HEADER = re.compile(r"^[\s>*#-]*(?:File|FILE|file)\s*:\s*[`*]*(?P<path>[^\s`*]+)[`*]*\s*$")
+
+def _normalize_path(path: str) -> str:
+    """Drop a leading "./" the model may add; dotfiles like .github/ keep their dot"""
+    return path[2:] if path.startswith('./') else path
+
+class ReviewDeadlineExceeded(Exception):
+    """Raised when an agent call would run past the review's deadline"""
+    pass
 
 class AgentResult(BaseModel):
     agent_name: str
-    status: str  # success, warning, error
+    status: str  # success, warning, error, timed_out
     findings: List[Dict[str, Any]]
     confidence_score: int  # 0-100
     execution_time: int  # milliseconds
     error_message: Optional[str] = None
+    file_path: Optional[str] = None
 
 class BaseAgent(ABC):
+    # Bump whenever the prompts change so cached responses are not reused
+    prompt_version = "2"
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
+        self.response_cache = get_llm_cache()
     
     @abstractmethod
     async def analyze(self, code_diff: str, context: Dict[str, Any]) -> AgentResult:
@@ -31,14 +53,17 @@ class BaseAgent(ABC):
     
     async def _generate_review(self, code_diff: str, context: Dict[str, Any]) -> str:
         """Generate review using Gemini"""
-        system_prompt = self.get_system_prompt()
+        chunk_note = ""
+        if context.get('chunk_lines'):
+            # Oversized patches are reviewed in parts; say which part this is
+            chunk_note = f"Part {context['chunk_index'] + 1} of a larger diff, covering lines {context['chunk_lines']}\n"
         
         user_prompt = f"""
         Analyze the following code changes:
         
         File: {context.get('file_path', 'Unknown')}
         Language: {context.get('language', 'Unknown')}
-        
+        {chunk_note}
         Code Diff:
         {code_diff}
         
@@ -49,50 +74,169 @@ class BaseAgent(ABC):
         
         Please provide a detailed analysis focusing on {self.description.lower()}.
         """
+        if settings.review_json_output:
+            user_prompt += JSON_OUTPUT_INSTRUCTIONS
         
-        return await self.gemini_service.generate_review(system_prompt, user_prompt)
+        return await self._complete(user_prompt, context)
     
-    def _parse_findings(self, review_text: str) -> List[Dict[str, Any]]:
-        """Parse the review text into structured findings"""
-        # This is a simplified parser - in production, you'd want more sophisticated parsing
-        findings = []
+    async def _generate_batch_review(self, files: List[Dict[str, Any]], context: Dict[str, Any]) -> str:
+        """Generate a single review covering several small files"""
+        sections = "\n".join(
+            f"""
+        {FILE_MARKER} {file_data['file_path']}
+        Language: {file_data.get('language', 'Unknown')}
+        
+        Code Diff:
+        {file_data['patch']}
+        """
+            for file_data in files
+        )
+        
+        user_prompt = f"""
+        Analyze the following code changes in {len(files)} files:
+        {sections}
+        Context:
+        - Repository: {context.get('repository', 'Unknown')}
+        - PR Title: {context.get('pr_title', 'Unknown')}
+        - PR Description: {context.get('pr_description', 'None')}
+        
+        Please provide a detailed analysis focusing on {self.description.lower()}.
+        """
+        if settings.review_json_output:
+            user_prompt += JSON_OUTPUT_INSTRUCTIONS + """Set "file" to the exact path given above.
+        """
+        else:
+            user_prompt += f"""Group your findings by file. Start each file's section with a line
+        "{FILE_MARKER} <path>" using the exact path given above, and leave out
+        files without findings.
+        """
+        
+        return await self._complete(user_prompt, context)
+    
+    async def _complete(self, user_prompt: str, context: Dict[str, Any]) -> str:
+        """Send a prompt to Gemini, going through the response cache"""
+        system_prompt = self.get_system_prompt()
+        
+        use_cache = settings.llm_cache_enabled and not context.get('bypass_cache')
+        if not use_cache:
+            return await self._call_model(system_prompt, user_prompt, context)
         
-        # Split by lines and look for issues
-        lines = review_text.split('\n')
-        current_finding = None
+        cache_key = LLMResponseCache.make_key(
+            self.name,
+            self.prompt_version,
+            self.gemini_service.model_name,
+            f"{system_prompt}\n\n{user_prompt}"
+        )
+        cached = await self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        review_text = await self._call_model(system_prompt, user_prompt, context)
+        await self.response_cache.set(cache_key, review_text)
+        
+        return review_text
+    
+    async def _call_model(self, system_prompt: str, user_prompt: str, context: Dict[str, Any]) -> str:
+        """Call Gemini, giving up when the review's deadline passes"""
+        deadline = context.get('deadline')
+        if deadline is None:
+            with span("gemini", self.name):
+                return await self.gemini_service.generate_review(system_prompt, user_prompt)
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ReviewDeadlineExceeded("Review deadline exceeded")
+        try:
+            with span("gemini", self.name):
+                return await asyncio.wait_for(
+                    self.gemini_service.generate_review(system_prompt, user_prompt),
+                    remaining
+                )
+        except asyncio.TimeoutError:
+            raise ReviewDeadlineExceeded("Review deadline exceeded")
+    
+    async def analyze_batch(self, files: List[Dict[str, Any]], context: Dict[str, Any]) -> List[AgentResult]:
+        """Analyze several small files with one prompt and split the findings per file"""
+        start_time = time.time()
         
-        for line in lines:
-            line = line.strip()
-            if not line:
+        try:
+            review_text = await self._generate_batch_review(files, context)
+            findings_by_file = self._parse_batch_findings(review_text, [file_data['file_path'] for file_data in files])
+            execution_time = int((time.time() - start_time) * 1000)
+            
+            results = []
+            for file_data in files:
+                findings = findings_by_file.get(file_data['file_path'], [])
+                results.append(AgentResult(
+                    agent_name=self.name,
+                    status="success" if not findings else "warning",
+                    findings=findings,
+                    confidence_score=self._calculate_confidence(findings),
+                    execution_time=execution_time,
+                    file_path=file_data['file_path']
+                ))
+            return results
+        except Exception as e:
+            execution_time = int((time.time() - start_time) * 1000)
+            return [
+                AgentResult(
+                    agent_name=self.name,
+                    status="error",
+                    findings=[],
+                    confidence_score=0,
+                    execution_time=execution_time,
+                    error_message=str(e),
+                    file_path=file_data['file_path']
+                )
+                for file_data in files
+            ]
+    
+    def _split_by_file(self, review_text: str, file_paths: List[str]) -> Dict[str, str]:
+        """Split a multi-file review into per-file sections"""
+        known_paths = {_normalize_path(path): path for path in file_paths}
+        sections: Dict[str, List[str]] = {}
+        current = None
+        
+        for line in review_text.split('\n'):
+            match = _FILE_HEADER.match(line)
+            if match:
+                # Text under a header for a file we did not send is dropped
+                path = known_paths.get(_normalize_path(match.group('path')))
+                current = sections.setdefault(path, []) if path else None
                 continue
-                
-            # Look for severity indicators
-            if any(keyword in line.lower() for keyword in ['critical', 'high', 'medium', 'low']):
-                if current_finding:
-                    findings.append(current_finding)
-                
-                severity = 'medium'
-                if 'critical' in line.lower():
-                    severity = 'critical'
-                elif 'high' in line.lower():
-                    severity = 'high'
-                elif 'low' in line.lower():
-                    severity = 'low'
-                
-                current_finding = {
-                    'severity': severity,
-                    'description': line,
-                    'suggestion': '',
-                    'line_number': None
-                }
-            elif current_finding and line.startswith('-'):
-                current_finding['suggestion'] = line[1:].strip()
-            elif current_finding:
-                current_finding['description'] += ' ' + line
-        
-        if current_finding:
-            findings.append(current_finding)
+            if current is not None:
+                current.append(line)
+        
+        return {path: '\n'.join(lines) for path, lines in sections.items()}
+    
+    def _parse_batch_findings(self, review_text: str, file_paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Parse a multi-file review into findings per file"""
+        with span("parse", self.name):
+            findings = parse_json_findings(review_text)
+            if findings is None:
+                sections = self._split_by_file(review_text, file_paths)
+                return {path: parse_text_findings(section) for path, section in sections.items()}
+        
+        known_paths = {_normalize_path(path): path for path in file_paths}
+        findings_by_file: Dict[str, List[Dict[str, Any]]] = {}
+        for finding in findings:
+            path = known_paths.get(_normalize_path(finding.pop('file_path', None) or ''))
+            if path is None and len(file_paths) == 1:
+                path = file_paths[0]
+            if path is not None:  # Findings for files we did not send are dropped
+                findings_by_file.setdefault(path, []).append(finding)
         
+        return findings_by_file
+    
+    def _parse_findings(self, review_text: str) -> List[Dict[str, Any]]:
+        """Parse the review into structured findings, falling back to prose parsing"""
+        with span("parse", self.name):
+            findings = parse_json_findings(review_text)
+            if findings is None:
+                return parse_text_findings(review_text)
+        
+        for finding in findings:
+            finding.pop('file_path', None)  # Single-file reviews already know their file
         return findings
     
     def _calculate_confidence(self, findings: List[Dict[str, Any]]) -> int:
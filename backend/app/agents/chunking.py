@@ -0,0 +1,93 @@
+from typing import Iterator, List, Optional
+from app.agents.diff import ParsedPatch
+
+class PatchChunk:
+    """A bounded slice of a patch that still reads as a valid unified diff.
+
+    ``start_line``/``end_line`` give the range of head-file lines the chunk
+    owns. Overlap lines copied from the previous chunk for context are not
+    owned, so findings on them are left to the chunk that owns them.
+    """
+
+    def __init__(self, index: int, text: str, start_line: Optional[int], end_line: Optional[int]):
+        self.index = index
+        self.text = text
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def owns(self, line_number: Optional[int]) -> bool:
+        """Check whether a finding on this head-file line belongs to this chunk"""
+        if line_number is None or self.start_line is None:
+            return True
+        return self.start_line <= line_number <= self.end_line
+
+class _Segment:
+    """Part of one hunk inside a chunk"""
+
+    def __init__(self, old_start: int, new_start: int, section: str, lines: List[str]):
+        self.old_start = old_start
+        self.new_start = new_start
+        self.section = section
+        self.lines = lines
+
+    def render(self) -> str:
+        old_count = sum(1 for line in self.lines if not line.startswith(('+', '\\')))
+        new_count = sum(1 for line in self.lines if not line.startswith(('-', '\\')))
+        header = f"@@ -{self.old_start},{old_count} +{self.new_start},{new_count} @@{self.section}"
+        return "\n".join([header] + self.lines)
+
+def split_patch(patch: str, max_chars: int, overlap_lines: int = 3,
+                parsed: Optional[ParsedPatch] = None) -> Iterator[PatchChunk]:
+    """Lazily split a patch into chunks of at most about ``max_chars``.
+
+    Chunks break on hunk boundaries where possible. A hunk too large for a
+    single chunk is continued in the next one under a synthesized hunk
+    header, preceded by the last ``overlap_lines`` lines for context, so the
+    line numbers the model sees stay those of the head file. Pass
+    ``parsed`` to reuse a parse of the same patch.
+    """
+    if len(patch) <= max_chars:
+        yield PatchChunk(0, patch, None, None)
+        return
+
+    parsed = parsed or ParsedPatch(patch)
+    lines = parsed.lines
+    index = 0
+    segments: List[_Segment] = []
+    size = 0
+    owned_start = owned_end = None
+
+    def flush() -> PatchChunk:
+        return PatchChunk(index, "\n".join(segment.render() for segment in segments), owned_start, owned_end)
+
+    for hunk in parsed.hunks:
+        header = lines[hunk.first]
+        if segments and size + len(header) > max_chars:
+            yield flush()
+            index += 1
+            segments, size, owned_start, owned_end = [], 0, None, None
+        segments.append(_Segment(hunk.old_start, hunk.new_start, hunk.section, []))
+        size += len(header) + 1
+
+        for row in range(hunk.first + 1, hunk.last):
+            line = lines[row]
+            if segments[-1].lines and size + len(line) + 1 > max_chars:
+                # Continue this hunk in a new chunk, starting with overlap context
+                yield flush()
+                index += 1
+                overlap_start = max(hunk.first + 1, row - overlap_lines)
+                overlap = lines[overlap_start:row]
+                segments = [_Segment(parsed.old_numbers[overlap_start], parsed.new_numbers[overlap_start],
+                                     hunk.section, overlap)]
+                size = sum(len(entry) + 1 for entry in overlap)
+                owned_start = owned_end = None
+
+            segments[-1].lines.append(line)
+            size += len(line) + 1
+
+            if owned_start is None:
+                owned_start = parsed.new_numbers[row]
+            owned_end = parsed.new_numbers[row]
+
+    if segments:
+        yield flush()
@@ -0,0 +1,203 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+import fnmatch
+import re
+
+EXTENSION_LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.jsx': 'javascript',
+    '.tsx': 'typescript',
+    '.java': 'java',
+    '.cpp': 'cpp',
+    '.c': 'c',
+    '.cs': 'csharp',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.php': 'php',
+    '.rb': 'ruby',
+    '.swift': 'swift',
+    '.kt': 'kotlin',
+    '.scala': 'scala',
+    '.r': 'r',
+    '.m': 'matlab',
+    '.sh': 'bash',
+    '.sql': 'sql',
+    '.html': 'html',
+    '.css': 'css',
+    '.scss': 'scss',
+    '.sass': 'sass',
+    '.less': 'less',
+    '.xml': 'xml',
+    '.json': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.md': 'markdown',
+    '.txt': 'text'
+}
+
+FILENAME_LANGUAGES = {
+    'dockerfile': 'dockerfile',
+    'makefile': 'make',
+    'gemfile': 'ruby',
+    'rakefile': 'ruby',
+    'jenkinsfile': 'groovy'
+}
+
+SHEBANG_LANGUAGES = {
+    'python': 'python',
+    'node': 'javascript',
+    'bash': 'bash',
+    'sh': 'bash',
+    'zsh': 'bash',
+    'ruby': 'ruby',
+    'perl': 'perl',
+    'php': 'php'
+}
+
+# (reason, glob) pairs for paths that never need a review
+DEFAULT_SKIP_PATTERNS = [
+    # Lockfiles
+    ('lockfile', '*package-lock.json'),
+    ('lockfile', '*npm-shrinkwrap.json'),
+    ('lockfile', '*yarn.lock'),
+    ('lockfile', '*pnpm-lock.yaml'),
+    ('lockfile', '*poetry.lock'),
+    ('lockfile', '*Pipfile.lock'),
+    ('lockfile', '*Cargo.lock'),
+    ('lockfile', '*Gemfile.lock'),
+    ('lockfile', '*composer.lock'),
+    ('lockfile', '*go.sum'),
+    # Vendored and build output trees
+    ('vendored', 'vendor/*'),
+    ('vendored', '*/vendor/*'),
+    ('vendored', 'node_modules/*'),
+    ('vendored', '*/node_modules/*'),
+    ('vendored', 'third_party/*'),
+    ('vendored', '*/third_party/*'),
+    ('vendored', 'dist/*'),
+    ('vendored', '*/dist/*'),
+    ('vendored', 'build/*'),
+    ('vendored', '*/build/*'),
+    # Snapshots
+    ('snapshot', '*/__snapshots__/*'),
+    ('snapshot', '*.snap'),
+    # Generated code
+    ('generated', '*_pb2.py'),
+    ('generated', '*_pb2_grpc.py'),
+    ('generated', '*.pb.go'),
+    ('generated', '*.generated.*'),
+    ('generated', '*.g.dart'),
+    # Minified and derived assets
+    ('minified', '*.min.js'),
+    ('minified', '*.min.css'),
+    ('minified', '*.map'),
+    # Data
+    ('data', '*.csv'),
+    ('data', '*.tsv'),
+    ('data', '*.svg'),
+]
+
+# Markers tools put near the top of files they generate
+_GENERATED_MARKERS = re.compile(
+    r'@generated|DO NOT EDIT|Code generated by|auto-?generated|This file was generated',
+    re.IGNORECASE
+)
+
+# How much of a patch to scan for shebangs and generated markers
+_HEAD_LINES = 10
+
+# A patch is treated as minified when its added lines are this long on average
+_MINIFIED_AVG_LINE_LENGTH = 300
+
+class FileClassification:
+    """What to do with one changed file"""
+
+    __slots__ = ('language', 'skip_reason')
+
+    def __init__(self, language: str, skip_reason: Optional[str] = None):
+        self.language = language
+        self.skip_reason = skip_reason
+
+    @property
+    def should_review(self) -> bool:
+        return self.skip_reason is None
+
+class FileClassifier:
+    """Decides which changed files are worth sending to the agents.
+
+    Globs are compiled into a single regex when the classifier is built, so
+    classifying a file is one regex match plus a scan of the first few patch
+    lines. Use ``get_file_classifier()`` to share compiled instances.
+    """
+
+    def __init__(self, ignore_patterns: Iterable[str] = ()):
+        patterns = list(DEFAULT_SKIP_PATTERNS) + [('ignored', pattern) for pattern in ignore_patterns]
+        self._reasons = [reason for reason, _ in patterns]
+        self._skip = re.compile('|'.join(
+            f'(?P<p{index}>{fnmatch.translate(pattern)})' for index, (_, pattern) in enumerate(patterns)
+        ))
+
+    def detect_language(self, file_path: str, patch: str = '') -> str:
+        """Detect programming language from file name, extension or shebang"""
+        file_name = file_path.rsplit('/', 1)[-1]
+        language = FILENAME_LANGUAGES.get(file_name.lower())
+        if language:
+            return language
+
+        if '.' in file_name:
+            language = EXTENSION_LANGUAGES.get('.' + file_name.rsplit('.', 1)[-1].lower())
+            if language:
+                return language
+
+        return self._shebang_language(patch) or 'unknown'
+
+    def classify(self, file_path: str, patch: str) -> FileClassification:
+        """Classify a changed file"""
+        language = self.detect_language(file_path, patch)
+
+        match = self._skip.match(file_path)
+        if match:
+            return FileClassification(language, self._reasons[int(match.lastgroup[1:])])
+
+        head = patch[:4096]
+        head_lines = head.split('\n', _HEAD_LINES)[:_HEAD_LINES]
+        if any(_GENERATED_MARKERS.search(line) for line in head_lines if line.startswith(('+', ' '))):
+            return FileClassification(language, 'generated')
+
+        if self._looks_minified(patch):
+            return FileClassification(language, 'minified')
+
+        return FileClassification(language)
+
+    def _shebang_language(self, patch: str) -> Optional[str]:
+        """Detect language from a shebang on the first line of a new file"""
+        for line in patch[:1024].split('\n', _HEAD_LINES)[:_HEAD_LINES]:
+            if line.startswith(('+#!', ' #!')):
+                interpreter = line[3:].split()
+                if not interpreter:
+                    return None
+                program = interpreter[0].rsplit('/', 1)[-1]
+                if program == 'env' and len(interpreter) > 1:
+                    program = interpreter[1]
+                return SHEBANG_LANGUAGES.get(re.sub(r'[\d.]+$', '', program))
+        return None
+
+    def _looks_minified(self, patch: str) -> bool:
+        """Check for a few very long added lines, the shape of minified code"""
+        added_lines = 0
+        added_chars = 0
+        for line in patch.split('\n'):
+            if line.startswith('+'):
+                added_lines += 1
+                added_chars += len(line)
+        return added_lines > 0 and added_chars / added_lines > _MINIFIED_AVG_LINE_LENGTH
+
+@lru_cache(maxsize=64)
+def _cached_classifier(ignore_patterns: Tuple[str, ...]) -> FileClassifier:
+    return FileClassifier(ignore_patterns)
+
+def get_file_classifier(ignore_patterns: Optional[Iterable[str]] = None) -> FileClassifier:
+    """Get a compiled classifier for a repository's ignore patterns"""
+    return _cached_classifier(tuple(sorted(ignore_patterns or ())))
@@ -0,0 +1,153 @@
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import random
+import re
+import zlib
+from app.core.config import settings
+
+SEVERITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+_SEVERITY_PREFIX = re.compile(
+    r'^\W*(?:\d+[.)]\s*)?(?:\W*(?:severity|risk|priority)\s*[:=-]\s*)?\W*(?:critical|high|medium|low)\b\W*',
+    re.IGNORECASE
+)
+_LINE_REFERENCE = re.compile(r'\b(?:on |at )?lines?\s*[:#]?\s*\d+(?:\s*[-–]\s*\d+)?', re.IGNORECASE)
+_PATH = re.compile(r'\S*[/\\]\S+|\b\w+\.(?:py|js|ts|jsx|tsx|go|rs|java|rb|php|cs|cpp|c|h|sql|json|ya?ml)\b')
+_QUOTED = re.compile(r'`[^`]*`|"[^"]*"|\'[^\']*\'')
+_NUMBER = re.compile(r'\d+')
+_NON_WORD = re.compile(r'[^a-z#<> ]+')
+
+# MinHash parameters: 16 bands of 4 rows put near-duplicates above about
+# 0.5 Jaccard similarity in a shared bucket, which is then checked exactly
+_NUM_PERM = 64
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(_NUM_PERM)]
+
+def normalize_text(text: str) -> str:
+    """Reduce a finding's text to the words that identify the issue.
+
+    Severity labels, line references, paths, quoted identifiers and numbers
+    are dropped or replaced with placeholders, so the same issue reported on
+    different lines, files or variables normalizes to the same text.
+    """
+    text = _SEVERITY_PREFIX.sub('', text)
+    text = _LINE_REFERENCE.sub(' ', text)
+    text = _PATH.sub(' <path> ', text)
+    text = _QUOTED.sub(' <name> ', text)
+    text = _NUMBER.sub('#', text.lower())
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+def fingerprint(text: str) -> str:
+    """Stable fingerprint of a finding's normalized text"""
+    return _digest(normalize_text(text))
+
+def context_hash(lines: List[str]) -> str:
+    """Fingerprint of the code around a finding, ignoring whitespace"""
+    return _digest('\n'.join(' '.join(line.split()) for line in lines))
+
+def history_entries(finding: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Every history key of a finding, its own and one per location it was collapsed from, with their files"""
+    entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for entry in [finding] + (finding.get('locations') or []):
+        key = (entry.get('fingerprint'), entry.get('context_hash'))
+        if key[0] and key[1] and key not in entries:
+            entries[key] = {'fingerprint': key[0], 'context_hash': key[1], 'file_path': entry.get('file_path')}
+    return list(entries.values())
+
+def _digest(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def _shingles(normalized: str, size: int = 3) -> set:
+    words = normalized.split()
+    if len(words) <= size:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def _minhash(shingles: set) -> Tuple[int, ...]:
+    hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS)
+
+def _similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    return sum(1 for a, b in zip(left, right) if a == b) / _NUM_PERM
+
+class FindingDeduplicator:
+    """Collapses duplicate findings across agents and files.
+
+    Findings with the same normalized text are grouped directly; the rest
+    are compared by MinHash signatures of word shingles, with LSH banding so
+    each finding is only compared with likely matches. Each group becomes
+    one finding that keeps the most severe wording and lists every location.
+    """
+
+    def __init__(self, threshold: Optional[float] = None):
+        self.threshold = threshold if threshold is not None else settings.review_dedup_threshold
+
+    def deduplicate(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Collapse duplicates; each finding needs agent_name, file_path and description"""
+        parent = list(range(len(findings)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        def union(left: int, right: int):
+            left, right = find(left), find(right)
+            if left != right:
+                parent[max(left, right)] = min(left, right)
+
+        exact: Dict[str, int] = {}
+        signatures: Dict[int, Tuple[int, ...]] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        for index, finding in enumerate(findings):
+            normalized = normalize_text(finding.get('description', ''))
+            finding['fingerprint'] = _digest(normalized)
+            if finding['fingerprint'] in exact:
+                union(exact[finding['fingerprint']], index)
+                continue
+            exact[finding['fingerprint']] = index
+
+            signature = _minhash(_shingles(normalized))
+            signatures[index] = signature
+            for band in range(_BANDS):
+                key = (band, signature[band * _ROWS:(band + 1) * _ROWS])
+                for candidate in buckets.get(key, ()):
+                    if find(candidate) != find(index) and _similarity(signatures[candidate], signature) >= self.threshold:
+                        union(candidate, index)
+                buckets.setdefault(key, []).append(index)
+
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for index, finding in enumerate(findings):
+            groups.setdefault(find(index), []).append(finding)
+
+        return [self._collapse(group) for group in groups.values()]
+
+    def _collapse(self, group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge a group of duplicates into one finding with all their locations"""
+        representative = min(group, key=lambda finding: (
+            SEVERITY_RANK.get(finding.get('severity'), 2),
+            finding.get('line_number') is None,
+            -len(finding.get('description', ''))
+        ))
+        merged = dict(representative)
+        merged['agents'] = sorted({finding['agent_name'] for finding in group})
+
+        locations = []
+        seen = set()
+        for finding in [representative] + group:
+            location = (finding.get('file_path'), finding.get('line_number'))
+            if location not in seen:
+                seen.add(location)
+                # Each location keeps its own history key, to be recognized when only its file changes
+                locations.append({'file_path': location[0], 'line_number': location[1],
+                                  'agent_name': finding['agent_name'],
+                                  'fingerprint': finding.get('fingerprint'),
+                                  'context_hash': finding.get('context_hash')})
+        merged['locations'] = locations
+        merged['duplicates'] = len(group) - 1
+
+        return merged
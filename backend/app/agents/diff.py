@@ -0,0 +1,138 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+import re
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@(.*)$')
+
+# Line kinds in ParsedPatch.kinds
+HEADER = 0
+CONTEXT = 1
+ADDED = 2
+REMOVED = 3
+NO_NEWLINE = 4  # "\ No newline at end of file"
+
+_KINDS = {' ': CONTEXT, '+': ADDED, '-': REMOVED, '\\': NO_NEWLINE}
+
+class Hunk:
+    """One hunk of a patch, as a range of rows in the patch's line table"""
+
+    __slots__ = ('old_start', 'new_start', 'section', 'first', 'last')
+
+    def __init__(self, old_start: int, new_start: int, section: str, first: int):
+        self.old_start = old_start
+        self.new_start = new_start
+        self.section = section
+        self.first = first  # Row of the hunk header
+        self.last = first + 1  # One past the last row
+
+class ParsedPatch:
+    """A unified diff parsed once into a compact line table.
+
+    Row ``i`` of the table is diff position ``i`` in GitHub's sense: row 0
+    is the first hunk header, and later hunk headers take up a row each.
+    ``kinds`` holds each row's kind, while ``old_numbers`` and
+    ``new_numbers`` hold the base and head line counters at that row. The
+    orchestrator parses each patch once per review and hands the result to
+    the stages that need it.
+    """
+
+    __slots__ = ('lines', 'kinds', 'old_numbers', 'new_numbers', 'hunks', '_commentable')
+
+    def __init__(self, patch: str):
+        self.lines: List[str] = []
+        self.kinds = array('b')
+        self.old_numbers = array('l')
+        self.new_numbers = array('l')
+        self.hunks: List[Hunk] = []
+        self._commentable: Optional[array] = None
+
+        if patch.endswith('\n'):
+            patch = patch[:-1]
+
+        old_line = new_line = 0
+        for line in patch.split('\n'):
+            match = _HUNK_HEADER.match(line)
+            if match:
+                old_line, new_line = int(match.group(1)), int(match.group(2))
+                self.hunks.append(Hunk(old_line, new_line, match.group(3), len(self.lines)))
+                kind = HEADER
+            elif not self.hunks:
+                continue  # Preamble before the first hunk
+            else:
+                kind = _KINDS.get(line[:1], CONTEXT)
+
+            self.lines.append(line)
+            self.kinds.append(kind)
+            self.old_numbers.append(old_line)
+            self.new_numbers.append(new_line)
+            self.hunks[-1].last = len(self.lines)
+
+            if kind == ADDED:
+                new_line += 1
+            elif kind == REMOVED:
+                old_line += 1
+            elif kind == CONTEXT:
+                old_line += 1
+                new_line += 1
+
+    def line_at(self, position: int) -> Optional[int]:
+        """Map a diff position to its head-file line number, if it has one"""
+        if 0 <= position < len(self.kinds) and self.kinds[position] in (CONTEXT, ADDED):
+            return self.new_numbers[position]
+        return None
+
+    def position_of(self, line_number: int) -> Optional[int]:
+        """Map a head-file line number to its diff position, if it is in the diff"""
+        for hunk in self.hunks:
+            for row in range(hunk.first + 1, hunk.last):
+                if self.new_numbers[row] == line_number and self.kinds[row] in (CONTEXT, ADDED):
+                    return row
+        return None
+
+    def commentable_lines(self) -> array:
+        """Sorted head-file lines that review comments can be attached to"""
+        if self._commentable is None:
+            self._commentable = array('l', sorted({
+                self.new_numbers[row] for row in range(len(self.kinds))
+                if self.kinds[row] in (CONTEXT, ADDED)
+            }))
+        return self._commentable
+
+    def resolve_line(self, line_number: Optional[int], max_distance: int = 3) -> Optional[int]:
+        """Snap a reported line to the nearest commentable line, or None if it is too far"""
+        if line_number is None:
+            return None
+        lines = self.commentable_lines()
+        index = bisect_left(lines, line_number)
+        candidates = [lines[i] for i in (index - 1, index) if 0 <= i < len(lines)]
+        if not candidates:
+            return None
+        nearest = min(candidates, key=lambda line: abs(line - line_number))
+        return nearest if abs(nearest - line_number) <= max_distance else None
+
+    def context_around(self, line_number: int, radius: int = 2) -> List[str]:
+        """Get the head-file lines within ``radius`` of a line, as far as the diff shows them"""
+        return [
+            self.lines[row][1:]
+            for row in range(len(self.kinds))
+            if self.kinds[row] in (CONTEXT, ADDED) and abs(self.new_numbers[row] - line_number) <= radius
+        ]
+    
+    def changed_lines(self) -> Tuple[List[str], List[str]]:
+        """Get the added and removed lines, without their markers"""
+        added = []
+        removed = []
+        for row, kind in enumerate(self.kinds):
+            if kind == ADDED:
+                added.append(self.lines[row][1:])
+            elif kind == REMOVED:
+                removed.append(self.lines[row][1:])
+        return added, removed
+
+def resolve_finding_lines(findings: List[Dict], parsed: Optional[ParsedPatch]):
+    """Point each finding at a line the diff can take a comment on, or at None"""
+    if parsed is None:
+        return
+    for finding in findings:
+        finding['line_number'] = parsed.resolve_line(finding.get('line_number'))
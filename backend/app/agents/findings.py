@@ -0,0 +1,134 @@
+from typing import Dict, Any, List, Optional
+import json
+import re
+
+SEVERITIES = ('critical', 'high', 'medium', 'low')
+
+# Appended to every agent prompt; keep in sync with parse_json_findings
+JSON_OUTPUT_INSTRUCTIONS = """
+        Respond with a single JSON object and nothing else, in this shape:
+        {"findings": [{"file": "<path>", "line": <line number in the new file or null>,
+                       "severity": "critical" | "high" | "medium" | "low",
+                       "description": "<the issue and its impact>",
+                       "suggestion": "<how to fix it>"}]}
+        Use the line numbers from the diff's hunk headers. Return {"findings": []}
+        when there is nothing to report.
+        """
+
+_FINDINGS_OBJECT = re.compile(r'\{\s*"findings"')
+_JSON_START = re.compile(r'[\[{]')
+
+# A severity used as a label: "High:", "**High** -", "[HIGH]", "Severity: high"
+_SEVERITY_LABEL = re.compile(
+    r'^[\s>*#\-\d.)]*(?:\*\*|__|\[|\()?\s*(critical|high|medium|low)\b\s*(?:severity|risk|priority)?'
+    r'\s*(?:\*\*|__|\]|\))?\s*(?::|[\-–—|](?=\s))'
+    r'|\b(?:severity|risk|priority)\s*(?:\*\*|__)?\s*[:=\-]\s*(?:\*\*|__|\[|`)?\s*(critical|high|medium|low)\b',
+    re.IGNORECASE
+)
+_LINE_REFERENCE = re.compile(r'\blines?\s*[:#]?\s*(\d+)', re.IGNORECASE)
+
+def parse_json_findings(text: str) -> Optional[List[Dict[str, Any]]]:
+    """Parse and validate a JSON findings response.
+
+    Accepts the object from ``JSON_OUTPUT_INSTRUCTIONS`` or a bare list,
+    with or without a Markdown code fence or surrounding prose. Returns
+    None when the text holds no usable JSON, so the caller can fall back
+    to ``parse_text_findings``.
+    """
+    match = _FINDINGS_OBJECT.search(text)
+    if not match:
+        # Anything else must open the response, after at most a code fence,
+        # so brackets in prose are not mistaken for JSON
+        match = _JSON_START.search(text)
+        if not match or text[:match.start()].strip().strip('`').strip().lower() not in ('', 'json'):
+            return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text, match.start())
+    except ValueError:
+        return None
+
+    if isinstance(data, dict):
+        data = data.get('findings')
+    if not isinstance(data, list):
+        return None
+
+    findings = []
+    for item in data:
+        if not isinstance(item, dict):
+            return None
+        description = item.get('description') or item.get('issue') or item.get('title')
+        if not isinstance(description, str) or not description.strip():
+            continue
+
+        severity = str(item.get('severity', '')).strip().lower()
+        finding = {
+            'severity': severity if severity in SEVERITIES else 'medium',
+            'description': description.strip(),
+            'suggestion': str(item.get('suggestion') or '').strip(),
+            'line_number': _coerce_line(item.get('line', item.get('line_number')))
+        }
+        file_path = item.get('file') or item.get('file_path')
+        if isinstance(file_path, str) and file_path:
+            finding['file_path'] = file_path
+        findings.append(finding)
+
+    return findings
+
+def parse_text_findings(review_text: str) -> List[Dict[str, Any]]:
+    """Parse a prose review into findings.
+
+    A finding starts at a line that uses a severity as a label, such as
+    "High: ..." or "Severity: high", so prose that merely mentions "high"
+    does not start one. Lines beginning with "-" become the suggestion and
+    other lines extend the description.
+    """
+    findings = []
+    current_finding = None
+
+    for line in review_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        lowered = line.lower()
+        # Substring checks are much cheaper than the label regex and rule out most lines
+        match = None
+        if 'critical' in lowered or 'high' in lowered or 'medium' in lowered or 'low' in lowered:
+            match = _SEVERITY_LABEL.search(line)
+        if match:
+            if current_finding:
+                findings.append(current_finding)
+            current_finding = {
+                'severity': (match.group(1) or match.group(2)).lower(),
+                'description': line,
+                'suggestion': '',
+                'line_number': None
+            }
+        elif current_finding and line.startswith('-'):
+            current_finding['suggestion'] = line[1:].strip()
+        elif current_finding:
+            current_finding['description'] += ' ' + line
+        else:
+            continue
+
+        if current_finding['line_number'] is None and 'line' in lowered:
+            line_match = _LINE_REFERENCE.search(line)
+            if line_match:
+                current_finding['line_number'] = int(line_match.group(1))
+
+    if current_finding:
+        findings.append(current_finding)
+
+    return findings
+
+def _coerce_line(value: Any) -> Optional[int]:
+    """Turn a model-reported line number into a positive int or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value > 0 else None
+    if isinstance(value, str):
+        match = re.search(r'\d+', value)
+        if match and int(match.group(0)) > 0:
+            return int(match.group(0))
+    return None
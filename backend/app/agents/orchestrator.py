@@ -1,49 +1,281 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterable, Callable, Iterable, List, Optional, Set, Tuple, Union
 import asyncio
+import functools
 import time
+from app.core.config import settings
+from app.core.metrics import get_metrics, record_stage, span
 from app.agents.base import BaseAgent, AgentResult
-from app.agents.registry import AgentRegistry
+from app.agents.classifier import get_file_classifier
+from app.agents.dedup import FindingDeduplicator, context_hash, fingerprint
+from app.agents.diff import ParsedPatch, resolve_finding_lines
+from app.agents.packer import StreamingPacker, estimate_tokens
+from app.agents.chunking import PatchChunk, split_patch
+from app.agents.registry import AgentRegistry, get_agent_registry
+from app.agents.scheduler import ReviewScheduler, SchedulerStats, get_review_scheduler
+from app.agents.triage import StaticTriage, TriageDecision, get_static_triage
+
+AGENT_RESULTS = get_metrics().counter(
+    "codelion_agent_results_total", "Agent results per file by status", ["agent", "status"]
+)
+AGENT_FINDINGS = get_metrics().counter(
+    "codelion_agent_findings_total", "Findings reported by agents, before deduplication", ["agent", "severity"]
+)
+FILES_SKIPPED = get_metrics().counter(
+    "codelion_files_skipped_total", "Files dropped before review by the classifier", ["reason"]
+)
 
 class ReviewOrchestrator:
-    def __init__(self):
-        self.agent_registry = AgentRegistry()
+    def __init__(self, scheduler: Optional[ReviewScheduler] = None, triage: Optional[StaticTriage] = None,
+                 agent_registry: Optional[AgentRegistry] = None):
+        self.agent_registry = agent_registry or get_agent_registry()
+        self.scheduler = scheduler or get_review_scheduler()
+        self.triage = triage or get_static_triage()
     
-    async def analyze_pull_request(self, pr_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Orchestrate analysis of a pull request using all agents"""
+    async def analyze_pull_request(self, pr_data: Dict[str, Any], bypass_cache: bool = False,
+                                   deadline_seconds: Optional[float] = None,
+                                   ignore_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Orchestrate analysis of a pull request using all agents.
+
+        ``pr_data['files']`` is a list or an async iterable of GitHub file
+        entries. Files are read through a bounded buffer and scheduled as
+        they arrive, so agents start on the first page of a long listing
+        while later pages download, and each patch is dropped once its
+        agents are done with it.
+
+        Lockfiles, vendored trees, generated and minified files, and paths
+        matching the repository's ``ignore_patterns`` are dropped before any
+        agent runs, and static triage picks the agents each remaining file
+        needs. When the deadline passes, the review finishes with the
+        findings it already has and the unfinished (agent, file) pairs are
+        reported with status ``timed_out``.
+        """
         start_time = time.time()
+        if deadline_seconds is None:
+            deadline_seconds = settings.review_deadline_seconds
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
         
         # Extract PR information
         pr_title = pr_data.get('title', '')
         pr_description = pr_data.get('body', '')
         repository = pr_data.get('repository', {}).get('full_name', '')
         
-        # Get all file changes
-        files = pr_data.get('files', [])
+        agents = self.agent_registry.get_all_agents()
         
-        # Run agents in parallel for each file
-        all_results = []
+        review_context = {
+            'repository': repository,
+            'pr_title': pr_title,
+            'pr_description': pr_description,
+            'bypass_cache': bypass_cache,
+            'deadline': deadline
+        }
+        
+        classifier = get_file_classifier(list(settings.review_ignore_patterns) + list(ignore_patterns or []))
+        triage_mode = settings.review_triage_mode
+        decisions: Dict[str, TriageDecision] = {}
+        skipped_files = []
+        # (agent, file) pairs files were routed to, to find the ones that never ran
+        planned: Set[tuple] = set()
+        stage_seconds = {'classify': 0.0, 'triage': 0.0}
         
-        for file_data in files:
+        def intake(file_data: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], List[BaseAgent], Optional[ParsedPatch]]]:
+            """Classify and route one file; returns it with its agents and patch parse, or None if it is skipped"""
             file_path = file_data.get('filename', '')
             patch = file_data.get('patch', '')
             
             if not patch:  # Skip files without changes
-                continue
+                return None
+            
+            started = time.perf_counter()
+            classification = classifier.classify(file_path, patch)
+            stage_seconds['classify'] += time.perf_counter() - started
+            if not classification.should_review:
+                skipped_files.append({
+                    'file_path': file_path,
+                    'reason': classification.skip_reason,
+                    'bytes': len(patch.encode('utf-8')),
+                    'tokens': estimate_tokens(patch)
+                })
+                FILES_SKIPPED.inc(reason=classification.skip_reason)
+                return None
             
-            # Determine language from file extension
-            language = self._detect_language(file_path)
+            file_entry = {'file_path': file_path, 'language': classification.language, 'patch': patch}
             
-            context = {
-                'file_path': file_path,
-                'language': language,
-                'repository': repository,
-                'pr_title': pr_title,
-                'pr_description': pr_description
+            # Route the file to the agents it needs; shadow mode only records the decision
+            file_agents = agents
+            parsed = None
+            if triage_mode != "off":
+                started = time.perf_counter()
+                parsed = ParsedPatch(patch)
+                decision = decisions[file_path] = self.triage.route(file_path, classification.language, patch, parsed)
+                stage_seconds['triage'] += time.perf_counter() - started
+                if triage_mode == "enforce":
+                    file_agents = [agent for agent in agents if decision.wants(agent.name)]
+            planned.update((agent.name, file_path) for agent in file_agents)
+            return file_entry, file_agents, parsed
+        
+        # A bounded buffer between the file listing and the agents: a slow
+        # review stops the listing from being read further ahead
+        buffer: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.review_file_buffer))
+        reader = asyncio.create_task(self._read_files(pr_data.get('files', []), buffer))
+        listing_done = False
+        
+        async def read_files():
+            nonlocal listing_done
+            while not listing_done:
+                item = await buffer.get()
+                if item is None:
+                    listing_done = True
+                elif isinstance(item, Exception):
+                    listing_done = True
+                    raise item
+                else:
+                    yield item
+        
+        # Patches, and their parses, are kept only while units that need them are
+        # outstanding; a file holds one reference per unfinished unit or open batch it is in
+        patches: Dict[str, str] = {}
+        parsed_patches: Dict[str, ParsedPatch] = {}
+        references: Dict[str, int] = {}
+        
+        def hold(file_path: str):
+            references[file_path] = references.get(file_path, 0) + 1
+        
+        def release(file_path: str):
+            references[file_path] -= 1
+            if not references[file_path]:
+                del references[file_path]
+                patches.pop(file_path, None)
+                parsed_patches.pop(file_path, None)
+        
+        def parsed_patch(file_path: Optional[str]) -> Optional[ParsedPatch]:
+            """Parse a held file's patch at most once"""
+            parsed = parsed_patches.get(file_path)
+            if parsed is None and file_path in patches:
+                parsed = parsed_patches[file_path] = ParsedPatch(patches[file_path])
+            return parsed
+        
+        unit_count = 0
+        # (agent, file) -> units started but not finished, to find what timed out
+        outstanding: Dict[tuple, int] = {}
+        
+        def file_units(agent: BaseAgent, singles: List[Dict[str, Any]], batches: List[List[Dict[str, Any]]],
+                       packed: bool):
+            # Oversized patches are only split as the scheduler has room for their chunks
+            nonlocal unit_count
+            for file_data in singles:
+                context = {**review_context, 'file_path': file_data['file_path'], 'language': file_data['language']}
+                for chunk in split_patch(file_data['patch'], settings.review_chunk_max_chars,
+                                         settings.review_chunk_overlap_lines,
+                                         parsed_patches.get(file_data['file_path'])):
+                    unit_count += 1
+                    pair = (agent.name, file_data['file_path'])
+                    outstanding[pair] = outstanding.get(pair, 0) + 1
+                    hold(file_data['file_path'])
+                    yield functools.partial(self._run_agent, agent, chunk, context)
+                if packed:
+                    release(file_data['file_path'])  # Left the packer as a single
+            for batch in batches:
+                unit_count += 1
+                for file_data in batch:
+                    pair = (agent.name, file_data['file_path'])
+                    outstanding[pair] = outstanding.get(pair, 0) + 1
+                yield functools.partial(self._run_agent_batch, agent, batch, review_context)
+        
+        # Small files share one prompt per agent, larger ones get their own
+        packers: Dict[str, StreamingPacker] = {}
+        if settings.review_batching_enabled:
+            packers = {
+                agent.name: StreamingPacker(settings.review_batch_token_budget, settings.review_batch_max_file_tokens)
+                for agent in agents
             }
+        
+        async def iter_units():
+            async for file_data in read_files():
+                entry = intake(file_data)
+                if entry is None:
+                    continue
+                file_entry, file_agents, parsed = entry
+                file_path = file_entry['file_path']
+                patches[file_path] = file_entry['patch']
+                if parsed is not None:
+                    parsed_patches[file_path] = parsed
+                hold(file_path)  # Until every unit for the file exists
+                try:
+                    for agent in file_agents:
+                        if agent.name in packers:
+                            hold(file_path)
+                            singles, batches = packers[agent.name].add(file_entry)
+                            packed = True
+                        else:
+                            singles, batches, packed = [file_entry], [], False
+                        for unit in file_units(agent, singles, batches, packed):
+                            yield unit
+                finally:
+                    release(file_path)
+            for agent in agents:
+                if agent.name in packers:
+                    singles, batches = packers[agent.name].flush()
+                    for unit in file_units(agent, singles, batches, True):
+                        yield unit
+        
+        # Run the units concurrently under the scheduler's limits as the files arrive
+        all_results = []
+        schedule_stats = SchedulerStats()
+        try:
+            async for results in self.scheduler.run(iter_units(), review_stats=schedule_stats, deadline=deadline):
+                for result in results:
+                    outstanding[(result.agent_name, result.file_path)] -= 1
+                    # Findings must point at lines the diff can take a comment on
+                    resolve_finding_lines(result.findings, parsed_patch(result.file_path))
+                    self._add_context_hashes(result, parsed_patch)
+                    release(result.file_path)
+                all_results.extend(results)
+            
+            # Files still unlisted when the deadline passed are routed, but never
+            # reviewed; past the drain time the rest of the listing is left unread
+            async def drain():
+                async for file_data in read_files():
+                    intake(file_data)
             
-            # Run all agents in parallel for this file
-            file_results = await self._run_agents_for_file(patch, context)
-            all_results.extend(file_results)
+            if not listing_done:
+                try:
+                    await asyncio.wait_for(drain(), settings.review_listing_drain_seconds)
+                except asyncio.TimeoutError:
+                    print(f"Stopped listing files of {repository}#{pr_data.get('number')} after the deadline")
+        finally:
+            reader.cancel()
+        
+        record_stage("classify", stage_seconds['classify'])
+        if triage_mode != "off":
+            record_stage("triage", stage_seconds['triage'])
+            self.triage.stats.record(decisions.values(), len(agents))
+        
+        # Anything not finished, or never started, ran out of time
+        timed_out = {pair for pair, count in outstanding.items() if count > 0}
+        timed_out.update(pair for pair in planned if pair not in outstanding)
+        timed_out.update((result.agent_name, result.file_path) for result in all_results if result.status == "timed_out")
+        
+        all_results = self._merge_chunk_results(all_results)
+        if timed_out:
+            all_results = self._mark_timed_out(all_results, timed_out)
+        
+        for result in all_results:
+            AGENT_RESULTS.inc(agent=result.agent_name, status=result.status)
+            for finding in result.findings:
+                AGENT_FINDINGS.inc(agent=result.agent_name, severity=finding.get('severity', 'medium'))
+        
+        # One finding per issue, listing every place it was reported
+        findings = [
+            {**finding, 'agent_name': result.agent_name, 'file_path': finding.get('file_path') or result.file_path}
+            for result in all_results for finding in result.findings
+        ]
+        reported = len(findings)
+        with span("dedup"):
+            if settings.review_dedup_enabled:
+                findings = FindingDeduplicator().deduplicate(findings)
+            for finding in findings:
+                if 'fingerprint' not in finding:
+                    finding['fingerprint'] = fingerprint(finding.get('description', ''))
         
         # Aggregate results
         total_execution_time = int((time.time() - start_time) * 1000)
@@ -52,84 +284,184 @@ class ReviewOrchestrator:
             'status': 'completed',
             'total_execution_time': total_execution_time,
             'agent_results': all_results,
+            'findings': findings,
+            'dedup': {'reported': reported, 'kept': len(findings), 'collapsed': reported - len(findings)},
             'summary': self._generate_summary(all_results),
-            'confidence_score': self._calculate_overall_confidence(all_results)
+            'confidence_score': self._calculate_overall_confidence(all_results),
+            'scheduling': schedule_stats.to_dict(),
+            'llm_calls': unit_count,
+            'timed_out_files': sorted({file_path for _, file_path in timed_out}),
+            'listing_complete': listing_done,
+            'classification': self._classification_stats(skipped_files, len(agents)),
+            'triage': self._triage_report(triage_mode, decisions, all_results)
         }
     
-    async def _run_agents_for_file(self, code_diff: str, context: Dict[str, Any]) -> List[AgentResult]:
-        """Run all agents in parallel for a single file"""
-        agents = self.agent_registry.get_all_agents()
+    async def _run_agent(self, agent: BaseAgent, chunk: PatchChunk, context: Dict[str, Any]) -> List[AgentResult]:
+        """Run a single agent on a single file, or one chunk of an oversized file"""
+        if chunk.start_line is not None:
+            context = {**context, 'chunk_index': chunk.index,
+                       'chunk_lines': f"{chunk.start_line}-{chunk.end_line}"}
+        
+        try:
+            result = await agent.analyze(chunk.text, context)
+        except Exception as e:
+            # Create error result for failed agents
+            result = AgentResult(
+                agent_name=agent.name,
+                status="error",
+                findings=[],
+                confidence_score=0,
+                execution_time=0,
+                error_message=str(e)
+            )
         
-        # Create tasks for all agents
-        tasks = []
-        for agent in agents:
-            task = asyncio.create_task(agent.analyze(code_diff, context))
-            tasks.append(task)
+        self._check_deadline(result, context)
         
-        # Wait for all agents to complete
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Findings on overlap lines belong to the neighbouring chunk
+        result.findings = [finding for finding in result.findings if chunk.owns(finding.get('line_number'))]
+        result.file_path = context['file_path']
+        for finding in result.findings:
+            finding.setdefault('file_path', context['file_path'])
         
-        # Filter out exceptions and return valid results
-        valid_results = []
+        return [result]
+    
+    async def _run_agent_batch(self, agent: BaseAgent, files: List[Dict[str, Any]],
+                               context: Dict[str, Any]) -> List[AgentResult]:
+        """Run a single agent on a batch of small files"""
+        results = await agent.analyze_batch(files, context)
         for result in results:
-            if isinstance(result, AgentResult):
-                valid_results.append(result)
-            elif isinstance(result, Exception):
-                # Create error result for failed agents
-                error_result = AgentResult(
-                    agent_name="unknown",
-                    status="error",
-                    findings=[],
-                    confidence_score=0,
-                    execution_time=0,
-                    error_message=str(result)
-                )
-                valid_results.append(error_result)
-        
-        return valid_results
+            self._check_deadline(result, context)
+            for finding in result.findings:
+                finding.setdefault('file_path', result.file_path)
+        
+        return results
     
-    def _detect_language(self, file_path: str) -> str:
-        """Detect programming language from file extension"""
-        extension_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.jsx': 'javascript',
-            '.tsx': 'typescript',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.cs': 'csharp',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.php': 'php',
-            '.rb': 'ruby',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.scala': 'scala',
-            '.r': 'r',
-            '.m': 'matlab',
-            '.sh': 'bash',
-            '.sql': 'sql',
-            '.html': 'html',
-            '.css': 'css',
-            '.scss': 'scss',
-            '.sass': 'sass',
-            '.less': 'less',
-            '.xml': 'xml',
-            '.json': 'json',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.md': 'markdown',
-            '.txt': 'text'
-        }
+    async def _read_files(self, files: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                          buffer: asyncio.Queue):
+        """Copy a list or stream of files into the buffer, then None, or the error that ended the stream"""
+        try:
+            if hasattr(files, '__aiter__'):
+                async for file_data in files:
+                    await buffer.put(file_data)
+            else:
+                for file_data in files:
+                    await buffer.put(file_data)
+        except Exception as e:
+            await buffer.put(e)
+            return
+        await buffer.put(None)
+    
+    def _add_context_hashes(self, result: AgentResult, parsed_patch: Callable[[Optional[str]], Optional[ParsedPatch]]):
+        """Key each finding by the code around it, to recognize it on later PRs"""
+        for finding in result.findings:
+            file_path = finding.get('file_path') or result.file_path
+            parsed = parsed_patch(file_path)
+            if parsed is not None and finding.get('line_number'):
+                context = parsed.context_around(finding['line_number'])
+            else:
+                context = [file_path or '']
+            finding['context_hash'] = context_hash(context)
+    
+    def _check_deadline(self, result: AgentResult, context: Dict[str, Any]):
+        """Report agent errors caused by the review deadline as timeouts"""
+        deadline = context.get('deadline')
+        if result.status == "error" and deadline is not None and time.monotonic() >= deadline:
+            result.status = "timed_out"
+    
+    def _mark_timed_out(self, results: List[AgentResult], timed_out: set) -> List[AgentResult]:
+        """Flag partial results and add placeholders for pairs that never finished"""
+        seen = set()
+        for result in results:
+            pair = (result.agent_name, result.file_path)
+            seen.add(pair)
+            if pair in timed_out:
+                result.status = "timed_out"
+                result.error_message = result.error_message or "Review deadline exceeded"
+        
+        for agent_name, file_path in sorted(timed_out - seen):
+            results.append(AgentResult(
+                agent_name=agent_name,
+                status="timed_out",
+                findings=[],
+                confidence_score=0,
+                execution_time=0,
+                error_message="Review deadline exceeded",
+                file_path=file_path
+            ))
         
-        # Get file extension
-        if '.' in file_path:
-            extension = '.' + file_path.split('.')[-1].lower()
-            return extension_map.get(extension, 'unknown')
+        return results
+    
+    def _merge_chunk_results(self, results: List[AgentResult]) -> List[AgentResult]:
+        """Merge the per-chunk results of oversized files into one result per (agent, file)"""
+        grouped: Dict[tuple, List[AgentResult]] = {}
+        for result in results:
+            grouped.setdefault((result.agent_name, result.file_path), []).append(result)
+        
+        merged = []
+        for (agent_name, file_path), parts in grouped.items():
+            if len(parts) == 1:
+                merged.append(parts[0])
+                continue
+            
+            findings = [finding for part in parts for finding in part.findings]
+            findings.sort(key=lambda finding: finding.get('line_number') or 0)
+            errors = [part.error_message for part in parts if part.error_message]
+            if len(errors) == len(parts):
+                status = "error"
+            else:
+                status = "warning" if findings or errors else "success"
+            
+            agent = self.agent_registry.get_agent(agent_name)
+            merged.append(AgentResult(
+                agent_name=agent_name,
+                status=status,
+                findings=findings,
+                confidence_score=agent._calculate_confidence(findings) if agent and status != "error" else 0,
+                execution_time=sum(part.execution_time for part in parts),
+                error_message="; ".join(errors) or None,
+                file_path=file_path
+            ))
+        
+        return merged
+    
+    def _classification_stats(self, skipped_files: List[Dict[str, Any]], agent_count: int) -> Dict[str, Any]:
+        """Summarize the files the classifier kept away from the agents"""
+        by_reason: Dict[str, int] = {}
+        skipped_bytes = 0
+        skipped_tokens = 0
+        for file_data in skipped_files:
+            by_reason[file_data['reason']] = by_reason.get(file_data['reason'], 0) + 1
+            skipped_bytes += file_data['bytes']
+            skipped_tokens += file_data['tokens']
+        
+        return {
+            'skipped_files': [{'file_path': f['file_path'], 'reason': f['reason']} for f in skipped_files],
+            'skipped_by_reason': by_reason,
+            'bytes_saved': skipped_bytes,
+            # Every agent would have been sent each skipped patch
+            'tokens_saved': skipped_tokens * agent_count
+        }
+    
+    def _triage_report(self, mode: str, decisions: Dict[str, TriageDecision],
+                       results: List[AgentResult]) -> Dict[str, Any]:
+        """Report routing decisions, and in shadow mode the findings triage would have missed"""
+        report = {
+            'mode': mode,
+            'decisions': [decision.to_dict() for decision in decisions.values()],
+            'skipped_pairs': sum(len(decision.skipped) for decision in decisions.values())
+        }
+        if mode == "shadow":
+            findings = 0
+            missed = 0
+            for result in results:
+                decision = decisions.get(result.file_path)
+                findings += len(result.findings)
+                if decision and not decision.wants(result.agent_name):
+                    missed += len(result.findings)
+            self.triage.stats.record_shadow(findings, missed)
+            report['missed_findings'] = missed
         
-        return 'unknown'
+        return report
     
     def _generate_summary(self, results: List[AgentResult]) -> str:
         """Generate a summary of all agent results"""
@@ -137,9 +469,12 @@ class ReviewOrchestrator:
         successful_agents = len([r for r in results if r.status == 'success'])
         warning_agents = len([r for r in results if r.status == 'warning'])
         error_agents = len([r for r in results if r.status == 'error'])
+        timed_out_agents = len([r for r in results if r.status == 'timed_out'])
         
         summary = f"Analysis completed with {total_findings} findings across {len(results)} agents. "
         summary += f"Success: {successful_agents}, Warnings: {warning_agents}, Errors: {error_agents}"
+        if timed_out_agents:
+            summary += f", Timed out: {timed_out_agents}"
         
         return summary
     
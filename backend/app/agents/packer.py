@@ -0,0 +1,53 @@
+from typing import Dict, Any, List, Tuple
+
+# Rough characters-per-token ratio for code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class StreamingPacker:
+    """Packs small files into batches as they arrive, for file lists read as a stream.
+
+    Files above ``max_file_tokens`` come straight back as singles. Small
+    files go into the first of up to ``open_batches`` open batches with
+    room; when none has room, the fullest one is closed and returned.
+    ``flush`` closes the rest once the files run out. A batch holding one
+    file is returned as a single, since batching it would only change the
+    prompt format.
+    """
+
+    def __init__(self, token_budget: int, max_file_tokens: int, open_batches: int = 4):
+        self.token_budget = token_budget
+        self.max_file_tokens = max_file_tokens
+        self.open_batches = open_batches
+        self._open: List[Tuple[int, List[Dict[str, Any]]]] = []  # (room left, files)
+
+    def add(self, file_data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """Add a file, returning the singles and batches that are ready to review"""
+        tokens = estimate_tokens(file_data['patch'])
+        if tokens > self.max_file_tokens:
+            return [file_data], []
+
+        for index, (room, files) in enumerate(self._open):
+            if tokens <= room:
+                files.append(file_data)
+                self._open[index] = (room - tokens, files)
+                return [], []
+
+        closed = []
+        if len(self._open) >= self.open_batches:
+            fullest = min(range(len(self._open)), key=lambda index: self._open[index][0])
+            closed.append(self._open.pop(fullest)[1])
+        self._open.append((self.token_budget - tokens, [file_data]))
+        return self._split(closed)
+
+    def flush(self) -> Tuple[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """Close every open batch"""
+        closed = [files for _, files in self._open]
+        self._open = []
+        return self._split(closed)
+
+    def _split(self, batches: List[List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        return [batch[0] for batch in batches if len(batch) == 1], [batch for batch in batches if len(batch) > 1]
@@ -1,4 +1,4 @@
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
 from app.agents.base import BaseAgent
 from app.agents.security import SecurityAgent
 from app.agents.performance import PerformanceAgent
@@ -35,3 +35,12 @@ class AgentRegistry:
         """Unregister an agent"""
         if name in self.agents:
             del self.agents[name]
+
+_agent_registry: Optional[AgentRegistry] = None
+
+def get_agent_registry() -> AgentRegistry:
+    """Get the process-wide agent registry"""
+    global _agent_registry
+    if _agent_registry is None:
+        _agent_registry = AgentRegistry()
+    return _agent_registry
@@ -0,0 +1,164 @@
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, Set, Union
+import asyncio
+import time
+from app.core.config import settings
+from app.core.metrics import get_metrics, record_stage
+
+WorkUnit = Callable[[], Awaitable[Any]]
+
+class SchedulerStats:
+    """Wait-time statistics for a set of scheduled units"""
+
+    def __init__(self):
+        self.scheduled = 0
+        self.started = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        """Record a unit getting its slot; every started unit waited, if only briefly"""
+        self.started += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'scheduled': self.scheduled,
+            'started': self.started,
+            'completed': self.completed,
+            'avg_wait_ms': int(self.total_wait / self.started * 1000) if self.started else 0,
+            'max_wait_ms': int(self.max_wait * 1000)
+        }
+
+class ReviewScheduler:
+    """Runs (file, agent) units of work under a process-wide concurrency limit.
+
+    Every review shares the global limit, sized for our Gemini quota, and
+    is additionally held to its own per-review limit so one huge PR cannot
+    starve the others.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or settings.review_max_concurrency
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.queue_depth = 0
+        self.running = 0
+        self.stats = SchedulerStats()
+
+    async def run(self, units: Union[Iterable[WorkUnit], AsyncIterable[WorkUnit]],
+                  per_review_limit: Optional[int] = None,
+                  review_stats: Optional[SchedulerStats] = None,
+                  deadline: Optional[float] = None) -> AsyncIterator[Any]:
+        """Run units concurrently and yield their results as they finish.
+
+        Units are pulled from ``units`` only when the review has a free
+        slot, so a lazy iterable never has more than ``per_review_limit``
+        units materialized at once. ``units`` may also be an async iterable,
+        e.g. one fed by a file listing still downloading; started units keep
+        running while the next one is awaited. Once ``deadline`` (a
+        ``time.monotonic()`` value) passes, unfinished units are cancelled
+        and no new ones start.
+        """
+        limit = per_review_limit or settings.review_per_review_concurrency
+        review_stats = review_stats or SchedulerStats()
+        is_async = hasattr(units, '__aiter__')
+        remaining = units.__aiter__() if is_async else iter(units)
+        pending: Set[asyncio.Task] = set()
+        next_unit: Optional[asyncio.Future] = None  # Awaiting the async source
+        exhausted = False
+
+        def start(unit: WorkUnit):
+            pending.add(asyncio.create_task(self._run_unit(unit, review_stats)))
+            self.stats.scheduled += 1
+            review_stats.scheduled += 1
+
+        try:
+            while True:
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+
+                if is_async:
+                    if not exhausted and next_unit is None and len(pending) < limit:
+                        next_unit = asyncio.ensure_future(remaining.__anext__())
+                else:
+                    while not exhausted and len(pending) < limit:
+                        unit = next(remaining, None)
+                        if unit is None:
+                            exhausted = True
+                            break
+                        start(unit)
+
+                waiting = pending | {next_unit} if next_unit else pending
+                if not waiting:
+                    break
+
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if next_unit in done:
+                    done.discard(next_unit)
+                    try:
+                        start(next_unit.result())
+                    except StopAsyncIteration:
+                        exhausted = True
+                    finally:
+                        next_unit = None
+                pending -= done
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if next_unit:
+                next_unit.cancel()
+
+    async def _run_unit(self, unit: WorkUnit, review_stats: SchedulerStats) -> Any:
+        """Wait for a global slot and run a unit"""
+        enqueued_at = time.monotonic()
+        queued = True
+        self.queue_depth += 1
+        try:
+            async with self._slots:
+                queued = False
+                self.queue_depth -= 1
+                wait = time.monotonic() - enqueued_at
+                self.stats.record_wait(wait)
+                review_stats.record_wait(wait)
+                record_stage("scheduler_wait", wait)
+                self.running += 1
+                try:
+                    return await unit()
+                finally:
+                    self.running -= 1
+                    self.stats.completed += 1
+                    review_stats.completed += 1
+        finally:
+            if queued:  # Cancelled while still waiting for a slot
+                self.queue_depth -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get global scheduler statistics"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.queue_depth,
+            'running': self.running,
+            **self.stats.to_dict()
+        }
+
+_review_scheduler: Optional[ReviewScheduler] = None
+
+def get_review_scheduler() -> ReviewScheduler:
+    """Get the process-wide review scheduler"""
+    global _review_scheduler
+    if _review_scheduler is None:
+        _review_scheduler = ReviewScheduler()
+        get_metrics().add_collector(_collect_metrics)
+    return _review_scheduler
+
+SCHEDULER_UNITS = get_metrics().gauge("codelion_scheduler_units", "Agent calls running or waiting for a slot", ["state"])
+
+def _collect_metrics():
+    SCHEDULER_UNITS.set(_review_scheduler.running, state="running")
+    SCHEDULER_UNITS.set(_review_scheduler.queue_depth, state="queued")
@@ -0,0 +1,326 @@
+from typing import Dict, Any, Iterable, List, Optional, Set
+import ast
+import io
+import re
+import textwrap
+import tokenize
+from app.agents.diff import ParsedPatch
+
+# Changes that touch security-sensitive APIs or data
+_SECURITY_SIGNALS = re.compile(r"""
+    \b(?:select|insert|update|delete)\b[^\n]{0,80}\b(?:from|into|set|where)\b
+  | \b(?:execute|executemany|raw|cursor)\s*\(
+  | \b(?:eval|exec|compile|system|popen|spawn)\s*\(
+  | \bsubprocess\b | shell\s*=\s*True | child_process
+  | \b(?:pickle|marshal|shelve)\b | yaml\.load\b | \bdeserializ
+  | \b(?:md5|sha1|hashlib|hmac|bcrypt|scrypt|argon2|cipher|aes|rsa|jwt|ssl|tls|crypto\w*)\b
+  | \b(?:password|passwd|secret|token|api_?key|private_?key|credential)s?\b
+  | \brandom\b
+  | \b(?:innerHTML|outerHTML|dangerouslySetInnerHTML|document\.write)\b
+  | verify\s*=\s*False | rejectUnauthorized
+  | \b(?:auth\w*|login|logout|session|cookie|csrf|cors|permission|sanitiz\w*|escape)\b
+  | \b(?:request|req)\.(?:args|form|params|query|body|json|files|headers|GET|POST)\b
+  | \bopen\s*\( | \b(?:os\.path|pathlib|send_file|redirect)\b
+  | https?://
+""", re.IGNORECASE | re.VERBOSE)
+
+# Paths where any change deserves a security pass
+_SECURITY_PATHS = re.compile(r"""
+    (?:^|/)(?:auth|login|security|crypto|permissions?|middleware|config|settings)
+  | (?:^|/)\.env | (?:^|/)Dockerfile | docker-compose | \.github/workflows/
+  | (?:^|/)(?:requirements[^/]*\.txt|package\.json|pyproject\.toml|setup\.py|Pipfile|go\.mod|Cargo\.toml)$
+""", re.IGNORECASE | re.VERBOSE)
+
+# Calls that do I/O or block; expensive inside a loop
+_IO_SIGNALS = re.compile(r"""
+    \b(?:select|insert|update|delete)\b[^\n]{0,80}\b(?:from|into|set|where)\b
+  | \.(?:execute|executemany|query|filter|filter_by|all|first|get_or_create|save|commit|fetch\w*|find\w*)\s*\(
+  | \b(?:requests|httpx|urllib|aiohttp|axios|fetch|socket)\b
+  | \b(?:open|read|readlines|write|sleep|urlopen)\s*\(
+  | \bawait\b
+""", re.IGNORECASE | re.VERBOSE)
+
+# Patterns worth a performance pass even outside a loop
+_PERFORMANCE_SIGNALS = re.compile(r"""
+    \b(?:sorted|sort|deepcopy|re\.compile|RegExp|lru_cache|cache|memo\w*)\b
+  | \b(?:json\.loads|json\.dumps|JSON\.parse|JSON\.stringify)\b
+  | \b(?:thread\w*|asyncio|multiprocessing|pool|semaphore|lock)\b
+  | \bn\s*\*\*\s*2\b | \bO\(n
+""", re.IGNORECASE | re.VERBOSE)
+
+_LOOP_SIGNALS = re.compile(r'\b(?:for|while)\b|\.(?:map|forEach|reduce|flatMap|each)\s*\(')
+
+_IO_CALL_NAMES = {
+    'execute', 'executemany', 'query', 'filter', 'filter_by', 'all', 'first', 'commit', 'save',
+    'get', 'post', 'put', 'patch', 'delete', 'request', 'urlopen', 'fetch', 'fetchall', 'fetchone',
+    'open', 'read', 'readlines', 'write', 'sleep', 'send', 'recv', 'connect'
+}
+
+# Line-comment prefixes by language, for the comment-only check
+_COMMENT_PREFIXES = {
+    'python': ('#',), 'ruby': ('#',), 'bash': ('#',), 'yaml': ('#',), 'r': ('#',),
+    'make': ('#',), 'dockerfile': ('#',), 'perl': ('#',),
+    'sql': ('--',),
+    'javascript': ('//', '/*', '*'), 'typescript': ('//', '/*', '*'), 'java': ('//', '/*', '*'),
+    'c': ('//', '/*', '*'), 'cpp': ('//', '/*', '*'), 'csharp': ('//', '/*', '*'), 'go': ('//', '/*', '*'),
+    'rust': ('//', '/*', '*'), 'php': ('//', '#', '/*', '*'), 'swift': ('//', '/*', '*'),
+    'kotlin': ('//', '/*', '*'), 'scala': ('//', '/*', '*'), 'groovy': ('//', '/*', '*'),
+    'css': ('/*', '*'), 'scss': ('//', '/*', '*'), 'sass': ('//', '/*'), 'less': ('//', '/*', '*'),
+    'html': ('<!--',), 'xml': ('<!--',), 'matlab': ('%',)
+}
+
+# Prose and data files have nothing for the security or performance agents
+_PROSE_LANGUAGES = {'markdown', 'text'}
+_DATA_LANGUAGES = {'json', 'yaml', 'xml', 'css', 'scss', 'sass', 'less', 'html'}
+
+# Languages where leading whitespace is part of the code
+_INDENT_SENSITIVE = {'python', 'yaml', 'make', 'sass'}
+
+# NL only breaks a line inside brackets, NEWLINE ends a statement and is kept;
+# INDENT and DEDENT are kept too, re-indenting Python changes its meaning
+_SKIPPABLE_TOKENS = {tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+# Tokens for languages without a tokenizer at hand: string literals are kept
+# whole, so whitespace inside them stays significant (unterminated ones run
+# to the end of the line), then words and single symbols
+_TOKEN = re.compile(r"""
+    "(?:\\.|[^"\\])*"? | '(?:\\.|[^'\\])*'? | `(?:\\.|[^`\\])*`?
+  | \w+ | \S
+""", re.VERBOSE)
+
+class TriageDecision:
+    """Which agents a file was routed to, and why"""
+
+    __slots__ = ('file_path', 'agents', 'skipped', 'reasons')
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.agents: Set[str] = set()
+        self.skipped: Set[str] = set()
+        self.reasons: Dict[str, str] = {}
+
+    def route(self, agent_name: str, reason: str):
+        self.agents.add(agent_name)
+        self.reasons[agent_name] = reason
+
+    def skip(self, agent_name: str, reason: str):
+        self.skipped.add(agent_name)
+        self.reasons[agent_name] = reason
+
+    def wants(self, agent_name: str) -> bool:
+        """Check whether the agent should see this file; unknown agents always do"""
+        return agent_name not in self.skipped
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'file_path': self.file_path,
+            'agents': sorted(self.agents),
+            'skipped': sorted(self.skipped),
+            'reasons': self.reasons
+        }
+
+class TriageStats:
+    """Skip-rate and shadow-mode recall counters"""
+
+    def __init__(self):
+        self.files = 0
+        self.pairs = 0
+        self.skipped_pairs = 0
+        self.shadow_findings = 0
+        self.shadow_missed = 0
+
+    def record(self, decisions: Iterable[TriageDecision], agent_count: int):
+        for decision in decisions:
+            self.files += 1
+            self.pairs += agent_count
+            self.skipped_pairs += len(decision.skipped)
+
+    def record_shadow(self, findings: int, missed: int):
+        self.shadow_findings += findings
+        self.shadow_missed += missed
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = {
+            'files': self.files,
+            'pairs': self.pairs,
+            'skipped_pairs': self.skipped_pairs,
+            'skip_rate': round(self.skipped_pairs / self.pairs, 3) if self.pairs else 0.0
+        }
+        if self.shadow_findings:
+            stats['shadow_findings'] = self.shadow_findings
+            stats['shadow_missed'] = self.shadow_missed
+            stats['recall'] = round(1 - self.shadow_missed / self.shadow_findings, 3)
+        return stats
+
+class StaticTriage:
+    """Cheap local pre-pass that decides which agents each file needs.
+
+    Looks only at the changed lines: whitespace-only changes go to no agent,
+    comment-only changes and prose only to the style agent. Security and
+    performance are routed on regex signals, plus an ``ast`` walk for
+    Python loops that do I/O when the added code parses on its own. Agents
+    the rules don't know about always run.
+    """
+
+    def __init__(self):
+        self.stats = TriageStats()
+
+    def route(self, file_path: str, language: str, patch: str,
+              parsed: Optional[ParsedPatch] = None) -> TriageDecision:
+        """Decide which agents should review a file; pass ``parsed`` to reuse a parse of the patch"""
+        decision = TriageDecision(file_path)
+        parsed = parsed or ParsedPatch(patch)
+        if parsed.hunks:
+            added, removed = parsed.changed_lines()
+        else:
+            added, removed = patch.split('\n'), []  # Not a unified diff; treat it all as new
+
+        if _whitespace_key(added, language) == _whitespace_key(removed, language):
+            for agent_name in ('security', 'performance', 'style'):
+                decision.skip(agent_name, 'whitespace-only change')
+            return decision
+
+        if _code_text(added, language) == _code_text(removed, language):
+            decision.route('style', 'comment-only change')
+            decision.skip('security', 'comment-only change')
+            decision.skip('performance', 'comment-only change')
+            return decision
+
+        decision.route('style', 'code change')
+        added_text = '\n'.join(added)
+
+        signal = _SECURITY_SIGNALS.search(added_text) if language not in _PROSE_LANGUAGES else None
+        if _SECURITY_PATHS.search(file_path):
+            decision.route('security', 'sensitive path')
+        elif signal:
+            decision.route('security', 'security signal: ' + signal.group(0).strip()[:40])
+        else:
+            decision.skip('security', 'no security signals')
+
+        if language in _PROSE_LANGUAGES or language in _DATA_LANGUAGES:
+            decision.skip('performance', f'{language} file')
+        else:
+            reason = self._performance_reason(added, added_text, language)
+            if reason:
+                decision.route('performance', reason)
+            else:
+                decision.skip('performance', 'no performance signals')
+
+        return decision
+
+    def _performance_reason(self, added: List[str], added_text: str, language: str) -> Optional[str]:
+        """Find a reason the performance agent should look at the added code"""
+        if language == 'python':
+            tree = _parse_python(added)
+            if tree is not None:
+                reason = _python_loop_reason(tree)
+                if reason:
+                    return reason
+            elif _LOOP_SIGNALS.search(added_text) and _IO_SIGNALS.search(added_text):
+                return 'loop with I/O'
+        elif _LOOP_SIGNALS.search(added_text) and _IO_SIGNALS.search(added_text):
+            return 'loop with I/O'
+
+        match = _IO_SIGNALS.search(added_text) or _PERFORMANCE_SIGNALS.search(added_text)
+        if match:
+            return 'performance signal: ' + match.group(0).strip()[:40]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get skip-rate and recall statistics"""
+        return self.stats.to_dict()
+
+def _whitespace_key(lines: List[str], language: str) -> Any:
+    """Key that is equal for two sets of lines differing only in insignificant whitespace.
+
+    Whitespace between tokens is dropped, but not whitespace inside string
+    literals, line breaks that end a statement, or indentation where the
+    language cares about it.
+    """
+    if language == 'python':
+        tokens = _python_tokens(lines, keep_comments=True)
+        if tokens is not None:
+            return tokens
+    return _line_tokens(lines, language)
+
+def _code_text(lines: List[str], language: str) -> Any:
+    """Like ``_whitespace_key``, with comments left out as well"""
+    if language == 'python':
+        tokens = _python_tokens(lines, keep_comments=False)
+        if tokens is not None:
+            return tokens
+
+    prefixes = _COMMENT_PREFIXES.get(language)
+    if prefixes:
+        lines = [line for line in lines if not line.strip().startswith(prefixes)]
+    return _line_tokens(lines, language)
+
+def _python_tokens(lines: List[str], keep_comments: bool) -> Optional[List[Any]]:
+    """Python tokens of the lines, or None if the fragment doesn't tokenize"""
+    source = textwrap.dedent('\n'.join(lines))
+    # Dedenting hides a shift of the whole fragment, so keep its size
+    first = next((line for line in source.split('\n') if line.strip()), '')
+    shift = len(next((line for line in lines if line.strip()), '')) - len(first)
+    key: List[Any] = [shift]
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source + '\n').readline):
+            if token.type in _SKIPPABLE_TOKENS or (token.type == tokenize.COMMENT and not keep_comments):
+                continue
+            # How wide an indent is doesn't matter, only where blocks open and close
+            string = '' if token.type in (tokenize.INDENT, tokenize.DEDENT) else token.string
+            key.append((token.type, string))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    return key
+
+def _line_tokens(lines: List[str], language: str) -> List[Any]:
+    """Tokens of each non-blank line, with indentation where it is significant"""
+    indent_sensitive = language in _INDENT_SENSITIVE
+    key: List[Any] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        tokens = tuple(_TOKEN.findall(line))
+        key.append((len(line) - len(line.lstrip()), tokens) if indent_sensitive else tokens)
+    return key
+
+def _parse_python(lines: List[str]) -> Optional[ast.AST]:
+    """Parse added Python lines if they form valid code on their own"""
+    try:
+        return ast.parse(textwrap.dedent('\n'.join(lines)))
+    except (SyntaxError, ValueError):
+        return None
+
+def _call_name(node: ast.Call) -> str:
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return ''
+
+def _python_loop_reason(tree: ast.AST) -> Optional[str]:
+    """Find loops that do I/O or contain another loop"""
+    loop_types = (ast.For, ast.AsyncFor, ast.While, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+    for node in ast.walk(tree):
+        if not isinstance(node, loop_types):
+            continue
+        for child in ast.walk(node):
+            if child is node:
+                continue
+            if isinstance(child, (ast.Await, ast.AsyncWith)):
+                return 'loop with I/O'
+            if isinstance(child, ast.Call) and _call_name(child) in _IO_CALL_NAMES:
+                return 'loop with I/O'
+            if isinstance(child, (ast.For, ast.AsyncFor, ast.While)):
+                return 'nested loop'
+    return None
+
+_static_triage: Optional[StaticTriage] = None
+
+def get_static_triage() -> StaticTriage:
+    """Get the process-wide triage pass"""
+    global _static_triage
+    if _static_triage is None:
+        _static_triage = StaticTriage()
+    return _static_triage
@@ -28,6 +28,9 @@ class ConnectRepositoryRequest(BaseModel):
     owner: str
     repo: str
 
+class IgnorePatternsRequest(BaseModel):
+    patterns: List[str]
+
 @router.get("/", response_model=List[RepositoryResponse])
 async def get_repositories(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -188,3 +191,39 @@ async def disconnect_repository(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+@router.put("/{repository_id}/ignore-patterns")
+async def update_ignore_patterns(
+    repository_id: int,
+    request: IgnorePatternsRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Set the path globs that are never sent to the review agents"""
+    try:
+        user_id = auth_service.get_current_user_id(credentials.credentials)
+        
+        repository = db.query(Repository).filter(
+            Repository.id == repository_id,
+            Repository.owner_id == user_id
+        ).first()
+        
+        if not repository:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Repository not found"
+            )
+        
+        patterns = [pattern.strip() for pattern in request.patterns if pattern.strip()]
+        repository.review_ignore_patterns = patterns
+        db.commit()
+        
+        return {"message": "Ignore patterns updated", "patterns": patterns}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
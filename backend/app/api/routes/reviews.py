@@ -5,7 +5,10 @@ from app.core.database import get_db
 from app.models.review import Review, ReviewComment
 from app.models.repository import Repository
 from app.models.user import User
+from app.models.finding import FindingState
 from app.services.auth import AuthService
+from app.services.finding_index import get_finding_index
+from app.agents.dedup import history_entries
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -33,6 +36,9 @@ class ReviewCommentResponse(BaseModel):
     severity: str
     created_at: str
 
+class FindingStateRequest(BaseModel):
+    state: FindingState
+
 class ReviewDetailResponse(ReviewResponse):
     comments: List[ReviewCommentResponse]
     agent_runs: List[dict]
@@ -154,6 +160,59 @@ async def get_review_detail(
             detail=str(e)
         )
 
+@router.put("/{review_id}/comments/{comment_id}/state")
+async def update_finding_state(
+    review_id: int,
+    comment_id: int,
+    request: FindingStateRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Mark a finding as ignored, so later PRs don't raise it again, or as resolved, so they raise it if it comes back"""
+    try:
+        user_id = auth_service.get_current_user_id(credentials.credentials)
+        
+        comment = db.query(ReviewComment).join(Review).join(Repository).filter(
+            ReviewComment.id == comment_id,
+            ReviewComment.review_id == review_id,
+            Repository.owner_id == user_id
+        ).first()
+        
+        if not comment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Comment not found"
+            )
+        
+        if not comment.fingerprint or not comment.context_hash:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Comment has no finding history"
+            )
+        
+        # A collapsed finding is keyed at each location it was reported
+        finding = {
+            "fingerprint": comment.fingerprint,
+            "context_hash": comment.context_hash,
+            "file_path": comment.file_path,
+            "locations": comment.locations
+        }
+        get_finding_index().set_state(
+            db, comment.review.repository_id,
+            [(entry["fingerprint"], entry["context_hash"]) for entry in history_entries(finding)], request.state
+        )
+        db.commit()
+        
+        return {"message": "Finding state updated", "state": request.state.value}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @router.get("/stats/summary")
 async def get_review_stats(
     credentials: HTTPAuthorizationCredentials = Depends(security),
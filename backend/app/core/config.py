@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Database
@@ -15,6 +15,21 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379"
     
+    # Review queue
+    review_queue_backend: str = "redis"  # redis, memory; also backs coalescing and rate limits
+    review_queue_name: str = "codelion:reviews"
+    review_queue_max_attempts: int = 3
+    review_queue_visibility_timeout: int = 900  # seconds
+    review_queue_retry_backoff: int = 30  # seconds, doubled on each retry
+    review_queue_shards: int = 16  # repositories hash onto these; only change with the queue drained
+    review_worker_concurrency: int = 4
+    review_worker_processes: int = 1  # worker processes per node started by app.worker
+    review_worker_steal_after: float = 5.0  # seconds a job waits before an idle worker takes it from its owner
+    review_worker_membership_ttl: float = 30.0  # seconds before a silent worker's shards move to others
+    review_worker_drain_timeout: float = 600.0  # seconds in-flight jobs get to finish on shutdown
+    review_debounce_seconds: float = 10.0  # wait for bursts of pushes to settle
+    review_supersede_poll_interval: float = 5.0  # seconds between head checks
+    
     # Security
     secret_key: str  # Used by auth.py
     algorithm: str = "HS256"  # Used by auth.py
@@ -33,9 +48,66 @@ class Settings(BaseSettings):
     # GitHub OAuth
     github_client_id: Optional[str] = None
     github_client_secret: Optional[str] = None
+    github_token: Optional[str] = None  # API token; without one the OAuth app credentials are used
+    github_api_url: str = "https://api.github.com"  # https://<host>/api/v3 for GitHub Enterprise
+    github_max_connections: int = 20  # pooled keep-alive connections per process
+    github_timeout: float = 30.0  # seconds per request
+    github_per_page: int = 100  # list page size, GitHub's maximum
+    github_page_prefetch: int = 4  # pages of a list downloaded ahead of the code reading it
+    github_rate_limit_max_wait: float = 60.0  # seconds to wait for a rate-limit reset before failing
+    github_review_max_comments: int = 50  # inline comments per submitted review; more are split across reviews
+    github_cache_enabled: bool = True  # revalidate repeated GETs with ETags; 304s do not use rate limit
+    github_cache_max_bytes: int = 64 * 1024 * 1024  # response bodies kept in process
+    github_cache_ttl: int = 24 * 3600  # seconds responses stay in the Redis tier
+    github_cache_redis: bool = False  # share cached responses between workers through Redis
+    github_budget_slowdown: float = 0.3  # below this share of the rate limit, low-priority requests are paced
+    github_budget_reserve: float = 0.1  # share of the rate limit low-priority requests never use
     
     # Gemini AI
     gemini_api_key: Optional[str] = None  # Used by gemini.py
+    gemini_model: str = "gemini-pro"
+    gemini_max_concurrency: int = 16  # requests in flight per process
+    gemini_async_client: bool = True  # False runs the sync SDK on a dedicated executor
+    gemini_executor_threads: int = 8
+    gemini_requests_per_minute: int = 60  # shared by all workers
+    gemini_tokens_per_minute: int = 120000  # shared by all workers
+    gemini_expected_output_tokens: int = 1024  # reserved per request
+    gemini_max_retries: int = 4
+    gemini_backoff_base: float = 1.0  # seconds
+    gemini_backoff_max: float = 30.0  # seconds
+    
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 2048
+    llm_cache_ttl: int = 7 * 24 * 3600  # seconds
+    llm_cache_redis: bool = False  # share cached responses across workers
+    
+    # Review scheduling
+    review_max_concurrency: int = 32  # agent calls in flight per process
+    review_per_review_concurrency: int = 8  # agent calls in flight per review
+    review_batching_enabled: bool = True  # pack small files into shared prompts
+    review_batch_token_budget: int = 6000  # diff tokens per batched prompt
+    review_batch_max_file_tokens: int = 1500  # larger files are reviewed alone
+    review_file_buffer: int = 64  # streamed PR files read ahead of the agents
+    review_chunk_max_chars: int = 24000  # oversized patches are split into chunks
+    review_chunk_overlap_lines: int = 3  # context lines repeated across chunks
+    review_deadline_seconds: float = 300.0  # 0 disables the deadline
+    review_listing_drain_seconds: float = 10.0  # after the deadline, time spent listing the files left unread
+    review_followup_on_timeout: bool = True  # queue timed-out files for another pass
+    review_followup_delay: float = 60.0  # seconds
+    review_max_followups: int = 1
+    review_ignore_patterns: List[str] = []  # globs never sent to the agents, for every repository
+    review_triage_mode: str = "enforce"  # enforce, shadow (route everything, measure recall) or off
+    review_dedup_enabled: bool = True  # collapse duplicate findings across agents and files
+    review_dedup_threshold: float = 0.7  # MinHash similarity above which findings are duplicates
+    review_suppress_repeats: bool = True  # skip findings raised on earlier PRs or dismissed
+    finding_index_refresh_seconds: float = 300.0  # rebuild per-repository Bloom filters this often
+    review_json_output: bool = True  # ask agents for JSON findings; prose is still parsed as a fallback
+    
+    # Metrics
+    metrics_enabled: bool = True  # stage timings for /metrics and the review logs
+    metrics_max_series: int = 2000  # label sets per metric; the rest are folded into "other"
+    metrics_worker_port: int = 9100  # review workers serve /metrics here, pool process N on port + N; 0 disables
     
     # App
     app_name: str = "CodeLion"
@@ -0,0 +1,260 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import time
+from app.core.config import settings
+
+# Seconds; covers fast parses through slow multi-chunk Gemini calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Label value used once a metric has too many label sets
+OVERFLOW_LABEL = "other"
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values) if value]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    """A named family of series, one per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], max_series: int):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        key = tuple(str(labels.get(name) or "") for name in self.labels)
+        if key not in self._series and len(self._series) >= self.max_series:
+            # Unbounded label values (repositories) must not grow memory without limit
+            key = tuple(OVERFLOW_LABEL if value else "" for value in key)
+        return key
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._series.items()):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._series[self._key(labels)] = value
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each series is [bucket counts..., overflow, sum, count]"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], max_series: int,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 3)
+        # Counted in its own bucket only; made cumulative when rendered
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def _render_series(self, key: Tuple[str, ...], series: List[float]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series):
+            cumulative += count
+            bucket = _format_labels(self.labels, key, 'le="%s"' % bound)
+            lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+        bucket = _format_labels(self.labels, key, 'le="+Inf"')
+        labels = _format_labels(self.labels, key)
+        lines.append(f"{self.name}_bucket{bucket} {series[-1]}")
+        lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+        lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text format.
+
+    Recording is a dict update and, for histograms, a bisect over the
+    buckets, so it is cheap enough to leave on. Each worker process keeps
+    its own registry; Prometheus sums them when scraping several processes.
+    """
+
+    def __init__(self, max_series: Optional[int] = None):
+        self.max_series = max_series or settings.metrics_max_series
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels, self.max_series))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels, self.max_series))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, self.max_series, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that updates gauges just before each render"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Serve the metrics over plain HTTP, for processes without a web app"""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = self.render().encode()
+                writer.write(
+                    f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPE}; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+_registry: Optional[MetricsRegistry] = None
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+STAGE_SECONDS = get_metrics().histogram(
+    "codelion_stage_duration_seconds", "Time spent in each review stage", ["stage", "agent"]
+)
+STAGE_ERRORS = get_metrics().counter(
+    "codelion_stage_errors_total", "Review stages that raised", ["stage", "agent"]
+)
+
+class Trace:
+    """Stage timings collected over one review.
+
+    Spans inside the review add to it through a context variable, which
+    tasks created by the review inherit. Concurrent spans of the same stage
+    overlap, so a stage's total can exceed the review's wall time.
+    """
+
+    __slots__ = ('name', 'started', 'stages')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # stage -> [seconds, count]
+
+    def add(self, stage: str, seconds: float):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'elapsed_ms': int(self.elapsed() * 1000),
+            'stages': {
+                stage: {'ms': int(seconds * 1000), 'count': count}
+                for stage, (seconds, count) in self.stages.items()
+            }
+        }
+
+    def format(self) -> str:
+        """One-line stage breakdown for the logs"""
+        stages = ", ".join(
+            f"{stage} {seconds:.2f}s" + (f" x{count}" if count > 1 else "")
+            for stage, (seconds, count) in sorted(self.stages.items(), key=lambda item: -item[1][0])
+        )
+        return f"{self.name} took {self.elapsed():.2f}s ({stages})"
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("codelion_trace", default=None)
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Collect the spans run inside the block into a new Trace"""
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+def record_stage(stage: str, seconds: float, agent: str = ""):
+    """Record time spent in a stage that was measured elsewhere"""
+    if not settings.metrics_enabled:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage, agent=agent)
+    current = _current_trace.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+@contextmanager
+def span(stage: str, agent: str = ""):
+    """Time a stage into the stage histogram and the current trace, if any"""
+    if not settings.metrics_enabled:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage, agent=agent)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - started, agent)
@@ -1,15 +1,15 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from fastapi.security import HTTPBearer
 import uvicorn
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.metrics import CONTENT_TYPE, get_metrics
 from app.api.routes import auth, repositories, reviews, webhooks
-from app.agents.registry import AgentRegistry
+from app.agents.registry import get_agent_registry
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic: run "alembic upgrade head" before starting
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -30,22 +30,30 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
-# Initialize agent registry
-agent_registry = AgentRegistry()
-
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(repositories.router, prefix="/api/repositories", tags=["repositories"])
 app.include_router(reviews.router, prefix="/api/reviews", tags=["reviews"])
 app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 
+@app.on_event("shutdown")
+async def close_clients():
+    """Close pooled outbound connections"""
+    from app.services.github import close_http_client
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "CodeLion API is running! 🦁"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "agents": len(agent_registry.agents)}
+    return {"status": "healthy", "agents": len(get_agent_registry().agents)}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this process"""
+    return Response(get_metrics().render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,5 +2,6 @@ from .user import User
 from .repository import Repository
 from .review import Review, ReviewComment
 from .agent import AgentRun
+from .finding import FindingRecord
 
-__all__ = ["User", "Repository", "Review", "ReviewComment", "AgentRun"]
+__all__ = ["User", "Repository", "Review", "ReviewComment", "AgentRun", "FindingRecord"]
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy.sql import func
+import enum
+from app.core.database import Base
+
+class FindingState(str, enum.Enum):
+    POSTED = "posted"
+    RESOLVED = "resolved"
+    IGNORED = "ignored"
+
+class FindingRecord(Base):
+    """A finding raised on some PR of a repository, keyed by text and code context"""
+    __tablename__ = "finding_history"
+    __table_args__ = (
+        UniqueConstraint("repository_id", "fingerprint", "context_hash", name="uq_finding_history_key"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    repository_id = Column(Integer, ForeignKey("repositories.id"), index=True)
+    fingerprint = Column(String, nullable=False)  # Normalized finding text, see agents/dedup.py
+    context_hash = Column(String, nullable=False)  # Code around the finding's line
+    state = Column(Enum(FindingState), default=FindingState.POSTED)
+    file_path = Column(String)  # Where it was last raised
+    review_id = Column(Integer, ForeignKey("reviews.id"))  # Review it was last posted in
+    occurrences = Column(Integer, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
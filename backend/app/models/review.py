@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -26,6 +26,8 @@ class Review(Base):
     status = Column(Enum(ReviewStatus), default=ReviewStatus.PENDING)
     summary = Column(Text)
     confidence_score = Column(Integer)  # 0-100
+    last_reviewed_sha = Column(String)  # PR head commit of the last completed review
+    file_shas = Column(JSON)  # file path -> blob SHA at last_reviewed_sha
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -44,6 +46,9 @@ class ReviewComment(Base):
     comment_type = Column(Enum(ReviewType))
     content = Column(Text)
     severity = Column(String)  # low, medium, high, critical
+    fingerprint = Column(String, index=True)  # Normalized-text hash shared by duplicate findings
+    context_hash = Column(String)  # Code around the finding, with fingerprint keys finding_history
+    locations = Column(JSON)  # Every [{file_path, line_number, agent_name, fingerprint, context_hash}] the finding was reported at
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -1,5 +1,17 @@
-from .gemini import GeminiService
-from .github import GitHubService
-from .auth import AuthService
+from importlib import import_module
 
-__all__ = ["GeminiService", "GitHubService", "AuthService"]
+# Imported on first access, so a review worker does not load the web stack
+# AuthService pulls in, and nothing loads the SDKs until a service is used
+_EXPORTS = {
+    "GeminiService": ".gemini",
+    "GitHubService": ".github",
+    "AuthService": ".auth",
+    "ReviewQueue": ".queue",
+}
+
+__all__ = ["GeminiService", "GitHubService", "AuthService", "ReviewQueue"]
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
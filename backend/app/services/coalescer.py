@@ -0,0 +1,143 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Awaitable, Optional, Tuple
+import asyncio
+import redis.asyncio as redis
+from app.core.config import settings
+
+PullRequestKey = Tuple[Any, Any]  # (repository id, PR number)
+
+class ReviewSuperseded(Exception):
+    """Raised when a newer head commit replaced the one being reviewed"""
+    pass
+
+class HeadStore(ABC):
+    """Remembers the newest head commit seen for each pull request"""
+
+    @abstractmethod
+    async def set_latest(self, key: str, head_sha: str, updated_at: str) -> bool:
+        """Record a head commit unless a newer one is already stored"""
+        pass
+
+    @abstractmethod
+    async def get_latest(self, key: str) -> Optional[str]:
+        """Get the newest head commit"""
+        pass
+
+class InMemoryHeadStore(HeadStore):
+    """In-process store for tests and single-process development"""
+
+    def __init__(self):
+        self._heads: Dict[str, Tuple[str, str]] = {}
+
+    async def set_latest(self, key: str, head_sha: str, updated_at: str) -> bool:
+        current = self._heads.get(key)
+        if current and current[1] > updated_at:
+            return False
+        self._heads[key] = (head_sha, updated_at)
+        return True
+
+    async def get_latest(self, key: str) -> Optional[str]:
+        current = self._heads.get(key)
+        return current[0] if current else None
+
+# Only overwrite the stored head if the event is not older than it. GitHub
+# does not guarantee delivery order, so compare the PR's updated_at.
+_SET_LATEST_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'updated_at')
+if current and current > ARGV[2] then return 0 end
+redis.call('HSET', KEYS[1], 'sha', ARGV[1], 'updated_at', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+class RedisHeadStore(HeadStore):
+    """Redis store shared by the API and all worker processes"""
+
+    def __init__(self, url: str, prefix: str, ttl: int = 7 * 24 * 3600):
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.ttl = ttl
+        self._set_latest = self.client.register_script(_SET_LATEST_SCRIPT)
+
+    async def set_latest(self, key: str, head_sha: str, updated_at: str) -> bool:
+        result = await self._set_latest(
+            keys=[f"{self.prefix}:{key}"],
+            args=[head_sha, updated_at, self.ttl]
+        )
+        return bool(result)
+
+    async def get_latest(self, key: str) -> Optional[str]:
+        return await self.client.hget(f"{self.prefix}:{key}", "sha")
+
+class ReviewCoalescer:
+    """Collapses bursts of pull request updates into a single review.
+
+    The webhook records every new head commit and queues the event with a
+    short delay. When a worker picks it up, events whose head is no longer
+    the newest are dropped, and a review that is already running is
+    cancelled as soon as a newer head shows up.
+    """
+
+    def __init__(self, store: Optional[HeadStore] = None,
+                 debounce_seconds: Optional[float] = None,
+                 poll_interval: Optional[float] = None):
+        self.store = store or _create_store()
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else settings.review_debounce_seconds
+        self.poll_interval = poll_interval or settings.review_supersede_poll_interval
+        self._running: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    @staticmethod
+    def make_key(repository_id: Any, pr_number: Any) -> str:
+        return f"{repository_id}:{pr_number}"
+
+    async def record_head(self, key: str, head_sha: str, updated_at: str = "") -> bool:
+        """Record the head commit of an incoming event"""
+        return await self.store.set_latest(key, head_sha, updated_at)
+
+    async def is_current(self, key: str, head_sha: str) -> bool:
+        """Check whether a head commit is still the newest one"""
+        latest = await self.store.get_latest(key)
+        return latest is None or latest == head_sha
+
+    async def run_latest(self, key: str, head_sha: str, review: Awaitable[Any]) -> Any:
+        """Run a review, cancelling it if a newer head commit arrives"""
+        # Cancel an outdated review of the same PR running in this process
+        previous = self._running.get(key)
+        if previous and previous[0] != head_sha:
+            previous[1].cancel()
+
+        task = asyncio.ensure_future(review)
+        self._running[key] = (head_sha, task)
+        watcher = asyncio.create_task(self._watch(key, head_sha, task))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled() and not await self.is_current(key, head_sha):
+                raise ReviewSuperseded(f"Review of {key}@{head_sha} superseded by a newer commit")
+            raise
+        finally:
+            watcher.cancel()
+            if self._running.get(key, (None, None))[1] is task:
+                del self._running[key]
+
+    async def _watch(self, key: str, head_sha: str, task: asyncio.Task):
+        """Cancel the review once another process records a newer head"""
+        while not task.done():
+            await asyncio.sleep(self.poll_interval)
+            if not await self.is_current(key, head_sha):
+                task.cancel()
+                return
+
+def _create_store() -> HeadStore:
+    if settings.review_queue_backend == "memory":
+        return InMemoryHeadStore()
+    return RedisHeadStore(settings.redis_url, f"{settings.review_queue_name}:head")
+
+_review_coalescer: Optional[ReviewCoalescer] = None
+
+def get_review_coalescer() -> ReviewCoalescer:
+    """Get the process-wide review coalescer"""
+    global _review_coalescer
+    if _review_coalescer is None:
+        _review_coalescer = ReviewCoalescer()
+    return _review_coalescer
@@ -0,0 +1,159 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import hashlib
+import math
+import time
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.finding import FindingRecord, FindingState
+
+FindingKey = Tuple[str, str]  # (fingerprint, context_hash)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing: k positions from two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+def _bloom_key(key: FindingKey) -> str:
+    return f"{key[0]}:{key[1]}"
+
+class FindingIndex:
+    """Per-repository index of findings raised on earlier PRs.
+
+    The ``finding_history`` table is the source of truth. Each repository
+    gets an in-memory Bloom filter of its keys, so findings that were never
+    seen before, which is most of them, cost no query at all. The rest are
+    fetched with one indexed query per review. Filters are rebuilt from the
+    table every ``finding_index_refresh_seconds`` to pick up records written
+    by other workers. Between refreshes the filter can miss those records, so
+    writes never trust it: keys are checked in the table before inserting.
+    """
+
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.finding_index_refresh_seconds
+        self._filters: Dict[int, Tuple[BloomFilter, float]] = {}
+        self.lookups = 0
+        self.filtered = 0
+        self.queries = 0
+
+    def _filter(self, db: Session, repository_id: int) -> BloomFilter:
+        """Get the repository's filter, loading it if missing, stale or full"""
+        entry = self._filters.get(repository_id)
+        if entry:
+            bloom, loaded_at = entry
+            if time.monotonic() - loaded_at < self.refresh_seconds and bloom.count < bloom.capacity:
+                return bloom
+
+        keys = db.query(FindingRecord.fingerprint, FindingRecord.context_hash).filter(
+            FindingRecord.repository_id == repository_id
+        ).all()
+        bloom = BloomFilter(max(1024, 2 * len(keys)))
+        for key in keys:
+            bloom.add(_bloom_key(tuple(key)))
+        self._filters[repository_id] = (bloom, time.monotonic())
+        return bloom
+
+    def lookup(self, db: Session, repository_id: int, keys: Iterable[FindingKey]) -> Dict[FindingKey, FindingRecord]:
+        """Get the history records that exist for these keys"""
+        bloom = self._filter(db, repository_id)
+        keys = set(keys)
+        candidates = {key for key in keys if _bloom_key(key) in bloom}
+        self.lookups += len(keys)
+        self.filtered += len(keys) - len(candidates)
+        if not candidates:
+            return {}
+
+        return self._fetch(db, repository_id, candidates)
+
+    def record_posted(self, db: Session, repository_id: int, review_id: int,
+                      findings: List[Dict[str, Any]], existing: Dict[FindingKey, FindingRecord]):
+        """Record findings as posted; the caller commits"""
+        bloom = self._filter(db, repository_id)
+        missing = {(finding['fingerprint'], finding['context_hash']) for finding in findings} - existing.keys()
+        if missing:
+            # Another worker may have written these since the filter was loaded
+            existing.update(self._fetch(db, repository_id, missing))
+
+        for finding in findings:
+            key = (finding['fingerprint'], finding['context_hash'])
+            record = existing.get(key)
+            if record is None:
+                record = self._insert(db, repository_id, key)
+                existing[key] = record
+                bloom.add(_bloom_key(key))
+            record.state = FindingState.POSTED
+            record.file_path = finding.get('file_path')
+            record.review_id = review_id
+            record.occurrences = (record.occurrences or 0) + 1
+
+    def _fetch(self, db: Session, repository_id: int, keys: Iterable[FindingKey]) -> Dict[FindingKey, FindingRecord]:
+        """Query the table for these keys, bypassing the filter"""
+        keys = set(keys)
+        self.queries += 1
+        records = db.query(FindingRecord).filter(
+            FindingRecord.repository_id == repository_id,
+            FindingRecord.fingerprint.in_({fingerprint for fingerprint, _ in keys})
+        ).all()
+        return {
+            (record.fingerprint, record.context_hash): record
+            for record in records
+            if (record.fingerprint, record.context_hash) in keys
+        }
+
+    def _insert(self, db: Session, repository_id: int, key: FindingKey) -> FindingRecord:
+        """Insert a history record, merging into the row a concurrent worker inserted first"""
+        record = FindingRecord(
+            repository_id=repository_id,
+            fingerprint=key[0],
+            context_hash=key[1],
+            occurrences=0
+        )
+        try:
+            with db.begin_nested():
+                db.add(record)
+        except IntegrityError:
+            record = self._fetch(db, repository_id, [key])[key]
+        return record
+
+    def set_state(self, db: Session, repository_id: int, keys: Iterable[FindingKey], state: FindingState):
+        """Move existing records to a new state; the caller commits"""
+        for record in self.lookup(db, repository_id, keys).values():
+            record.state = state
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get lookup counters"""
+        return {
+            'repositories': len(self._filters),
+            'lookups': self.lookups,
+            'filtered_by_bloom': self.filtered,
+            'queries': self.queries
+        }
+
+_finding_index: Optional[FindingIndex] = None
+
+def get_finding_index() -> FindingIndex:
+    """Get the process-wide finding index"""
+    global _finding_index
+    if _finding_index is None:
+        _finding_index = FindingIndex()
+    return _finding_index
@@ -1,50 +1,183 @@
-import google.generativeai as genai
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
 import asyncio
+import time
 from app.core.config import settings
+from app.core.metrics import get_metrics, record_stage
+from app.services.rate_limiter import AdaptiveRateLimiter
+
+class GeminiError(Exception):
+    """Raised when Gemini could not produce a response"""
+    pass
+
+class GeminiRateLimitError(GeminiError):
+    """Raised when Gemini kept throttling us after all retries"""
+    pass
+
+_genai = None
+
+def _load_genai():
+    """Import and configure the Gemini SDK on first use; with gRPC it takes most of a second"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.gemini_api_key)
+        _genai = genai
+    return _genai
+
+def _google_exceptions():
+    from google.api_core import exceptions as google_exceptions
+    return google_exceptions
+
+def _retryable_errors() -> Tuple[type, ...]:
+    """Errors worth retrying after a backoff; ResourceExhausted is the 429 case"""
+    google_exceptions = _google_exceptions()
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+    )
 
 class GeminiService:
-    def __init__(self):
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        else:
-            self.model = None
-    
+    """Process-wide Gemini client.
+
+    Calls go through the SDK's native async (gRPC asyncio) client, which
+    keeps one multiplexed connection open and reuses it. A semaphore caps the
+    number of requests in flight. Sync SDK calls, if any are needed, run on a
+    dedicated executor instead of the default one shared with the rest of the
+    process. Use ``get_gemini_service()`` rather than creating instances.
+
+    Every request first draws from the shared rate limiter. Throttled and
+    transient failures are retried with jittered backoff; anything else, or
+    running out of retries, raises ``GeminiError``.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        self.model_name = settings.gemini_model
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.max_concurrency = max_concurrency or settings.gemini_max_concurrency
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.gemini_executor_threads,
+            thread_name_prefix="gemini"
+        )
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self._model = None
+
+    @property
+    def model(self):
+        """The SDK model, created on first use; None without an API key"""
+        if self._model is None and settings.gemini_api_key:
+            self._model = _load_genai().GenerativeModel(self.model_name)
+        return self._model
+
+    async def _generate(self, prompt: str) -> str:
+        """Send a prompt to the model, retrying throttled and transient failures"""
+        if not self.model:
+            raise GeminiError("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
+
+        retryable_errors = _retryable_errors()
+        resource_exhausted = _google_exceptions().ResourceExhausted
+
+        # Same 4-characters-per-token estimate as the prompt packer
+        tokens = len(prompt) // 4 + settings.gemini_expected_output_tokens
+
+        for attempt in range(settings.gemini_max_retries + 1):
+            delay = await self.rate_limiter.acquire(tokens)
+            if delay:
+                record_stage("rate_limit_wait", delay)
+            if delay >= 1:
+                print(f"Gemini request delayed {delay:.1f}s by rate limiter")
+
+            try:
+                text = await self._call_model(prompt)
+            except retryable_errors as e:
+                if isinstance(e, resource_exhausted):
+                    self.rate_limiter.on_throttle()
+                if attempt == settings.gemini_max_retries:
+                    if isinstance(e, resource_exhausted):
+                        raise GeminiRateLimitError(f"Gemini rate limit exceeded: {e}") from e
+                    raise GeminiError(f"Gemini request failed: {e}") from e
+                await asyncio.sleep(self.rate_limiter.backoff(attempt))
+                continue
+            except Exception as e:
+                raise GeminiError(f"Gemini request failed: {e}") from e
+
+            self.rate_limiter.on_success()
+            return text
+
+    async def _call_model(self, prompt: str) -> str:
+        """Make one model call under the concurrency limit"""
+        self.waiting += 1
+        async with self._slots:
+            self.waiting -= 1
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                if settings.gemini_async_client:
+                    response = await self.model.generate_content_async(prompt)
+                else:
+                    loop = asyncio.get_running_loop()
+                    response = await loop.run_in_executor(self._executor, self.model.generate_content, prompt)
+                return response.text
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                self.requests += 1
+                self.total_latency += time.monotonic() - started
+
     async def generate_review(self, system_prompt: str, user_prompt: str) -> str:
         """Generate code review using Gemini"""
-        if not self.model:
-            return "Gemini API key not configured. Please set GEMINI_API_KEY environment variable."
-        
-        try:
-            # Combine system and user prompts
-            full_prompt = f"{system_prompt}\n\n{user_prompt}"
-            
-            # Generate response
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                full_prompt
-            )
-            
-            return response.text
-        except Exception as e:
-            return f"Error generating review: {str(e)}"
-    
+        # Combine system and user prompts
+        full_prompt = f"{system_prompt}\n\n{user_prompt}"
+        return await self._generate(full_prompt)
+
     async def generate_summary(self, text: str) -> str:
         """Generate a summary of the given text"""
-        if not self.model:
-            return "Gemini API key not configured."
-        
-        try:
-            prompt = f"Please provide a concise summary of the following text:\n\n{text}"
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
-            return response.text
-        except Exception as e:
-            return f"Error generating summary: {str(e)}"
-    
+        prompt = f"Please provide a concise summary of the following text:\n\n{text}"
+        return await self._generate(prompt)
+
     def is_configured(self) -> bool:
         """Check if Gemini is properly configured"""
-        return self.model is not None
+        return bool(settings.gemini_api_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection pool and request metrics"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_latency_ms': int(self.total_latency / self.requests * 1000) if self.requests else 0,
+            'executor_threads': settings.gemini_executor_threads,
+            'rate_limiter': self.rate_limiter.get_stats()
+        }
+
+_gemini_service: Optional[GeminiService] = None
+
+def get_gemini_service() -> GeminiService:
+    """Get the process-wide Gemini client"""
+    global _gemini_service
+    if _gemini_service is None:
+        _gemini_service = GeminiService()
+        get_metrics().add_collector(_collect_metrics)
+    return _gemini_service
+
+GEMINI_REQUESTS = get_metrics().gauge("codelion_gemini_requests", "Gemini requests in flight or waiting for a slot", ["state"])
+GEMINI_RATE = get_metrics().gauge("codelion_gemini_rate_limit", "Current adaptive Gemini rate limits", ["limit"])
+
+def _collect_metrics():
+    stats = _gemini_service.get_stats()
+    GEMINI_REQUESTS.set(stats['in_flight'], state="in_flight")
+    GEMINI_REQUESTS.set(stats['waiting'], state="waiting")
+    for name in ('rate_factor', 'requests_per_minute', 'tokens_per_minute'):
+        GEMINI_RATE.set(stats['rate_limiter'][name], limit=name)
@@ -1,118 +1,489 @@
-from github import Github
-from typing import Dict, Any, Optional
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, AsyncIterator, Deque, List, Optional
+import asyncio
+import re
+import time
 import httpx
 from app.core.config import settings
+from app.core.metrics import get_metrics, record_stage
+from app.services.github_cache import CachedResponse, GitHubResponseCache, get_github_cache
+
+GITHUB_REQUESTS = get_metrics().counter(
+    "codelion_github_requests_total", "GitHub API requests by response status", ["status"]
+)
+GITHUB_RATE_LIMIT = get_metrics().gauge(
+    "codelion_github_rate_limit", "GitHub API rate limit from the latest response", ["field"]
+)
+GITHUB_CACHE = get_metrics().counter(
+    "codelion_github_cache_total", "Cacheable GitHub GETs by outcome: revalidated (304), changed or miss", ["result"]
+)
+
+# Priority of the GitHub requests made in the current context; "low" ones
+# are paced when the rate-limit budget runs low
+_priority: ContextVar[str] = ContextVar("codelion_github_priority", default="normal")
+
+@contextmanager
+def github_priority(priority: str):
+    """Make the GitHub requests inside the block (and tasks it starts) "normal" or "low" priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+# <https://api.github.com/...&page=7>; rel="last"
+_LAST_PAGE = re.compile(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+def pull_request_model(pr: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the pull request data reviews work on from a GitHub pull request object.
+
+    Accepts the object from the REST API or from a ``pull_request`` webhook,
+    which carry the same fields, or a model built earlier by this function.
+    Files are not included; list them with ``iter_pull_request_files``.
+    """
+    repo_data = pr['base']['repo'] if 'base' in pr else pr['repository']
+    user = pr.get('user') or {}
+    return {
+        'id': pr['id'],
+        'number': pr['number'],
+        'title': pr['title'],
+        'body': pr.get('body') or '',
+        'state': pr['state'],
+        'created_at': pr['created_at'],
+        'updated_at': pr['updated_at'],
+        'head': {
+            'sha': pr['head']['sha'],
+            'ref': pr['head']['ref']
+        },
+        'user': {
+            'login': user.get('login'),
+            'id': user.get('id'),
+            'avatar_url': user.get('avatar_url')
+        },
+        'repository': {
+            'id': repo_data['id'],
+            'name': repo_data['name'],
+            'full_name': repo_data['full_name'],
+            'owner': {
+                'login': repo_data['owner']['login'],
+                'id': repo_data['owner']['id']
+            }
+        }
+    }
+
+class GitHubError(Exception):
+    """Raised when a GitHub API request fails"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class GitHubRateLimitError(GitHubError):
+    """Raised when the rate limit resets too far in the future to wait for"""
+    pass
+
+class RateLimit:
+    """Latest rate-limit headers seen, shared by every client using the same credentials"""
 
-class GitHubService:
     def __init__(self):
-        self.github = Github(settings.github_client_id, settings.github_client_secret)
-    
-    async def get_pull_request(self, owner: str, repo: str, pr_number: int) -> Dict[str, Any]:
-        """Get pull request data from GitHub"""
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None  # epoch seconds
+        self._next_low_priority = 0.0
+
+    def update(self, headers: httpx.Headers):
+        if "x-ratelimit-remaining" not in headers:
+            return
+        self.remaining = int(headers["x-ratelimit-remaining"])
+        self.limit = int(headers.get("x-ratelimit-limit", self.limit or 0))
+        self.reset = float(headers.get("x-ratelimit-reset", self.reset or 0))
+        GITHUB_RATE_LIMIT.set(self.remaining, field="remaining")
+        GITHUB_RATE_LIMIT.set(self.limit, field="limit")
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until requests may be made again; 0 while budget remains"""
+        if self.remaining != 0 or not self.reset:
+            return 0.0
+        return max(0.0, self.reset - now)
+
+    def pace(self, now: float) -> float:
+        """Delay before a low-priority request, spreading the spare budget until the reset.
+
+        Nothing is delayed while more than ``github_budget_slowdown`` of the
+        limit remains. Below that, low-priority requests are spaced so they
+        use up only what is above the ``github_budget_reserve`` share by the
+        reset; once the reserve is reached they wait for the reset.
+        """
+        if not self.limit or self.remaining is None or not self.reset or self.reset <= now:
+            return 0.0
+        if self.remaining >= settings.github_budget_slowdown * self.limit:
+            return 0.0
+        spare = self.remaining - settings.github_budget_reserve * self.limit
+        if spare < 1:
+            return self.reset - now
+        self._next_low_priority = max(now, self._next_low_priority) + (self.reset - now) / spare
+        return self._next_low_priority - now
+
+_http_client: Optional[httpx.AsyncClient] = None
+_rate_limit = RateLimit()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide pooled HTTP client for the GitHub API"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            # Requests beyond the pool wait for a free connection rather than failing
+            timeout=httpx.Timeout(settings.github_timeout, pool=None),
+            limits=httpx.Limits(
+                max_connections=settings.github_max_connections,
+                max_keepalive_connections=settings.github_max_connections
+            )
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the pooled HTTP client and its connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+class GitHubService:
+    """Async client for the GitHub REST API.
+
+    All instances share one pooled httpx client, so connections are kept
+    alive and reused across requests instead of blocking the event loop on
+    synchronous calls. Paginated lists read the last page from the Link
+    header of the first response and fetch the remaining pages concurrently,
+    a few ahead of the caller, so long listings can be streamed.
+
+    GETs go through a response cache and are sent with the cached ETag or
+    Last-Modified, so an unchanged resource comes back as a 304, which does
+    not count against the rate limit, and is answered from the cache.
+
+    Every response updates the shared rate-limit state. Once the budget is
+    spent, requests wait for the reset if it is within
+    ``github_rate_limit_max_wait`` and raise ``GitHubRateLimitError``
+    otherwise; low-priority requests (see ``github_priority``) are slowed
+    down well before that. Pass ``client`` and ``base_url`` to talk to a
+    fake GitHub.
+    """
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None,
+                 base_url: Optional[str] = None,
+                 token: Optional[str] = None,
+                 rate_limit: Optional[RateLimit] = None,
+                 cache: Optional[GitHubResponseCache] = None):
+        self._client = client
+        self.base_url = (base_url or settings.github_api_url).rstrip("/")
+        self.rate_limit = rate_limit or _rate_limit
+        self.cache = cache or (get_github_cache() if settings.github_cache_enabled else None)
+        self.requests = 0
+        self.headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "CodeLion"
+        }
+        self.auth = None
+        token = token or settings.github_token
+        self.identity = token or settings.github_client_id or ""
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        elif settings.github_client_id and settings.github_client_secret:
+            # OAuth app credentials, as the API accepted them before tokens were configured
+            self.auth = httpx.BasicAuth(settings.github_client_id, settings.github_client_secret)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Make one API request, waiting out a rate limit that resets soon"""
+        url = f"{self.base_url}{path}"
+        headers = self.headers
+        cache_key, cached = None, None
+        if method == "GET" and self.cache:
+            cache_key = self.cache.make_key(self.identity, str(httpx.URL(url, params=kwargs.get("params"))))
+            cached = await self.cache.get(cache_key)
+            if cached:
+                headers = {**self.headers, **cached.validators()}
+
+        for attempt in range(2):
+            await self._wait_for_budget()
+
+            self.requests += 1
+            try:
+                response = await self.client.request(method, url, headers=headers, auth=self.auth, **kwargs)
+            except httpx.HTTPError as e:
+                GITHUB_REQUESTS.inc(status="error")
+                raise GitHubError(f"GitHub {method} {path} failed: {e}") from e
+            GITHUB_REQUESTS.inc(status=str(response.status_code))
+            self.rate_limit.update(response.headers)
+
+            if self._is_rate_limited(response) and attempt == 0:
+                # Secondary limits send Retry-After; the primary one leaves remaining at 0
+                retry_after = float(response.headers.get("retry-after", 0))
+                if retry_after and retry_after <= settings.github_rate_limit_max_wait:
+                    await asyncio.sleep(retry_after)
+                    continue
+                if not retry_after and self.rate_limit.wait_time(time.time()):
+                    continue  # The top of the loop waits for the reset or gives up
+            if cached and response.status_code == 304:
+                GITHUB_CACHE.inc(result="revalidated")
+                self.cache.record_revalidated()
+                return self._cached_response(cached, response)
+            if response.is_error:
+                error = GitHubRateLimitError if self._is_rate_limited(response) else GitHubError
+                raise error(f"GitHub {method} {path} returned {response.status_code}: "
+                            f"{self._error_message(response)}", response.status_code)
+            if cache_key:
+                await self._cache_response(cache_key, cached, response)
+            return response
+
+    async def _wait_for_budget(self):
+        """Sleep until the rate limit allows the next request in this context"""
+        now = time.time()
+        wait = self.rate_limit.wait_time(now)
+        if not wait and _priority.get() == "low":
+            wait = self.rate_limit.pace(now)
+        if wait > settings.github_rate_limit_max_wait:
+            raise GitHubRateLimitError(f"GitHub rate limit exhausted for another {wait:.0f}s", 403)
+        if wait:
+            record_stage("github_budget_wait", wait)
+            await asyncio.sleep(wait)
+
+    async def _cache_response(self, key: str, cached: Optional[CachedResponse], response: httpx.Response):
+        """Keep a 200 that carries validators so the next fetch can be conditional"""
+        GITHUB_CACHE.inc(result="changed" if cached else "miss")
+        if cached:
+            self.cache.record_changed()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.status_code == 200 and (etag or last_modified):
+            await self.cache.set(key, CachedResponse(etag, last_modified, response.headers.get("link"), response.text))
+
+    def _cached_response(self, cached: CachedResponse, response: httpx.Response) -> httpx.Response:
+        """Answer a 304 with the cached body, as if GitHub had sent it again"""
+        headers = {"content-type": "application/json"}
+        if cached.link:
+            headers["link"] = cached.link
+        return httpx.Response(200, headers=headers, content=cached.body.encode(), request=response.request)
+
+    def _is_rate_limited(self, response: httpx.Response) -> bool:
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            response.headers.get("x-ratelimit-remaining") == "0" or "retry-after" in response.headers
+        )
+
+    def _error_message(self, response: httpx.Response) -> str:
         try:
-            repo_obj = self.github.get_repo(f"{owner}/{repo}")
-            pr = repo_obj.get_pull(pr_number)
-            
-            # Get files changed
-            files = []
-            for file in pr.get_files():
-                files.append({
-                    'filename': file.filename,
-                    'status': file.status,
-                    'additions': file.additions,
-                    'deletions': file.deletions,
-                    'changes': file.changes,
-                    'patch': file.patch
-                })
-            
-            return {
-                'id': pr.id,
-                'number': pr.number,
-                'title': pr.title,
-                'body': pr.body or '',
-                'state': pr.state,
-                'created_at': pr.created_at.isoformat(),
-                'updated_at': pr.updated_at.isoformat(),
-                'user': {
-                    'login': pr.user.login,
-                    'id': pr.user.id,
-                    'avatar_url': pr.user.avatar_url
-                },
-                'repository': {
-                    'id': repo_obj.id,
-                    'name': repo_obj.name,
-                    'full_name': repo_obj.full_name,
-                    'owner': {
-                        'login': repo_obj.owner.login,
-                        'id': repo_obj.owner.id
+            return response.json().get("message", response.text)
+        except ValueError:
+            return response.text
+
+    async def _get_json(self, path: str, **kwargs) -> Any:
+        return (await self._request("GET", path, **kwargs)).json()
+
+    async def _iter_pages(self, path: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[List[Any]]:
+        """Yield the pages of a list endpoint in order.
+
+        The Link header of the first page gives the page count; up to
+        ``github_page_prefetch`` later pages download concurrently while
+        the caller works through earlier ones, and no more are started
+        until it catches up.
+        """
+        params = {**(params or {}), "per_page": settings.github_per_page}
+        first = await self._request("GET", path, params=params)
+        match = _LAST_PAGE.search(first.headers.get("link", ""))
+        last_page = int(match.group(1)) if match else 1
+
+        fetches: Deque[asyncio.Task] = deque()
+        next_page = 2
+
+        def prefetch():
+            nonlocal next_page
+            while next_page <= last_page and len(fetches) < max(1, settings.github_page_prefetch):
+                fetches.append(asyncio.create_task(self._get_json(path, params={**params, "page": next_page})))
+                next_page += 1
+
+        try:
+            prefetch()
+            yield first.json()
+            while fetches:
+                page = await fetches.popleft()
+                prefetch()
+                yield page
+        finally:
+            for task in fetches:
+                task.cancel()
+
+    async def _paginate(self, path: str, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Fetch every page of a list endpoint"""
+        return [item async for page in self._iter_pages(path, params) for item in page]
+
+    async def iter_pull_request_files(self, owner: str, repo: str, pr_number: int) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the files changed in a pull request as their pages arrive"""
+        try:
+            async for page in self._iter_pages(f"/repos/{owner}/{repo}/pulls/{pr_number}/files"):
+                for file in page:
+                    yield {
+                        'filename': file['filename'],
+                        'status': file['status'],
+                        'additions': file['additions'],
+                        'deletions': file['deletions'],
+                        'changes': file['changes'],
+                        'sha': file.get('sha'),
+                        'patch': file.get('patch')
                     }
-                },
-                'files': files
-            }
-        except Exception as e:
-            raise Exception(f"Error fetching pull request: {str(e)}")
-    
+        except GitHubError as e:
+            raise type(e)(f"Error fetching pull request files: {str(e)}", e.status_code) from e
+
+    async def get_pull_request(self, owner: str, repo: str, pr_number: int,
+                               include_files: bool = True) -> Dict[str, Any]:
+        """Get pull request data from GitHub; without ``include_files``, stream them with iter_pull_request_files"""
+        async def list_files() -> List[Dict[str, Any]]:
+            return [file_data async for file_data in self.iter_pull_request_files(owner, repo, pr_number)]
+
+        try:
+            if include_files:
+                pr, files = await asyncio.gather(self._get_json(f"/repos/{owner}/{repo}/pulls/{pr_number}"), list_files())
+            else:
+                pr = await self._get_json(f"/repos/{owner}/{repo}/pulls/{pr_number}")
+
+            pr_data = pull_request_model(pr)
+            if include_files:
+                pr_data['files'] = files
+            return pr_data
+        except GitHubError as e:
+            raise type(e)(f"Error fetching pull request: {str(e)}", e.status_code) from e
+
     async def create_webhook(self, owner: str, repo: str, webhook_url: str) -> Dict[str, Any]:
         """Create a webhook for the repository"""
         try:
-            repo_obj = self.github.get_repo(f"{owner}/{repo}")
-            
-            webhook = repo_obj.create_hook(
-                name="web",
-                config={
+            response = await self._request("POST", f"/repos/{owner}/{repo}/hooks", json={
+                "name": "web",
+                "config": {
                     "url": webhook_url,
                     "content_type": "json"
                 },
-                events=["pull_request", "pull_request_review"],
-                active=True
-            )
-            
+                "events": ["pull_request", "pull_request_review"],
+                "active": True
+            })
+            webhook = response.json()
+
             return {
-                'id': webhook.id,
-                'url': webhook.url,
-                'events': webhook.events,
-                'active': webhook.active
+                'id': webhook['id'],
+                'url': webhook['url'],
+                'events': webhook['events'],
+                'active': webhook['active']
             }
-        except Exception as e:
-            raise Exception(f"Error creating webhook: {str(e)}")
-    
+        except GitHubError as e:
+            raise type(e)(f"Error creating webhook: {str(e)}", e.status_code) from e
+
     async def delete_webhook(self, owner: str, repo: str, webhook_id: int):
         """Delete a webhook"""
         try:
-            repo_obj = self.github.get_repo(f"{owner}/{repo}")
-            webhook = repo_obj.get_hook(webhook_id)
-            webhook.delete()
-        except Exception as e:
-            raise Exception(f"Error deleting webhook: {str(e)}")
-    
+            await self._request("DELETE", f"/repos/{owner}/{repo}/hooks/{webhook_id}")
+        except GitHubError as e:
+            raise type(e)(f"Error deleting webhook: {str(e)}", e.status_code) from e
+
     async def post_comment(self, owner: str, repo: str, pr_number: int, comment: str):
         """Post a comment on a pull request"""
         try:
-            repo_obj = self.github.get_repo(f"{owner}/{repo}")
-            pr = repo_obj.get_pull(pr_number)
-            pr.create_issue_comment(comment)
-        except Exception as e:
-            raise Exception(f"Error posting comment: {str(e)}")
-    
-    async def post_review_comment(self, owner: str, repo: str, pr_number: int, 
-                                 file_path: str, line_number: int, comment: str):
-        """Post a review comment on a specific line"""
+            await self._request("POST", f"/repos/{owner}/{repo}/issues/{pr_number}/comments",
+                                json={"body": comment})
+        except GitHubError as e:
+            raise type(e)(f"Error posting comment: {str(e)}", e.status_code) from e
+
+    async def get_head_sha(self, owner: str, repo: str, pr_number: int) -> str:
+        """Get the SHA of the pull request's latest commit"""
+        pr = await self._get_json(f"/repos/{owner}/{repo}/pulls/{pr_number}")
+        return pr['head']['sha']
+
+    async def post_review_comment(self, owner: str, repo: str, pr_number: int,
+                                 file_path: str, line_number: int, comment: str,
+                                 commit_id: Optional[str] = None):
+        """Post a review comment on a specific line, of the latest commit unless one is given"""
         try:
-            repo_obj = self.github.get_repo(f"{owner}/{repo}")
-            pr = repo_obj.get_pull(pr_number)
-            
-            # Get the commit SHA
-            commits = list(pr.get_commits())
-            if not commits:
-                raise Exception("No commits found in pull request")
-            
-            commit_sha = commits[-1].sha
-            
-            pr.create_review_comment(
-                body=comment,
-                commit=repo_obj.get_commit(commit_sha),
-                path=file_path,
-                line=line_number
-            )
-        except Exception as e:
-            raise Exception(f"Error posting review comment: {str(e)}")
+            if commit_id is None:
+                commit_id = await self.get_head_sha(owner, repo, pr_number)
+
+            await self._request("POST", f"/repos/{owner}/{repo}/pulls/{pr_number}/comments", json={
+                "body": comment,
+                "commit_id": commit_id,
+                "path": file_path,
+                "line": line_number,
+                "side": "RIGHT"
+            })
+        except GitHubError as e:
+            raise type(e)(f"Error posting review comment: {str(e)}", e.status_code) from e
+
+    async def create_review(self, owner: str, repo: str, pr_number: int,
+                            comments: List[Dict[str, Any]], body: str = "",
+                            commit_id: Optional[str] = None) -> Dict[str, int]:
+        """Submit inline comments as one pull request review, split into chunks if there are many.
+
+        ``comments`` are dicts with ``path``, ``line`` and ``body``; ``body``
+        goes on the first review. GitHub rejects a whole review when any
+        comment is outside the diff, so a rejected chunk falls back to posting
+        its comments one at a time. Returns the requests made and comments posted.
+        """
+        try:
+            requests = 0
+            if commit_id is None:
+                commit_id = await self.get_head_sha(owner, repo, pr_number)
+                requests += 1
+
+            size = max(1, settings.github_review_max_comments)
+            chunks = [comments[start:start + size] for start in range(0, len(comments), size)] or [[]]
+            posted = 0
+            for index, chunk in enumerate(chunks):
+                review = {
+                    "commit_id": commit_id,
+                    "event": "COMMENT",
+                    "comments": [{**comment, "side": "RIGHT"} for comment in chunk]
+                }
+                if index == 0 and body:
+                    review["body"] = body
+                requests += 1
+                try:
+                    await self._request("POST", f"/repos/{owner}/{repo}/pulls/{pr_number}/reviews", json=review)
+                    posted += len(chunk)
+                    continue
+                except GitHubError as e:
+                    if e.status_code != 422:
+                        raise
+                    print(f"GitHub rejected a review of {len(chunk)} comments on {owner}/{repo}#{pr_number}, "
+                          f"posting them one at a time: {e}")
+
+                if index == 0 and body:
+                    requests += 1
+                    await self.post_comment(owner, repo, pr_number, body)
+                for comment in chunk:
+                    requests += 1
+                    try:
+                        await self.post_review_comment(owner, repo, pr_number, comment["path"],
+                                                       comment["line"], comment["body"], commit_id=commit_id)
+                        posted += 1
+                    except GitHubError as e:
+                        if e.status_code != 422:
+                            raise
+                        print(f"Skipping comment on {comment['path']}:{comment['line']}: {e}")
+
+            return {'requests': requests, 'comments_posted': posted}
+        except GitHubError as e:
+            raise type(e)(f"Error submitting review: {str(e)}", e.status_code) from e
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request and rate-limit metrics"""
+        return {
+            'requests': self.requests,
+            'rate_limit': {
+                'limit': self.rate_limit.limit,
+                'remaining': self.rate_limit.remaining,
+                'reset': self.rate_limit.reset
+            }
+        }
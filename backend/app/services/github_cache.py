@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import redis.asyncio as redis
+from app.core.config import settings
+
+class CachedResponse:
+    """Validators and body of a GitHub GET response, kept for conditional requests"""
+
+    __slots__ = ('etag', 'last_modified', 'link', 'body')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], link: Optional[str], body: str):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.link = link
+        self.body = body
+
+    def validators(self) -> Dict[str, str]:
+        """Headers that make the next request conditional on this response"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_json(self) -> str:
+        return json.dumps({'etag': self.etag, 'last_modified': self.last_modified,
+                           'link': self.link, 'body': self.body})
+
+    @classmethod
+    def from_json(cls, value: str) -> "CachedResponse":
+        data = json.loads(value)
+        return cls(data['etag'], data['last_modified'], data['link'], data['body'])
+
+class GitHubResponseCache:
+    """Cache of GitHub GET responses, revalidated with ETag/Last-Modified.
+
+    A cached response is never served blind: the next request for the same
+    URL carries its validators, and GitHub answers an unchanged resource
+    with a 304 that does not count against the rate limit. A bounded
+    in-process LRU, sized by body bytes, sits in front of an optional Redis
+    tier that is shared by all workers.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl: Optional[int] = None,
+                 redis_url: Optional[str] = None):
+        self.max_bytes = max_bytes or settings.github_cache_max_bytes
+        self.ttl = ttl or settings.github_cache_ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.redis = redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self.prefix = "codelion:github"
+        self.revalidated = 0
+        self.changed = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(identity: str, url: str) -> str:
+        """Build the cache key for a URL fetched with the given credentials"""
+        # Different credentials may see different data
+        return hashlib.sha256(f"{identity}\n{url}".encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up a response, checking memory before Redis"""
+        entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
+            return entry
+
+        if self.redis:
+            try:
+                value = await self.redis.get(f"{self.prefix}:{key}")
+            except Exception as e:
+                print(f"Error reading GitHub cache: {e}")
+                value = None
+            if value is not None:
+                self.redis_hits += 1
+                entry = CachedResponse.from_json(value)
+                self._store(key, entry)
+                return entry
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, entry: CachedResponse):
+        """Store a response in both tiers"""
+        self._store(key, entry)
+        if self.redis:
+            try:
+                await self.redis.set(f"{self.prefix}:{key}", entry.to_json(), ex=self.ttl)
+            except Exception as e:
+                print(f"Error writing GitHub cache: {e}")
+
+    def record_revalidated(self):
+        """Count a 304 answered from the cache"""
+        self.revalidated += 1
+
+    def record_changed(self):
+        """Count a cached response GitHub replaced with a new one"""
+        self.changed += 1
+
+    def _store(self, key: str, entry: CachedResponse):
+        previous = self._entries.pop(key, None)
+        if previous:
+            self._bytes -= len(previous.body)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all in-process entries"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get revalidation/miss/eviction counters"""
+        lookups = self.revalidated + self.changed + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'revalidated': self.revalidated,
+            'changed': self.changed,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.revalidated / lookups, 3) if lookups else 0.0
+        }
+
+_github_cache: Optional[GitHubResponseCache] = None
+
+def get_github_cache() -> GitHubResponseCache:
+    """Get the process-wide GitHub response cache"""
+    global _github_cache
+    if _github_cache is None:
+        _github_cache = GitHubResponseCache(
+            redis_url=settings.redis_url if settings.github_cache_redis else None
+        )
+    return _github_cache
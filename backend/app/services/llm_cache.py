@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import time
+import redis.asyncio as redis
+from app.core.config import settings
+
+class LLMResponseCache:
+    """Content-addressed cache of model responses.
+
+    Entries are keyed on everything that determines the response: the agent,
+    the version of its system prompt, the model and the rendered prompt. A
+    bounded in-process LRU sits in front of an optional Redis tier that is
+    shared by all workers.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[int] = None,
+                 redis_url: Optional[str] = None):
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+        self.ttl = ttl or settings.llm_cache_ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.redis = redis.from_url(redis_url, decode_responses=True) if redis_url else None
+        self.prefix = "codelion:llm"
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(agent_name: str, prompt_version: str, model: str, prompt: str) -> str:
+        """Build the cache key for a rendered prompt"""
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
+        return f"{agent_name}:{prompt_version}:{model}:{prompt_hash}"
+
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, checking memory before Redis"""
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.redis:
+            try:
+                value = await self.redis.get(f"{self.prefix}:{key}")
+            except Exception as e:
+                print(f"Error reading LLM cache: {e}")
+                value = None
+            if value is not None:
+                self.redis_hits += 1
+                self._store(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store a response in both tiers"""
+        self._store(key, value)
+        if self.redis:
+            try:
+                await self.redis.set(f"{self.prefix}:{key}", value, ex=self.ttl)
+            except Exception as e:
+                print(f"Error writing LLM cache: {e}")
+
+    def _store(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all in-process entries"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters"""
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round((self.hits + self.redis_hits) / lookups, 3) if lookups else 0.0
+        }
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the process-wide LLM response cache"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            redis_url=settings.redis_url if settings.llm_cache_redis else None
+        )
+    return _llm_cache
@@ -0,0 +1,482 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Sequence
+from pydantic import BaseModel
+import asyncio
+import hashlib
+import heapq
+import time
+import uuid
+import zlib
+import redis.asyncio as redis
+from app.core.config import settings
+
+class ReviewJob(BaseModel):
+    id: str
+    event_type: str
+    payload: Dict[str, Any]
+    attempts: int = 0
+    enqueued_at: float
+    last_error: Optional[str] = None
+    shard: int = 0  # Jobs queued before sharding all land on shard 0
+
+def shard_for(repository_id: Any, shard_count: int) -> int:
+    """Shard a repository's jobs land on, stable across processes and restarts"""
+    return zlib.crc32(str(repository_id).encode()) % shard_count
+
+def owned_shards(worker_id: str, workers: Sequence[str], shard_count: int) -> List[int]:
+    """Shards a worker owns, by rendezvous hashing over the live workers.
+
+    Every worker computes the same assignment from the same membership, and
+    a worker joining or leaving only moves the shards it gains or loses.
+    """
+    if worker_id not in workers:
+        workers = list(workers) + [worker_id]
+
+    def weight(worker: str, shard: int) -> bytes:
+        return hashlib.blake2b(f"{worker}:{shard}".encode(), digest_size=8).digest()
+
+    return [
+        shard for shard in range(shard_count)
+        if max(workers, key=lambda worker: weight(worker, shard)) == worker_id
+    ]
+
+class QueueBackend(ABC):
+    """Storage primitives for the review queue.
+
+    Jobs live in one "ready" set per shard, ordered by the time they may
+    run. Reserving a job moves it to an "in flight" set ordered by its
+    visibility deadline; jobs whose deadline passes without an ack are moved
+    back to their shard's "ready" set. Workers also register here, so each
+    can work out which shards it owns.
+    """
+
+    @abstractmethod
+    async def push(self, job: ReviewJob, ready_at: float) -> bool:
+        """Store a job, returning False if a job with the same id exists"""
+        pass
+
+    @abstractmethod
+    async def reserve(self, shards: Sequence[int], ready_by: float, deadline: float) -> Optional[ReviewJob]:
+        """Reserve the first job ready by ``ready_by`` in these shards, in order, and bump its attempts"""
+        pass
+
+    @abstractmethod
+    async def extend(self, job_id: str, deadline: float):
+        """Push back the visibility deadline of an in-flight job"""
+        pass
+
+    @abstractmethod
+    async def ack(self, job_id: str):
+        """Remove a finished job"""
+        pass
+
+    @abstractmethod
+    async def retry(self, job: ReviewJob, ready_at: float):
+        """Move an in-flight job back to the ready set"""
+        pass
+
+    @abstractmethod
+    async def release(self, job: ReviewJob):
+        """Return an in-flight job to the ready set without counting the attempt"""
+        pass
+
+    @abstractmethod
+    async def dead_letter(self, job: ReviewJob):
+        """Move a job to the dead-letter list"""
+        pass
+
+    @abstractmethod
+    async def requeue_expired(self, now: float) -> int:
+        """Return in-flight jobs whose visibility deadline passed to the ready set"""
+        pass
+
+    @abstractmethod
+    async def dead_letters(self, limit: int = 100) -> List[ReviewJob]:
+        """List dead-lettered jobs, newest first"""
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, int]:
+        """Get queue sizes"""
+        pass
+
+    @abstractmethod
+    async def shard_depths(self, shard_count: int, ready_by: float) -> List[int]:
+        """Count the jobs ready by ``ready_by`` in each shard"""
+        pass
+
+    @abstractmethod
+    async def register_worker(self, worker_id: str, now: float, ttl: float) -> List[str]:
+        """Record a worker as alive and return every worker seen within ``ttl``"""
+        pass
+
+    @abstractmethod
+    async def unregister_worker(self, worker_id: str):
+        """Remove a worker so its shards move to the others right away"""
+        pass
+
+class InMemoryQueueBackend(QueueBackend):
+    """In-process backend for tests and single-process development"""
+
+    def __init__(self):
+        self._jobs: Dict[str, ReviewJob] = {}
+        self._ready: Dict[int, List[tuple]] = {}  # shard -> heap of (ready_at, seq, job_id)
+        self._inflight: Dict[str, float] = {}
+        self._dead: List[ReviewJob] = []
+        self._workers: Dict[str, float] = {}
+        self._seq = 0
+        self._lock = asyncio.Lock()
+
+    def _schedule(self, job: ReviewJob, ready_at: float):
+        self._seq += 1
+        heapq.heappush(self._ready.setdefault(job.shard, []), (ready_at, self._seq, job.id))
+
+    def _is_current(self, job_id: str) -> bool:
+        return job_id in self._jobs and job_id not in self._inflight
+
+    async def push(self, job: ReviewJob, ready_at: float) -> bool:
+        async with self._lock:
+            if job.id in self._jobs:
+                return False
+            self._jobs[job.id] = job
+            self._schedule(job, ready_at)
+            return True
+
+    async def reserve(self, shards: Sequence[int], ready_by: float, deadline: float) -> Optional[ReviewJob]:
+        async with self._lock:
+            for shard in shards:
+                heap = self._ready.get(shard, [])
+                while heap and not self._is_current(heap[0][2]):
+                    heapq.heappop(heap)  # Stale entry
+                if heap and heap[0][0] <= ready_by:
+                    _, _, job_id = heapq.heappop(heap)
+                    job = self._jobs[job_id]
+                    job.attempts += 1
+                    self._inflight[job_id] = deadline
+                    return job.model_copy()
+            return None
+
+    async def extend(self, job_id: str, deadline: float):
+        async with self._lock:
+            if job_id in self._inflight:
+                self._inflight[job_id] = deadline
+
+    async def ack(self, job_id: str):
+        async with self._lock:
+            self._inflight.pop(job_id, None)
+            self._jobs.pop(job_id, None)
+
+    async def retry(self, job: ReviewJob, ready_at: float):
+        async with self._lock:
+            self._inflight.pop(job.id, None)
+            self._jobs[job.id] = job
+            self._schedule(job, ready_at)
+
+    async def release(self, job: ReviewJob):
+        job = job.model_copy(update={'attempts': job.attempts - 1})
+        await self.retry(job, time.time())
+
+    async def dead_letter(self, job: ReviewJob):
+        async with self._lock:
+            self._inflight.pop(job.id, None)
+            self._jobs.pop(job.id, None)
+            self._dead.insert(0, job)
+
+    async def requeue_expired(self, now: float) -> int:
+        async with self._lock:
+            expired = [job_id for job_id, deadline in self._inflight.items() if deadline <= now]
+            for job_id in expired:
+                del self._inflight[job_id]
+                self._schedule(self._jobs[job_id], now)
+            return len(expired)
+
+    async def dead_letters(self, limit: int = 100) -> List[ReviewJob]:
+        return list(self._dead[:limit])
+
+    async def stats(self) -> Dict[str, int]:
+        return {
+            'queued': len(self._jobs) - len(self._inflight),
+            'in_flight': len(self._inflight),
+            'dead': len(self._dead)
+        }
+
+    async def shard_depths(self, shard_count: int, ready_by: float) -> List[int]:
+        async with self._lock:
+            return [
+                sum(1 for ready_at, _, job_id in self._ready.get(shard, [])
+                    if ready_at <= ready_by and self._is_current(job_id))
+                for shard in range(shard_count)
+            ]
+
+    async def register_worker(self, worker_id: str, now: float, ttl: float) -> List[str]:
+        self._workers[worker_id] = now
+        return sorted(worker for worker, seen in self._workers.items() if seen > now - ttl)
+
+    async def unregister_worker(self, worker_id: str):
+        self._workers.pop(worker_id, None)
+
+# Atomically store a new job and schedule it on its shard's ready set
+# (KEYS[3]); returns 0 if a job with this id already exists
+_PUSH_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[1])
+return 1
+"""
+
+# Atomically pop the first ready job from the given shards (KEYS[4:]), in
+# order, mark it in flight and bump its attempts
+_RESERVE_SCRIPT = """
+for i = 4, #KEYS do
+    local ids = redis.call('ZRANGEBYSCORE', KEYS[i], '-inf', ARGV[1], 'LIMIT', 0, 1)
+    if #ids > 0 then
+        local job_id = ids[1]
+        redis.call('ZREM', KEYS[i], job_id)
+        redis.call('ZADD', KEYS[1], ARGV[2], job_id)
+        local attempts = redis.call('HINCRBY', KEYS[3], job_id, 1)
+        return {redis.call('HGET', KEYS[2], job_id), attempts}
+    end
+end
+return nil
+"""
+
+# Atomically move expired in-flight jobs back to their shard's ready set;
+# ARGV[2] is the ready key prefix, see RedisQueueBackend._ready_key
+_REQUEUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, job_id in ipairs(ids) do
+    local shard = tonumber(redis.call('HGET', KEYS[2], job_id) or '0')
+    local ready_key = ARGV[2]
+    if shard > 0 then ready_key = ready_key .. ':' .. shard end
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('ZADD', ready_key, ARGV[1], job_id)
+end
+return #ids
+"""
+
+class RedisQueueBackend(QueueBackend):
+    """Redis backend shared by the API and all worker processes"""
+
+    def __init__(self, url: str, name: str):
+        self.client = redis.from_url(url, decode_responses=True)
+        self.jobs_key = f"{name}:jobs"
+        self.attempts_key = f"{name}:attempts"
+        self.shards_key = f"{name}:shards"
+        self.ready_key = f"{name}:ready"
+        self.inflight_key = f"{name}:inflight"
+        self.dead_key = f"{name}:dead"
+        self.workers_key = f"{name}:workers"
+        self._push = self.client.register_script(_PUSH_SCRIPT)
+        self._reserve = self.client.register_script(_RESERVE_SCRIPT)
+        self._requeue = self.client.register_script(_REQUEUE_SCRIPT)
+
+    def _ready_key(self, shard: int) -> str:
+        # Shard 0 keeps the pre-sharding key, so jobs queued before an upgrade still run
+        return self.ready_key if shard == 0 else f"{self.ready_key}:{shard}"
+
+    async def push(self, job: ReviewJob, ready_at: float) -> bool:
+        created = await self._push(
+            keys=[self.jobs_key, self.shards_key, self._ready_key(job.shard)],
+            args=[job.id, job.model_dump_json(), job.shard, ready_at]
+        )
+        return bool(created)
+
+    async def reserve(self, shards: Sequence[int], ready_by: float, deadline: float) -> Optional[ReviewJob]:
+        if not shards:
+            return None
+        result = await self._reserve(
+            keys=[self.inflight_key, self.jobs_key, self.attempts_key] + [self._ready_key(shard) for shard in shards],
+            args=[ready_by, deadline]
+        )
+        if not result or result[0] is None:
+            return None
+        job = ReviewJob.model_validate_json(result[0])
+        job.attempts = int(result[1])
+        return job
+
+    async def extend(self, job_id: str, deadline: float):
+        await self.client.zadd(self.inflight_key, {job_id: deadline}, xx=True)
+
+    async def ack(self, job_id: str):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.inflight_key, job_id)
+            pipe.hdel(self.jobs_key, job_id)
+            pipe.hdel(self.attempts_key, job_id)
+            pipe.hdel(self.shards_key, job_id)
+            await pipe.execute()
+
+    async def retry(self, job: ReviewJob, ready_at: float):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.inflight_key, job.id)
+            pipe.hset(self.jobs_key, job.id, job.model_dump_json())
+            pipe.zadd(self._ready_key(job.shard), {job.id: ready_at})
+            await pipe.execute()
+
+    async def release(self, job: ReviewJob):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.inflight_key, job.id)
+            pipe.hincrby(self.attempts_key, job.id, -1)
+            pipe.zadd(self._ready_key(job.shard), {job.id: time.time()})
+            await pipe.execute()
+
+    async def dead_letter(self, job: ReviewJob):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.inflight_key, job.id)
+            pipe.hdel(self.jobs_key, job.id)
+            pipe.hdel(self.attempts_key, job.id)
+            pipe.hdel(self.shards_key, job.id)
+            pipe.lpush(self.dead_key, job.model_dump_json())
+            await pipe.execute()
+
+    async def requeue_expired(self, now: float) -> int:
+        return int(await self._requeue(keys=[self.inflight_key, self.shards_key], args=[now, self.ready_key]))
+
+    async def dead_letters(self, limit: int = 100) -> List[ReviewJob]:
+        raw_jobs = await self.client.lrange(self.dead_key, 0, limit - 1)
+        return [ReviewJob.model_validate_json(raw) for raw in raw_jobs]
+
+    async def stats(self) -> Dict[str, int]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hlen(self.jobs_key)
+            pipe.zcard(self.inflight_key)
+            pipe.llen(self.dead_key)
+            jobs, in_flight, dead = await pipe.execute()
+        return {'queued': jobs - in_flight, 'in_flight': in_flight, 'dead': dead}
+
+    async def shard_depths(self, shard_count: int, ready_by: float) -> List[int]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for shard in range(shard_count):
+                pipe.zcount(self._ready_key(shard), '-inf', ready_by)
+            return [int(count) for count in await pipe.execute()]
+
+    async def register_worker(self, worker_id: str, now: float, ttl: float) -> List[str]:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.workers_key, {worker_id: now})
+            pipe.zremrangebyscore(self.workers_key, '-inf', now - ttl)
+            pipe.zrange(self.workers_key, 0, -1)
+            _, _, workers = await pipe.execute()
+        return sorted(workers)
+
+    async def unregister_worker(self, worker_id: str):
+        await self.client.zrem(self.workers_key, worker_id)
+
+class ReviewQueue:
+    """Durable queue of webhook events waiting to be reviewed.
+
+    Delivery is at-least-once: a job that is not acked before its visibility
+    timeout is handed to another worker, and a job that keeps failing is moved
+    to the dead-letter list after ``max_attempts`` tries.
+
+    Jobs are sharded by repository, so every event for a repository lands on
+    the same shard and, while membership is stable, on the same worker.
+    """
+
+    def __init__(self, backend: Optional[QueueBackend] = None,
+                 max_attempts: Optional[int] = None,
+                 visibility_timeout: Optional[float] = None,
+                 retry_backoff: Optional[float] = None,
+                 shard_count: Optional[int] = None):
+        self.backend = backend or _create_backend()
+        self.max_attempts = max_attempts or settings.review_queue_max_attempts
+        self.visibility_timeout = visibility_timeout or settings.review_queue_visibility_timeout
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.review_queue_retry_backoff
+        self.shard_count = max(1, shard_count or settings.review_queue_shards)
+
+    async def enqueue(self, event_type: str, payload: Dict[str, Any],
+                      job_id: Optional[str] = None, delay: float = 0) -> Optional[ReviewJob]:
+        """Persist an event for the workers, returning None if it is already queued"""
+        now = time.time()
+        job = ReviewJob(
+            id=job_id or uuid.uuid4().hex,
+            event_type=event_type,
+            payload=payload,
+            enqueued_at=now,
+            shard=shard_for((payload.get('repository') or {}).get('id'), self.shard_count)
+        )
+        if not await self.backend.push(job, now + delay):
+            return None
+        return job
+
+    async def reserve(self, shards: Optional[Sequence[int]] = None,
+                      ready_by: Optional[float] = None) -> Optional[ReviewJob]:
+        """Reserve the next job that is ready to run.
+
+        ``shards`` limits and orders the shards searched (all by default);
+        ``ready_by`` only takes jobs that became ready by then, so a worker
+        stealing from another's shard can leave it the jobs it is about to reach.
+        """
+        now = time.time()
+        await self.backend.requeue_expired(now)
+        if shards is None:
+            shards = range(self.shard_count)
+        if ready_by is None:
+            ready_by = now
+
+        while True:
+            job = await self.backend.reserve(list(shards), ready_by, now + self.visibility_timeout)
+            if job is None:
+                return None
+            if job.attempts <= self.max_attempts:
+                return job
+            # Worker died holding the job too many times
+            job.last_error = job.last_error or "Visibility timeout exceeded"
+            await self.backend.dead_letter(job)
+
+    async def heartbeat(self, job: ReviewJob):
+        """Keep a long-running job invisible to other workers"""
+        await self.backend.extend(job.id, time.time() + self.visibility_timeout)
+
+    async def ack(self, job: ReviewJob):
+        """Mark a job as done"""
+        await self.backend.ack(job.id)
+
+    async def fail(self, job: ReviewJob, error: str):
+        """Schedule a retry with exponential backoff or dead-letter the job"""
+        job.last_error = error
+        if job.attempts >= self.max_attempts:
+            await self.backend.dead_letter(job)
+            return
+
+        delay = self.retry_backoff * (2 ** (job.attempts - 1))
+        await self.backend.retry(job, time.time() + delay)
+
+    async def release(self, job: ReviewJob):
+        """Hand an unfinished job back right away, e.g. when its worker shuts down"""
+        await self.backend.release(job)
+
+    async def dead_letters(self, limit: int = 100) -> List[ReviewJob]:
+        """List jobs that exhausted their retries"""
+        return await self.backend.dead_letters(limit)
+
+    async def stats(self) -> Dict[str, int]:
+        """Get queue sizes"""
+        return await self.backend.stats()
+
+    async def shard_depths(self, ready_by: Optional[float] = None) -> List[int]:
+        """Count the ready jobs in each shard"""
+        return await self.backend.shard_depths(self.shard_count, time.time() if ready_by is None else ready_by)
+
+    async def join(self, worker_id: str, ttl: float) -> List[int]:
+        """Register a worker and return the shards it owns among the live workers"""
+        workers = await self.backend.register_worker(worker_id, time.time(), ttl)
+        return owned_shards(worker_id, workers, self.shard_count)
+
+    async def leave(self, worker_id: str):
+        """Unregister a worker so the others pick up its shards"""
+        await self.backend.unregister_worker(worker_id)
+
+def _create_backend() -> QueueBackend:
+    if settings.review_queue_backend == "memory":
+        return InMemoryQueueBackend()
+    return RedisQueueBackend(settings.redis_url, settings.review_queue_name)
+
+_review_queue: Optional[ReviewQueue] = None
+
+def get_review_queue() -> ReviewQueue:
+    """Get the process-wide review queue"""
+    global _review_queue
+    if _review_queue is None:
+        _review_queue = ReviewQueue()
+    return _review_queue
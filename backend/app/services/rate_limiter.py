@@ -0,0 +1,171 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+import asyncio
+import random
+import time
+import redis.asyncio as redis
+from app.core.config import settings
+
+class BucketStore(ABC):
+    """Token-bucket state for a requests bucket and a tokens bucket"""
+
+    @abstractmethod
+    async def take(self, key: str, tokens: int, request_rate: float, request_capacity: float,
+                   token_rate: float, token_capacity: float) -> float:
+        """Take one request and ``tokens`` tokens, or return how long to wait.
+
+        Both buckets are debited together or not at all. Rates are per
+        second, capacities are the bucket sizes.
+        """
+        pass
+
+class InMemoryBucketStore(BucketStore):
+    """In-process buckets for tests and single-process development"""
+
+    def __init__(self):
+        self._buckets: Dict[str, list] = {}  # key -> [requests, tokens, updated_at]
+
+    async def take(self, key: str, tokens: int, request_rate: float, request_capacity: float,
+                   token_rate: float, token_capacity: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(key, [request_capacity, token_capacity, now])
+        elapsed = max(0.0, now - bucket[2])
+        requests_left = min(request_capacity, bucket[0] + elapsed * request_rate)
+        tokens_left = min(token_capacity, bucket[1] + elapsed * token_rate)
+        tokens = min(tokens, token_capacity)
+
+        wait = 0.0
+        if requests_left < 1:
+            wait = (1 - requests_left) / request_rate
+        if tokens_left < tokens:
+            wait = max(wait, (tokens - tokens_left) / token_rate)
+        if wait == 0:
+            requests_left -= 1
+            tokens_left -= tokens
+
+        self._buckets[key] = [requests_left, tokens_left, now]
+        return wait
+
+# Same algorithm as InMemoryBucketStore, using the Redis clock so all
+# workers agree on the time
+_TAKE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated_at')
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = tonumber(ARGV[1])
+local request_rate, request_capacity = tonumber(ARGV[2]), tonumber(ARGV[3])
+local token_rate, token_capacity = tonumber(ARGV[4]), tonumber(ARGV[5])
+
+local requests_left = tonumber(state[1]) or request_capacity
+local tokens_left = tonumber(state[2]) or token_capacity
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests_left = math.min(request_capacity, requests_left + elapsed * request_rate)
+tokens_left = math.min(token_capacity, tokens_left + elapsed * token_rate)
+tokens = math.min(tokens, token_capacity)
+
+local wait = 0
+if requests_left < 1 then wait = (1 - requests_left) / request_rate end
+if tokens_left < tokens then wait = math.max(wait, (tokens - tokens_left) / token_rate) end
+if wait == 0 then
+    requests_left = requests_left - 1
+    tokens_left = tokens_left - tokens
+end
+
+redis.call('HSET', KEYS[1], 'requests', requests_left, 'tokens', tokens_left, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], 300)
+return tostring(wait)
+"""
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by every worker talking to the same Gemini project"""
+
+    def __init__(self, url: str, prefix: str = "codelion:ratelimit"):
+        self.client = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, tokens: int, request_rate: float, request_capacity: float,
+                   token_rate: float, token_capacity: float) -> float:
+        wait = await self._take(
+            keys=[f"{self.prefix}:{key}"],
+            args=[tokens, request_rate, request_capacity, token_rate, token_capacity]
+        )
+        return float(wait)
+
+class AdaptiveRateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with AIMD.
+
+    The configured limits are scaled by ``rate_factor``. Every throttled
+    response halves the factor (down to ``min_factor``), and every success
+    raises it a little until it is back at 1.0. The factor is local to the
+    process, but the buckets live in the shared store, so each process backs
+    off on its own while all of them draw from the same quota.
+    """
+
+    def __init__(self, store: Optional[BucketStore] = None, key: str = "gemini",
+                 requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 min_factor: float = 0.1, increase: float = 0.05, decrease: float = 0.5):
+        self.store = store or _create_store()
+        self.key = key
+        self.requests_per_minute = requests_per_minute or settings.gemini_requests_per_minute
+        self.tokens_per_minute = tokens_per_minute or settings.gemini_tokens_per_minute
+        self.min_factor = min_factor
+        self.increase = increase
+        self.decrease = decrease
+        self.rate_factor = 1.0
+        self.delayed = 0
+        self.total_delay = 0.0
+        self.throttled = 0
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until the request fits both buckets and return the time spent waiting"""
+        waited = 0.0
+        while True:
+            request_limit = self.requests_per_minute * self.rate_factor
+            token_limit = self.tokens_per_minute * self.rate_factor
+            wait = await self.store.take(
+                self.key, tokens,
+                request_limit / 60, max(1.0, request_limit),
+                token_limit / 60, max(1.0, token_limit)
+            )
+            if wait <= 0:
+                break
+            waited += wait
+            await asyncio.sleep(wait)
+
+        if waited:
+            self.delayed += 1
+            self.total_delay += waited
+        return waited
+
+    def on_success(self):
+        """Additive increase after a successful call"""
+        self.rate_factor = min(1.0, self.rate_factor + self.increase)
+
+    def on_throttle(self):
+        """Multiplicative decrease after a 429"""
+        self.throttled += 1
+        self.rate_factor = max(self.min_factor, self.rate_factor * self.decrease)
+
+    @staticmethod
+    def backoff(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter"""
+        base = base if base is not None else settings.gemini_backoff_base
+        cap = cap if cap is not None else settings.gemini_backoff_max
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter state and delay counters"""
+        return {
+            'rate_factor': round(self.rate_factor, 3),
+            'requests_per_minute': int(self.requests_per_minute * self.rate_factor),
+            'tokens_per_minute': int(self.tokens_per_minute * self.rate_factor),
+            'delayed_requests': self.delayed,
+            'total_delay_ms': int(self.total_delay * 1000),
+            'throttled': self.throttled
+        }
+
+def _create_store() -> BucketStore:
+    if settings.review_queue_backend == "memory":
+        return InMemoryBucketStore()
+    return RedisBucketStore(settings.redis_url)
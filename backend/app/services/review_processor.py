@@ -0,0 +1,443 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+from sqlalchemy.orm import Session
+from app.models.repository import Repository
+from app.models.review import Review, ReviewComment, ReviewStatus, ReviewType
+from app.models.agent import AgentRun
+from app.models.finding import FindingState
+from app.agents.orchestrator import ReviewOrchestrator
+from app.agents.dedup import history_entries
+from app.services.github import GitHubService, github_priority, pull_request_model
+from app.services.coalescer import ReviewCoalescer, ReviewSuperseded, get_review_coalescer
+from app.services.finding_index import FindingIndex, get_finding_index
+from app.services.queue import ReviewQueue, get_review_queue
+from app.core.config import settings
+from app.core.metrics import get_metrics, span, trace
+
+# Synthetic event queued to finish files a review ran out of time on
+FOLLOWUP_EVENT = "review_followup"
+
+REVIEWS = get_metrics().counter(
+    "codelion_reviews_total", "Reviews run per repository by outcome", ["repository", "status"]
+)
+REVIEW_SECONDS = get_metrics().histogram(
+    "codelion_review_duration_seconds", "Wall time of a review, from GitHub fetch to posted comments", ["repository"]
+)
+COMMENTS_POSTED = get_metrics().counter(
+    "codelion_comments_posted_total", "Review comments posted to GitHub", ["repository"]
+)
+PR_METADATA = get_metrics().counter(
+    "codelion_pr_metadata_total", "Where reviews got pull request metadata: the queued payload or a GitHub fetch", ["source"]
+)
+GITHUB_CALLS_SAVED = get_metrics().counter(
+    "codelion_github_calls_saved_total", "GitHub requests avoided by posting comments as one review", ["repository"]
+)
+FINDINGS_SUPPRESSED = get_metrics().counter(
+    "codelion_findings_suppressed_total", "Findings not posted because an earlier PR raised them", ["repository"]
+)
+
+class ReviewProcessor:
+    """Turns queued GitHub webhook events into reviews.
+
+    Runs inside the review workers, never in the webhook request itself.
+    Errors are propagated so the queue can retry the job.
+    """
+
+    def __init__(self, orchestrator: Optional[ReviewOrchestrator] = None,
+                 github_service: Optional[GitHubService] = None,
+                 coalescer: Optional[ReviewCoalescer] = None,
+                 queue: Optional[ReviewQueue] = None,
+                 finding_index: Optional[FindingIndex] = None):
+        self.orchestrator = orchestrator or ReviewOrchestrator()
+        self.github_service = github_service or GitHubService()
+        self.coalescer = coalescer or get_review_coalescer()
+        self.queue = queue or get_review_queue()
+        self.finding_index = finding_index or get_finding_index()
+
+    async def process_event(self, event_type: str, payload: Dict[str, Any], db: Session):
+        """Dispatch a webhook event"""
+        if event_type == "pull_request":
+            await self.handle_pull_request_event(payload, db)
+        elif event_type == "pull_request_review":
+            await self.handle_pull_request_review_event(payload, db)
+        elif event_type == FOLLOWUP_EVENT:
+            # Follow-up passes can wait; they yield the rate limit to fresh reviews
+            with github_priority("low"):
+                await self.review_head(payload["pull_request"], payload["repository"], db,
+                                       followup_depth=payload.get("followup_depth", 0))
+
+    async def handle_pull_request_event(self, payload: Dict[str, Any], db: Session):
+        """Handle pull request events"""
+        action = payload.get("action")
+        pr_data = payload.get("pull_request", {})
+        repo_data = payload.get("repository") or pr_data.get("base", {}).get("repo", {})
+
+        if action in ["opened", "synchronize"]:
+            await self.review_head(pr_data, repo_data, db)
+        elif action == "closed":
+            # Mark review as completed
+            await self.mark_review_completed(pr_data, repo_data, db)
+
+    async def review_head(self, pr_data: Dict[str, Any], repo_data: Dict[str, Any], db: Session,
+                          followup_depth: int = 0):
+        """Review the PR's head commit unless a newer push made it obsolete"""
+        key = ReviewCoalescer.make_key(repo_data.get("id"), pr_data.get("number"))
+        head_sha = pr_data.get("head", {}).get("sha", "")
+        if not await self.coalescer.is_current(key, head_sha):
+            print(f"Skipping review of {key}@{head_sha}: superseded by a newer commit")
+            return
+
+        # Create or update review
+        try:
+            await self.coalescer.run_latest(
+                key, head_sha, self.create_or_update_review(pr_data, repo_data, db, followup_depth)
+            )
+        except ReviewSuperseded as e:
+            print(str(e))
+
+    async def handle_pull_request_review_event(self, payload: Dict[str, Any], db: Session):
+        """Handle pull request review events"""
+        # This could be used to track manual reviews or respond to them
+        pass
+
+    async def create_or_update_review(self, pr_data: Dict[str, Any], repo_data: Dict[str, Any], db: Session,
+                                      followup_depth: int = 0):
+        """Create or update a review for a pull request"""
+        repo = db.query(Repository).filter(
+            Repository.github_id == repo_data.get("id")
+        ).first()
+
+        if not repo:
+            return  # Repository not connected to CodeLion
+
+        # Check if review already exists
+        review = db.query(Review).filter(
+            Review.github_pr_id == pr_data.get("number"),
+            Review.repository_id == repo.id
+        ).first()
+
+        if not review:
+            # Create new review
+            review = Review(
+                github_pr_id=pr_data.get("number"),
+                repository_id=repo.id,
+                status=ReviewStatus.PENDING
+            )
+            db.add(review)
+            db.commit()
+            db.refresh(review)
+
+        # Update review status
+        review.status = ReviewStatus.IN_PROGRESS
+        db.commit()
+
+        # Run agent analysis, timing each stage
+        with trace(f"Review of {repo.full_name}#{review.github_pr_id}") as review_trace:
+            status = "failed"
+            try:
+                await self.run_agent_analysis(review, pr_data, db, followup_depth)
+                status = "completed"
+            except asyncio.CancelledError:
+                status = "cancelled"  # Superseded by a newer push
+                raise
+            finally:
+                REVIEWS.inc(repository=repo.full_name, status=status)
+                REVIEW_SECONDS.observe(review_trace.elapsed(), repository=repo.full_name)
+                print(review_trace.format())
+
+    async def run_agent_analysis(self, review: Review, pr_data: Dict[str, Any], db: Session,
+                                 followup_depth: int = 0):
+        """Run agent analysis on the files changed since the last reviewed commit"""
+        try:
+            # Get the full PR data with files
+            repo = review.repository
+            owner = repo.full_name.split("/")[0]
+            repo_name = repo.full_name.split("/")[1]
+
+            full_pr_data = await self.pull_request_data(review, pr_data, owner, repo_name)
+
+            # The file listing is streamed into the agents; only files whose
+            # content changed since the last review are passed on
+            file_shas: Dict[str, Optional[str]] = {}
+            changed_paths: List[str] = []
+
+            async def changed_files():
+                files = self.github_service.iter_pull_request_files(owner, repo_name, review.github_pr_id)
+                async for file_data in files:
+                    file_shas[file_data["filename"]] = file_data.get("sha")
+                    if self._file_changed(review, file_data):
+                        changed_paths.append(file_data["filename"])
+                        yield file_data
+
+            full_pr_data["files"] = changed_files()
+
+            # Run orchestrator
+            with span("analyze"):
+                analysis_result = await self.orchestrator.analyze_pull_request(
+                    full_pr_data, ignore_patterns=repo.review_ignore_patterns
+                )
+            agent_results = analysis_result.get("agent_results", [])
+            timed_out_files = analysis_result.get("timed_out_files", [])
+            # Files the listing never reached are not known to be removed
+            listing_complete = analysis_result.get("listing_complete", True)
+            stale_paths = changed_paths + (self._removed_paths(review, file_shas) if listing_complete else [])
+
+            # Findings on re-analyzed or removed files are replaced, the rest carry forward;
+            # a collapsed finding goes stale at each of its locations in those files
+            stale_keys = set()
+            if stale_paths:
+                stale_files = set(stale_paths) - set(timed_out_files)
+                stale_keys = {
+                    (entry["fingerprint"], entry["context_hash"])
+                    for comment in db.query(ReviewComment).filter(ReviewComment.review_id == review.id)
+                    for entry in history_entries(self._comment_finding(comment))
+                    if entry["file_path"] in stale_files
+                }
+                db.query(ReviewComment).filter(
+                    ReviewComment.review_id == review.id,
+                    ReviewComment.file_path.in_(stale_paths)
+                ).delete(synchronize_session=False)
+
+            carried_forward = db.query(ReviewComment).filter(
+                ReviewComment.review_id == review.id
+            ).count()
+
+            # Update review with results
+            review.status = ReviewStatus.COMPLETED
+            review.summary = analysis_result.get("summary", "")
+            if carried_forward:
+                review.summary += (
+                    f" {len(file_shas) - len(changed_paths)} unchanged files skipped,"
+                    f" {carried_forward} findings carried forward."
+                )
+            if agent_results or review.confidence_score is None:
+                review.confidence_score = analysis_result.get("confidence_score", 0)
+            # Timed-out files are left out so the next pass reviews them again
+            for file_path in timed_out_files:
+                file_shas.pop(file_path, None)
+            review.last_reviewed_sha = full_pr_data.get("head", {}).get("sha")
+            review.file_shas = file_shas
+
+            # Save agent runs
+            for agent_result in agent_results:
+                agent_run = AgentRun(
+                    review_id=review.id,
+                    agent_name=agent_result.agent_name,
+                    status=agent_result.status,
+                    output_data=agent_result.dict(),
+                    execution_time=agent_result.execution_time,
+                    error_message=agent_result.error_message
+                )
+                db.add(agent_run)
+
+            # Keep the routing decisions so triage skip rate and recall can be audited
+            if analysis_result.get("triage", {}).get("decisions"):
+                db.add(AgentRun(
+                    review_id=review.id,
+                    agent_name="triage",
+                    status="completed",
+                    output_data=analysis_result["triage"],
+                    execution_time=0
+                ))
+
+            # Save review comments, one per deduplicated finding not already raised
+            findings = analysis_result.get("findings", [])
+            # Each finding has a key per location it was collapsed from; looked up even
+            # without suppression, so existing records are updated rather than inserted twice
+            finding_keys = [
+                [(entry["fingerprint"], entry["context_hash"]) for entry in history_entries(finding)]
+                for finding in findings
+            ]
+            history = self.finding_index.lookup(db, repo.id, [key for keys in finding_keys for key in keys])
+
+            new_comments = []
+            posted_findings = []
+            suppressed = 0
+            for finding, keys in zip(findings, finding_keys):
+                # A repeat only if it was raised at every location before
+                records = [history.get(key) for key in keys]
+                repeat = bool(records) and all(
+                    record is not None and record.state != FindingState.RESOLVED for record in records
+                )
+                this_review = repeat and all(record.review_id == review.id for record in records)
+                ignored = any(record is not None and record.state == FindingState.IGNORED for record in records)
+                if settings.review_suppress_repeats and repeat and (ignored or not this_review):
+                    suppressed += 1  # Dismissed, or already raised on an earlier PR
+                    continue
+
+                comment = ReviewComment(
+                    review_id=review.id,
+                    file_path=finding.get("file_path", ""),
+                    line_number=finding.get("line_number"),
+                    comment_type=ReviewType(finding["agent_name"]),
+                    content=finding.get("description", ""),
+                    severity=finding.get("severity", "medium"),
+                    fingerprint=finding.get("fingerprint"),
+                    context_hash=finding.get("context_hash"),
+                    locations=finding.get("locations")
+                )
+                db.add(comment)
+                # Repeats from an earlier pass on this PR are already on GitHub
+                if not this_review:
+                    new_comments.append(comment)
+                    posted_findings.append(finding)
+
+            self.finding_index.record_posted(
+                db, repo.id, review.id,
+                [entry for finding in posted_findings for entry in history_entries(finding)], history
+            )
+
+            # Findings that no longer come back on re-reviewed files count as resolved
+            resolved_keys = stale_keys - {key for keys in finding_keys for key in keys}
+            if resolved_keys:
+                self.finding_index.set_state(db, repo.id, resolved_keys, FindingState.RESOLVED)
+
+            if suppressed:
+                review.summary += f" {suppressed} findings already raised on earlier PRs were not repeated."
+                FINDINGS_SUPPRESSED.inc(suppressed, repository=repo.full_name)
+
+            with span("db_commit"):
+                db.commit()
+        except Exception as e:
+            print(f"Error running agent analysis: {e}")
+            db.rollback()
+            review.status = ReviewStatus.FAILED
+            db.commit()
+            raise
+
+        # Post only the new comments to GitHub; carried-forward ones are already there
+        with span("post_comments"):
+            await self.post_review_comments(review, new_comments)
+
+        # Unlisted files are missing from file_shas, so the follow-up reviews them too
+        if timed_out_files or not listing_complete:
+            await self.queue_followup(review, full_pr_data, timed_out_files, followup_depth)
+
+    async def pull_request_data(self, review: Review, pr_data: Dict[str, Any],
+                                owner: str, repo_name: str) -> Dict[str, Any]:
+        """Build the PR model from the queued payload, fetching it only when the payload is partial"""
+        # Webhooks carry the whole pull request object; follow-ups carry the model
+        if "title" in pr_data and ("base" in pr_data or "repository" in pr_data):
+            try:
+                model = pull_request_model(pr_data)
+                PR_METADATA.inc(source="payload")
+                return model
+            except (KeyError, TypeError) as e:
+                print(f"Incomplete pull request payload, fetching it from GitHub: {e}")
+
+        PR_METADATA.inc(source="github")
+        with span("github_fetch"):
+            return await self.github_service.get_pull_request(
+                owner, repo_name, review.github_pr_id, include_files=False
+            )
+
+    async def queue_followup(self, review: Review, pr_data: Dict[str, Any],
+                             timed_out_files: List[str], followup_depth: int):
+        """Queue another pass over the files a review ran out of time on"""
+        if not settings.review_followup_on_timeout or followup_depth >= settings.review_max_followups:
+            print(f"Review {review.id}: {len(timed_out_files)} files timed out, no follow-up queued")
+            return
+
+        head_sha = pr_data.get("head", {}).get("sha")
+        await self.queue.enqueue(
+            FOLLOWUP_EVENT,
+            {
+                "repository": {"id": review.repository.github_id},
+                # The PR model without its files, so the follow-up need not fetch it again
+                "pull_request": {key: value for key, value in pr_data.items() if key != "files"},
+                "followup_depth": followup_depth + 1
+            },
+            job_id=f"followup:{review.id}:{head_sha}:{followup_depth + 1}",
+            delay=settings.review_followup_delay
+        )
+
+    def _file_changed(self, review: Review, file_data: Dict[str, Any]) -> bool:
+        """Whether a file's blob changed since the last review; on the first review every file has"""
+        previous_shas = review.file_shas or {}
+        if not review.last_reviewed_sha or not previous_shas:
+            return True
+        return not file_data.get("sha") or previous_shas.get(file_data["filename"]) != file_data.get("sha")
+
+    def _removed_paths(self, review: Review, file_shas: Dict[str, Optional[str]]) -> List[str]:
+        """Paths reviewed before that are no longer in the pull request, so their findings are stale"""
+        if not review.last_reviewed_sha:
+            return []
+        return [path for path in review.file_shas or {} if path not in file_shas]
+
+    async def post_review_comments(self, review: Review, comments: List[ReviewComment]):
+        """Post review comments to GitHub as a single review.
+
+        Line comments go inline; findings without a line go in the review
+        body. The commit is the one just reviewed, so no head lookup is needed.
+        """
+        try:
+            repo = review.repository
+            owner = repo.full_name.split("/")[0]
+            repo_name = repo.full_name.split("/")[1]
+
+            inline = [comment for comment in comments if comment.line_number and comment.file_path]
+            general = [comment for comment in comments if not (comment.line_number and comment.file_path)]
+            if not inline and not general:
+                return
+
+            result = await self.github_service.create_review(
+                owner, repo_name, review.github_pr_id,
+                [
+                    {'path': comment.file_path, 'line': comment.line_number, 'body': self._format_comment(comment)}
+                    for comment in inline
+                ],
+                body="\n\n---\n\n".join(self._format_comment(comment, with_path=True) for comment in general),
+                commit_id=review.last_reviewed_sha
+            )
+
+            # One comment at a time took a head lookup and a POST per line comment
+            saved = max(0, 2 * len(inline) - result['requests'])
+            COMMENTS_POSTED.inc(result['comments_posted'] + len(general), repository=repo.full_name)
+            GITHUB_CALLS_SAVED.inc(saved, repository=repo.full_name)
+            print(f"Posted {result['comments_posted']} inline and {len(general)} general comments on "
+                  f"{repo.full_name}#{review.github_pr_id} in {result['requests']} GitHub requests ({saved} saved)")
+
+        except Exception as e:
+            print(f"Error posting review comments: {e}")
+
+    def _comment_finding(self, comment: ReviewComment) -> Dict[str, Any]:
+        """The parts of a stored comment that key its finding history"""
+        return {
+            "fingerprint": comment.fingerprint,
+            "context_hash": comment.context_hash,
+            "file_path": comment.file_path,
+            "locations": comment.locations
+        }
+
+    def _format_comment(self, comment: ReviewComment, with_path: bool = False) -> str:
+        """Format a review comment body, listing the other places a collapsed finding was reported"""
+        body = f"**{comment.comment_type.value.title()} Review**"
+        if with_path and comment.file_path:
+            body += f" in `{comment.file_path}`"
+        body += f"\n\n{comment.content}"
+        others = [
+            location for location in comment.locations or []
+            if (location.get("file_path"), location.get("line_number")) != (comment.file_path, comment.line_number)
+        ]
+        if others:
+            body += "\n\nAlso found at:\n" + "\n".join(
+                f"- `{location['file_path']}`" + (f" line {location['line_number']}" if location.get("line_number") else "")
+                for location in others
+            )
+        return body
+
+    async def mark_review_completed(self, pr_data: Dict[str, Any], repo_data: Dict[str, Any], db: Session):
+        """Mark review as completed when PR is closed"""
+        repo = db.query(Repository).filter(
+            Repository.github_id == repo_data.get("id")
+        ).first()
+
+        if repo:
+            review = db.query(Review).filter(
+                Review.github_pr_id == pr_data.get("number"),
+                Review.repository_id == repo.id
+            ).first()
+
+            if review:
+                review.status = ReviewStatus.COMPLETED
+                db.commit()
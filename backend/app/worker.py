@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import time
+from typing import List, Optional, Sequence, Set
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import get_metrics
+from app.services.github import close_http_client
+from app.services.queue import ReviewQueue, ReviewJob, get_review_queue
+from app.services.review_processor import ReviewProcessor
+
+QUEUE_WAIT_SECONDS = get_metrics().histogram(
+    "codelion_queue_wait_seconds", "Time from enqueue to a worker picking the job up, debounce included", ["event"]
+)
+JOBS = get_metrics().counter(
+    "codelion_jobs_total", "Queue jobs processed by outcome", ["event", "status"]
+)
+JOBS_STOLEN = get_metrics().counter(
+    "codelion_jobs_stolen_total", "Jobs an idle worker took from a shard it does not own"
+)
+OWNED_SHARDS = get_metrics().gauge(
+    "codelion_worker_owned_shards", "Queue shards this worker currently owns"
+)
+
+class ReviewWorker:
+    """Drains the review queue, running up to ``concurrency`` jobs at once.
+
+    Workers register with the queue and split its repository shards between
+    them, so a repository's reviews keep landing on the same process. A
+    worker with free slots and nothing in its own shards takes jobs that
+    have waited longer than ``steal_after`` in someone else's.
+    """
+
+    def __init__(self, queue: Optional[ReviewQueue] = None,
+                 processor: Optional[ReviewProcessor] = None,
+                 concurrency: Optional[int] = None,
+                 poll_interval: float = 1.0,
+                 worker_id: Optional[str] = None,
+                 steal_after: Optional[float] = None,
+                 membership_ttl: Optional[float] = None,
+                 drain_timeout: Optional[float] = None):
+        self.queue = queue or get_review_queue()
+        self.processor = processor or ReviewProcessor()
+        self.concurrency = concurrency or settings.review_worker_concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.steal_after = steal_after if steal_after is not None else settings.review_worker_steal_after
+        self.membership_ttl = membership_ttl or settings.review_worker_membership_ttl
+        self.drain_timeout = drain_timeout if drain_timeout is not None else settings.review_worker_drain_timeout
+        self._running = False
+        self._tasks: Set[asyncio.Task] = set()
+        self._owned: List[int] = []
+        self._joined_at = 0.0
+        self._drain_deadline: Optional[asyncio.TimerHandle] = None
+
+    async def run(self):
+        """Process jobs until stopped, then drain the ones in flight"""
+        self._running = True
+        slots = asyncio.Semaphore(self.concurrency)
+
+        try:
+            while self._running:
+                await slots.acquire()
+                if not self._running:
+                    slots.release()
+                    break
+
+                try:
+                    job = await self._reserve()
+                except Exception as e:
+                    print(f"Error reserving review job: {e}")
+                    job = None
+
+                if job is None:
+                    slots.release()
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                task = asyncio.create_task(self._process(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+
+            if self._tasks:
+                print(f"Worker {self.worker_id} draining {len(self._tasks)} review jobs")
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            if self._drain_deadline:
+                self._drain_deadline.cancel()
+            try:
+                await self.queue.leave(self.worker_id)
+            except Exception as e:
+                print(f"Error leaving the worker group: {e}")
+
+    def stop(self):
+        """Stop reserving new jobs and let in-flight jobs finish.
+
+        Jobs still running after ``drain_timeout``, or when stop is called a
+        second time, are cancelled and handed back to the queue.
+        """
+        if not self._running:
+            self._cancel_in_flight()
+            return
+        self._running = False
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._drain_deadline = loop.call_later(self.drain_timeout, self._cancel_in_flight)
+
+    def _cancel_in_flight(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def _reserve(self) -> Optional[ReviewJob]:
+        """Reserve a job from the owned shards, or steal one that has waited too long"""
+        now = time.time()
+        if now - self._joined_at > self.membership_ttl / 3:
+            await self._join(now)
+
+        job = await self.queue.reserve(self._owned)
+        if job is not None or self.steal_after < 0:
+            return job
+
+        # Deepest backlog first; jobs the owner should reach soon are left to it
+        ready_by = now - self.steal_after
+        owned = set(self._owned)
+        depths = await self.queue.shard_depths(ready_by)
+        busiest = sorted(
+            (shard for shard, depth in enumerate(depths) if depth and shard not in owned),
+            key=lambda shard: -depths[shard]
+        )
+        if not busiest:
+            return None
+        job = await self.queue.reserve(busiest, ready_by)
+        if job is not None:
+            JOBS_STOLEN.inc()
+        return job
+
+    async def _join(self, now: float):
+        """Refresh this worker's membership and recompute the shards it owns"""
+        try:
+            owned = await self.queue.join(self.worker_id, self.membership_ttl)
+        except Exception as e:
+            print(f"Error refreshing worker membership: {e}")
+            owned = list(range(self.queue.shard_count))  # Without membership, work every shard
+        if owned != self._owned:
+            print(f"Worker {self.worker_id} owns {len(owned)} of {self.queue.shard_count} shards")
+        self._owned = owned
+        self._joined_at = now
+        OWNED_SHARDS.set(len(owned))
+
+    async def _process(self, job: ReviewJob):
+        """Run a single job and ack or fail it"""
+        QUEUE_WAIT_SECONDS.observe(max(0.0, time.time() - job.enqueued_at), event=job.event_type)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        db = SessionLocal()
+        try:
+            await self.processor.process_event(job.event_type, job.payload, db)
+            await self.queue.ack(job)
+            JOBS.inc(event=job.event_type, status="acked")
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without spending one of its attempts
+            print(f"Releasing review job {job.id} unfinished")
+            await self.queue.release(job)
+            JOBS.inc(event=job.event_type, status="released")
+            raise
+        except Exception as e:
+            print(f"Error processing review job {job.id} (attempt {job.attempts}): {e}")
+            await self.queue.fail(job, str(e))
+            JOBS.inc(event=job.event_type, status="failed")
+        finally:
+            heartbeat.cancel()
+            db.close()
+
+    async def _heartbeat(self, job: ReviewJob):
+        """Extend the job's visibility timeout while it is being processed"""
+        interval = max(1.0, self.queue.visibility_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            await self.queue.heartbeat(job)
+
+def main():
+    parser = argparse.ArgumentParser(description="CodeLion review worker")
+    parser.add_argument("--concurrency", type=int, default=settings.review_worker_concurrency,
+                        help="Number of reviews processed at once, per process")
+    parser.add_argument("--processes", type=int, default=settings.review_worker_processes,
+                        help="Number of worker processes to run on this node")
+    parser.add_argument("--metrics-port", type=int, default=settings.metrics_worker_port,
+                        help="Port to serve Prometheus metrics on, 0 to disable; "
+                             "process N of a pool uses this port plus N")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        supervise(args.processes, args.concurrency, args.metrics_port)
+        return
+
+    worker = ReviewWorker(concurrency=args.concurrency)
+    asyncio.run(run_worker(worker, args.metrics_port))
+
+async def run_worker(worker: ReviewWorker, metrics_port: int,
+                     stop_signals: Sequence[int] = (signal.SIGTERM, signal.SIGINT)):
+    """Run the worker until one of ``stop_signals`` arrives, serving its metrics when a port is given"""
+    loop = asyncio.get_running_loop()
+    for signum in stop_signals:
+        loop.add_signal_handler(signum, worker.stop)
+
+    server = None
+    if metrics_port:
+        try:
+            server = await get_metrics().serve("0.0.0.0", metrics_port)
+        except OSError as e:
+            # Another worker on this host has the port; review without serving metrics
+            print(f"Error serving worker metrics on port {metrics_port}: {e}")
+    try:
+        await worker.run()
+    finally:
+        if server:
+            server.close()
+        await close_http_client()
+        for signum in stop_signals:
+            loop.remove_signal_handler(signum)
+
+def _run_pool_process(concurrency: int, metrics_port: int):
+    """Entry point of one pooled worker process"""
+    # Ctrl-C reaches the whole process group; the supervisor turns it into a single SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = ReviewWorker(concurrency=concurrency)
+    asyncio.run(run_worker(worker, metrics_port, stop_signals=(signal.SIGTERM,)))
+
+def supervise(processes: int, concurrency: int, metrics_port: int, restart_delay: float = 1.0):
+    """Run ``processes`` workers, restarting any that crash, until SIGTERM or SIGINT.
+
+    Each process gets its own event loop, database connections and Gemini
+    client, so a slow review or a leak in one cannot stall the others. A
+    stop signal is passed on as SIGTERM and the supervisor waits for every
+    worker to drain; a second signal makes them cancel their jobs instead.
+    """
+    # Spawn rather than fork: the children must not share the parent's sockets or event loop
+    context = multiprocessing.get_context("spawn")
+    children = {}
+    stopping = False
+
+    def start(index: int):
+        port = metrics_port + index if metrics_port else 0
+        process = context.Process(target=_run_pool_process, args=(concurrency, port),
+                                  name=f"review-worker-{index}")
+        process.start()
+        children[index] = process
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in children.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for index in range(processes):
+        start(index)
+    print(f"Started {processes} review worker processes")
+
+    while children:
+        multiprocessing.connection.wait([process.sentinel for process in children.values()], timeout=1.0)
+        for index, process in list(children.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del children[index]
+            if not stopping and process.exitcode != 0:
+                print(f"Review worker {index} exited with code {process.exitcode}, restarting")
+                time.sleep(restart_delay)
+                if not stopping:
+                    start(index)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""Offline benchmarks; run from backend/ with ``python -m benchmarks.<name>``"""
+import os
+
+# Settings has required fields; benchmarks never touch the real services
+for _name in ["DATABASE_URL", "POSTGRES_URL", "POSTGRES_USER", "POSTGRES_HOST", "POSTGRES_PASSWORD",
+              "POSTGRES_DATABASE", "POSTGRES_PRISMA_URL", "POSTGRES_URL_NON_POOLING", "SECRET_KEY",
+              "SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_JWT_SECRET",
+              "NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY"]:
+    os.environ.setdefault(_name, "sqlite://" if _name == "DATABASE_URL" else "benchmark")
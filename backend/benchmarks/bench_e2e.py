@@ -0,0 +1,298 @@
+"""End-to-end review throughput and latency on synthetic pull requests.
+
+Runs synthetic PRs of a chosen shape either straight through
+ReviewOrchestrator.analyze_pull_request ("orchestrator") or through the full
+webhook path ("webhook"): signed POST to /api/webhooks/github, the in-memory
+queue, ReviewWorker and ReviewProcessor with a throwaway SQLite database.
+Gemini and GitHub are fakes with configurable latency and failure rates;
+``--github api`` runs the real GitHubService against a fake GitHub REST API.
+
+Reports reviews per minute, p50/p95/p99 latency, LLM calls per review and
+peak RSS, and writes them as JSON so runs can be compared.
+
+    cd backend && python -m benchmarks.bench_e2e --mode webhook --reviews 50 --output e2e.json
+    cd backend && python -m benchmarks.bench_e2e --baseline e2e.json
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Before any app import: settings are read once
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("REVIEW_QUEUE_BACKEND", "memory")
+os.environ.setdefault("REVIEW_DEBOUNCE_SECONDS", "0")
+os.environ.setdefault("GITHUB_CLIENT_ID", "benchmark")
+os.environ.setdefault("GITHUB_CLIENT_SECRET", "benchmark")
+if os.environ.get("DATABASE_URL") == "sqlite://":
+    # Worker sessions each open their own connection, so in-memory SQLite would not be shared
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='codelion-bench-')}/bench.db"
+
+from app.core.config import settings
+from app.agents.orchestrator import ReviewOrchestrator
+from benchmarks.fakes import (
+    SHAPES, FakeGitHubAPI, FakeGitHubService, LatencyModel, make_pull_request, pull_request_object
+)
+
+# Metrics compared against --baseline, and whether higher is better
+COMPARED_METRICS = {
+    'reviews_per_minute': True,
+    'latency_p50_ms': False,
+    'latency_p95_ms': False,
+    'latency_p99_ms': False,
+    'llm_calls_per_review': False,
+    'peak_rss_mb': False,
+}
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def make_pull_requests(args, rng):
+    shape = dict(SHAPES[args.shape])
+    if args.files:
+        shape["files"] = args.files
+    if args.lines:
+        shape["lines"] = args.lines
+    return {
+        (f"bench/repo-{number % args.repos}", number): make_pull_request(f"bench/repo-{number % args.repos}", number, shape, rng)
+        for number in range(1, args.reviews + 1)
+    }
+
+async def run_orchestrator(args, pull_requests):
+    """Call analyze_pull_request directly, up to --concurrency reviews at a time"""
+    orchestrator = ReviewOrchestrator()
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failed = 0
+    findings = 0
+
+    async def review(pr_data):
+        nonlocal failed, findings
+        async with slots:
+            started = time.perf_counter()
+            try:
+                result = await orchestrator.analyze_pull_request(dict(pr_data), bypass_cache=True)
+                findings += len(result.get('findings', []))
+            except Exception as e:
+                print(f"Review of PR {pr_data['number']} failed: {e}")
+                failed += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(review(pr_data) for pr_data in pull_requests.values()))
+    return latencies, failed, findings, time.perf_counter() - started, {}
+
+async def run_webhook(args, pull_requests):
+    """Send signed webhooks and time each PR until its worker job finishes"""
+    import httpx
+    from app.core.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models.repository import Repository
+    from app.models.review import ReviewComment
+    from app.services.github import GitHubService
+    from app.services.queue import get_review_queue
+    from app.services.review_processor import ReviewProcessor
+    from app.worker import ReviewWorker
+
+    # A throwaway database, so the tables are created directly rather than migrated
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    repos = sorted({full_name for full_name, _ in pull_requests})
+    for github_id, full_name in enumerate(repos, start=1):
+        db.add(Repository(github_id=github_id, name=full_name.split("/")[1], full_name=full_name))
+    db.commit()
+    repo_ids = {full_name: github_id for github_id, full_name in enumerate(repos, start=1)}
+
+    if args.github == "api":
+        github = FakeGitHubAPI(pull_requests, args.github_latency)
+        github_client = github.client()
+        processor = ReviewProcessor(github_service=GitHubService(client=github_client, base_url=github.base_url))
+    else:
+        github = FakeGitHubService(pull_requests, args.github_latency)
+        github_client = None
+        processor = ReviewProcessor(github_service=github)
+    queue = get_review_queue()
+    sent = {}
+    finished = {}
+    pending = len(pull_requests)
+    done = asyncio.Event()
+
+    process_event = processor.process_event
+
+    async def timed_process_event(event_type, payload, session):
+        nonlocal pending
+        await process_event(event_type, payload, session)
+        key = (payload["repository"]["id"], payload["pull_request"]["number"])
+        if key in sent and key not in finished:
+            finished[key] = time.perf_counter() - sent[key]
+            pending -= 1
+            if not pending:
+                done.set()
+
+    processor.process_event = timed_process_event
+    worker = ReviewWorker(queue=queue, processor=processor, concurrency=args.concurrency, poll_interval=0.01)
+    worker_task = asyncio.create_task(worker.run())
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for (full_name, number), pr_data in pull_requests.items():
+            repo_id = repo_ids[full_name]
+            body = json.dumps({
+                "action": "opened",
+                "number": number,
+                "pull_request": pull_request_object(full_name, pr_data),
+                "repository": {"id": repo_id, "full_name": full_name}
+            }).encode()
+            signature = hmac.new(settings.github_client_secret.encode(), body, hashlib.sha256).hexdigest()
+            sent[(repo_id, number)] = time.perf_counter()
+            response = await client.post("/api/webhooks/github", content=body, headers={
+                "X-GitHub-Event": "pull_request",
+                "X-GitHub-Delivery": f"bench-{repo_id}-{number}",
+                "X-Hub-Signature-256": f"sha256={signature}",
+                "Content-Type": "application/json"
+            })
+            response.raise_for_status()
+            if args.arrival_rate:
+                await asyncio.sleep(1 / args.arrival_rate)
+
+        try:
+            await asyncio.wait_for(done.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            print(f"Timed out with {pending} reviews unfinished")
+    elapsed = time.perf_counter() - started
+
+    worker.stop()
+    await worker_task
+    if github_client:
+        await github_client.aclose()
+
+    queue_stats = await queue.backend.stats()
+    findings = db.query(ReviewComment).count()
+    db.close()
+    extra = {
+        'github_calls_per_review': github.calls / len(pull_requests),
+        'github_not_modified': getattr(github, 'not_modified', 0),
+        'comments_posted': github.comments_posted,
+        'dead_letters': queue_stats.get('dead', 0)
+    }
+    return list(finished.values()), pending, findings, elapsed, extra
+
+def compare(metrics, baseline, max_regression):
+    """Print changes against a baseline run; True if any metric regressed too far"""
+    regressed = False
+    for name, higher_is_better in COMPARED_METRICS.items():
+        old, new = baseline.get(name), metrics.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        flag = " REGRESSION" if worse > max_regression else ""
+        regressed = regressed or bool(flag)
+        print(f"  {name:22s} {old:10.1f} -> {new:10.1f} ({change:+6.1f}%){flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--mode", choices=["orchestrator", "webhook"], default="orchestrator")
+    parser.add_argument("--reviews", type=int, default=20)
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="mixed")
+    parser.add_argument("--files", type=int, help="override the shape's files per PR")
+    parser.add_argument("--lines", type=int, help="override the shape's added lines per hunk")
+    parser.add_argument("--repos", type=int, default=3, help="repositories the PRs are spread over")
+    parser.add_argument("--concurrency", type=int, default=4, help="reviews in flight")
+    parser.add_argument("--arrival-rate", type=float, default=0, help="webhooks per second, 0 sends all at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="median seconds per LLM call")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5, help="lognormal spread")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.01, help="seconds per 1k prompt tokens")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of LLM calls that fail")
+    parser.add_argument("--github-latency", type=float, default=0.05, help="seconds per GitHub API call")
+    parser.add_argument("--github", choices=["service", "api"], default="service",
+                        help="fake GitHubService, or the real client against a fake REST API")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for webhook reviews")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="percent; exit 1 beyond this")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pull_requests = make_pull_requests(args, rng)
+    model = LatencyModel(args.latency, args.per_1k_tokens, distribution=args.latency_dist,
+                         sigma=args.sigma, failure_rate=args.failure_rate, seed=args.seed)
+    model.install()
+
+    run = run_webhook if args.mode == "webhook" else run_orchestrator
+    latencies, failed, findings, elapsed, extra = asyncio.run(run(args, pull_requests))
+
+    completed = len(latencies)
+    metrics = {
+        'reviews': completed,
+        'failed_reviews': failed,
+        'elapsed_seconds': elapsed,
+        'reviews_per_minute': completed / elapsed * 60 if elapsed else 0.0,
+        'latency_mean_ms': sum(latencies) / completed * 1000 if completed else 0.0,
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p95_ms': percentile(latencies, 0.95) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'latency_max_ms': max(latencies, default=0.0) * 1000,
+        'llm_calls_per_review': model.calls / len(pull_requests),
+        'llm_failures': model.failures,
+        'prompt_tokens_per_review': model.prompt_tokens / len(pull_requests),
+        'findings_per_review': findings / len(pull_requests),
+        'peak_rss_mb': peak_rss_mb(),
+        **extra
+    }
+
+    print(f"{args.mode}: {completed} reviews ({failed} failed) in {elapsed:.2f}s, "
+          f"{metrics['reviews_per_minute']:.1f} reviews/min")
+    print(f"  latency p50 {metrics['latency_p50_ms']:.0f}ms, p95 {metrics['latency_p95_ms']:.0f}ms, "
+          f"p99 {metrics['latency_p99_ms']:.0f}ms")
+    print(f"  {metrics['llm_calls_per_review']:.1f} LLM calls/review ({model.failures} failed), "
+          f"{metrics['findings_per_review']:.1f} findings/review, peak RSS {metrics['peak_rss_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({
+                'benchmark': 'e2e',
+                'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                'revision': git_revision(),
+                'config': vars(args),
+                'metrics': metrics
+            }, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Against {args.baseline} ({baseline.get('revision') or 'unknown revision'}):")
+        if compare(metrics, baseline['metrics'], args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare batched small-file prompts against one prompt per file.
+
+Runs ReviewOrchestrator over a synthetic PR of many small patches with a
+fake Gemini whose latency grows with prompt size, and reports LLM calls,
+prompt tokens and wall time for both paths.
+
+    cd backend && python -m benchmarks.bench_packing --files 80
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from app.core.config import settings
+from app.agents.orchestrator import ReviewOrchestrator
+from app.agents.scheduler import ReviewScheduler
+from benchmarks.fakes import LatencyModel
+
+def make_pull_request(file_count: int, lines_per_file: int):
+    files = []
+    for index in range(file_count):
+        body = "\n".join(f"+value_{index}_{line} = compute({line})" for line in range(lines_per_file))
+        files.append({
+            'filename': f"src/module_{index}.py",
+            'patch': f"@@ -1,0 +1,{lines_per_file} @@\n{body}"
+        })
+    return {'title': 'Synthetic PR', 'body': '', 'repository': {'full_name': 'bench/repo'}, 'files': files}
+
+async def run_once(pr_data, batching: bool, model: LatencyModel, concurrency: int):
+    settings.review_batching_enabled = batching
+    orchestrator = ReviewOrchestrator(scheduler=ReviewScheduler(concurrency))
+    started = time.perf_counter()
+    result = await orchestrator.analyze_pull_request(pr_data)
+    elapsed = time.perf_counter() - started
+    findings = sum(len(agent_result.findings) for agent_result in result['agent_results'])
+    return elapsed, findings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=80)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--base-latency", type=float, default=0.4, help="seconds per call")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.02, help="seconds per 1k prompt tokens")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    pr_data = make_pull_request(args.files, args.lines)
+    settings.review_per_review_concurrency = args.concurrency
+
+    for batching in (False, True):
+        model = LatencyModel(args.base_latency, args.per_1k_tokens)
+        model.install()
+        elapsed, findings = asyncio.run(run_once(pr_data, batching, model, args.concurrency))
+        label = "batched " if batching else "per-file"
+        print(f"{label}: {model.calls:4d} LLM calls, {model.prompt_tokens:7d} prompt tokens, "
+              f"{elapsed:6.2f}s, {findings} findings, {args.files / elapsed:6.1f} files/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare the findings parsers on a corpus of recorded model responses.
+
+Measures parse throughput and accuracy (findings matched by severity, and
+line numbers recovered) for the original line-by-line prose parser and for
+the current JSON-first parser with its prose fallback.
+
+    cd backend && python -m benchmarks.bench_parsing --iterations 2000
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+from app.agents.findings import parse_json_findings, parse_text_findings
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "responses.json")
+
+def original_parse(review_text):
+    """The parser agents used before JSON output, kept as the baseline"""
+    findings = []
+    current_finding = None
+    for line in review_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if any(keyword in line.lower() for keyword in ['critical', 'high', 'medium', 'low']):
+            if current_finding:
+                findings.append(current_finding)
+            severity = 'medium'
+            if 'critical' in line.lower():
+                severity = 'critical'
+            elif 'high' in line.lower():
+                severity = 'high'
+            elif 'low' in line.lower():
+                severity = 'low'
+            current_finding = {'severity': severity, 'description': line, 'suggestion': '', 'line_number': None}
+        elif current_finding and line.startswith('-'):
+            current_finding['suggestion'] = line[1:].strip()
+        elif current_finding:
+            current_finding['description'] += ' ' + line
+    if current_finding:
+        findings.append(current_finding)
+    return findings
+
+def current_parse(review_text):
+    findings = parse_json_findings(review_text)
+    return findings if findings is not None else parse_text_findings(review_text)
+
+PARSERS = {'original': original_parse, 'current': current_parse}
+
+def score(parser, corpus):
+    """Count findings matched by severity and line numbers recovered"""
+    expected_total = found_total = matched = lines_expected = lines_matched = 0
+    for entry in corpus:
+        found = parser(entry['response'])
+        expected = entry['expected']
+        expected_total += len(expected)
+        found_total += len(found)
+        matched += sum((Counter(f['severity'] for f in found) & Counter(e['severity'] for e in expected)).values())
+
+        found_lines = Counter(f['line_number'] for f in found if f['line_number'] is not None)
+        wanted_lines = Counter(e['line_number'] for e in expected if e['line_number'] is not None)
+        lines_expected += sum(wanted_lines.values())
+        lines_matched += sum((found_lines & wanted_lines).values())
+
+    return {
+        'precision': matched / found_total if found_total else 1.0,
+        'recall': matched / expected_total if expected_total else 1.0,
+        'line_recall': lines_matched / lines_expected if lines_expected else 1.0,
+        'false_findings': found_total - matched
+    }
+
+def throughput(parser, corpus, iterations):
+    """Responses parsed per second"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for entry in corpus:
+            parser(entry['response'])
+    return iterations * len(corpus) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--corpus", default=CORPUS)
+    args = parser.parse_args()
+
+    with open(args.corpus) as corpus_file:
+        corpus = json.load(corpus_file)
+
+    for name, parse in PARSERS.items():
+        accuracy = score(parse, corpus)
+        rate = throughput(parse, corpus, args.iterations)
+        print(f"{name:8s}: {rate:9.0f} responses/s, precision {accuracy['precision']:.2f}, "
+              f"recall {accuracy['recall']:.2f}, line recall {accuracy['line_recall']:.2f}, "
+              f"{accuracy['false_findings']} false findings")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cold-start time of the API and worker entry points.
+
+Imports each module in a fresh interpreter several times and reports the
+median import time, whole-process wall time and peak RSS, and which heavy
+SDKs the import pulled in. Run it before and after a change to compare.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# SDKs that should only load once a review actually needs them
+HEAVY_MODULES = ["google.generativeai", "google.api_core", "github", "grpc"]
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'import_seconds': elapsed,
+    'peak_rss_mb': rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+def measure(module, env):
+    """Import a module in a fresh interpreter; returns the probe's report plus wall time"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=env, check=True
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    report['process_seconds'] = time.perf_counter() - started
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--modules", nargs="+", default=["app.main", "app.worker"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    # The probes inherit the benchmark settings set up in benchmarks/__init__.py
+    env = dict(os.environ)
+    results = {}
+    for module in args.modules:
+        measure(module, env)  # Warm the bytecode cache
+        reports = [measure(module, env) for _ in range(args.runs)]
+        results[module] = {
+            'import_seconds': statistics.median(report['import_seconds'] for report in reports),
+            'process_seconds': statistics.median(report['process_seconds'] for report in reports),
+            'peak_rss_mb': max(report['peak_rss_mb'] for report in reports),
+            'heavy_modules': reports[-1]['heavy_modules']
+        }
+        result = results[module]
+        print(f"{module:12s}: import {result['import_seconds'] * 1000:6.0f}ms, "
+              f"process {result['process_seconds'] * 1000:6.0f}ms, peak RSS {result['peak_rss_mb']:5.0f} MB, "
+              f"heavy SDKs loaded: {', '.join(result['heavy_modules']) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({
+                'benchmark': 'startup',
+                'timestamp': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                'config': vars(args),
+                'results': results
+            }, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
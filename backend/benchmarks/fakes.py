@@ -0,0 +1,351 @@
+"""Fake Gemini and GitHub services shared by the benchmarks"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.agents.packer import estimate_tokens
+from app.core.config import settings
+from app.services.gemini import GeminiError, GeminiService
+
+# "### File: path" in batched prompts, "File: path" in single-file ones
+_PROMPT_FILE = re.compile(r"^\s*(?:### )?File: (?P<path>[^<\s]\S*)$", re.MULTILINE)
+_HUNK_START = re.compile(r"^\s*@@ -\d+(?:,\d+)? \+(\d+)", re.MULTILINE)
+
+_FINDINGS = [
+    ("high", "User input reaches a SQL query without parameterization", "Use bound parameters"),
+    ("medium", "Database call inside a loop causes N+1 queries", "Fetch the rows in one query"),
+    ("medium", "Variable name does not describe its value", "Rename it"),
+    ("low", "Function is missing a docstring", "Document the return value"),
+    ("critical", "Secret is hard-coded in source", "Load it from the environment"),
+    ("medium", "Exception is swallowed without logging", "Log or re-raise it"),
+    ("low", "Magic number should be a named constant", "Extract a constant"),
+    ("high", "Unbounded list grows with request size", "Stream or paginate the results"),
+]
+
+class LatencyModel:
+    """Fake Gemini: a round-trip latency drawn from a distribution, plus a per-token cost.
+
+    ``distribution`` is ``fixed``, ``uniform`` (0 to twice the base) or
+    ``lognormal`` (median ``base_latency``, long tail set by ``sigma``). A
+    ``failure_rate`` share of calls raise ``GeminiError`` after waiting, the
+    way a call fails once the service has given up retrying.
+    """
+
+    def __init__(self, base_latency: float, per_1k_tokens: float = 0.0, distribution: str = "fixed",
+                 sigma: float = 0.5, failure_rate: float = 0.0, findings_per_file: int = 1,
+                 seed: Optional[int] = None):
+        self.base_latency = base_latency
+        self.per_1k_tokens = per_1k_tokens
+        self.distribution = distribution
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.findings_per_file = findings_per_file
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+
+    def install(self):
+        """Route every GeminiService.generate_review call through this model"""
+        async def generate_review(service: GeminiService, system_prompt: str, user_prompt: str):
+            return await self.generate_review(system_prompt, user_prompt)
+        GeminiService.generate_review = generate_review
+
+    def latency(self, tokens: int) -> float:
+        if self.distribution == "lognormal":
+            base = self.random.lognormvariate(0, self.sigma) * self.base_latency
+        elif self.distribution == "uniform":
+            base = self.random.uniform(0, 2 * self.base_latency)
+        else:
+            base = self.base_latency
+        return base + self.per_1k_tokens * tokens / 1000
+
+    async def generate_review(self, system_prompt: str, user_prompt: str) -> str:
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        self.calls += 1
+        self.prompt_tokens += tokens
+        await asyncio.sleep(self.latency(tokens))
+
+        if self.random.random() < self.failure_rate:
+            self.failures += 1
+            raise GeminiError("Gemini request failed: injected failure")
+        return self.respond(system_prompt, user_prompt)
+
+    def respond(self, system_prompt: str, user_prompt: str) -> str:
+        """JSON findings for each file in the prompt, on the first line of its first hunk"""
+        findings = []
+        matches = list(_PROMPT_FILE.finditer(user_prompt))
+        for index, match in enumerate(matches):
+            end = matches[index + 1].start() if index + 1 < len(matches) else len(user_prompt)
+            hunk = _HUNK_START.search(user_prompt, match.end(), end)
+            line = int(hunk.group(1)) if hunk else None
+            for _ in range(self.findings_per_file):
+                severity, description, suggestion = self.random.choice(_FINDINGS)
+                findings.append({
+                    "file": match.group("path"),
+                    "line": line,
+                    "severity": severity,
+                    "description": description,
+                    "suggestion": suggestion
+                })
+        return json.dumps({"findings": findings})
+
+class FakeGitHubService:
+    """Fake GitHubService serving synthetic PRs and counting API calls"""
+
+    def __init__(self, pull_requests: Dict[tuple, Dict[str, Any]], latency: float = 0.0):
+        self.pull_requests = pull_requests  # (full_name, number) -> PR data with files
+        self.latency = latency
+        self.calls = 0
+        self.comments_posted = 0
+
+    async def get_pull_request(self, owner: str, repo: str, pr_number: int,
+                               include_files: bool = True) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        # Callers overwrite "files", so hand out a copy
+        pr_data = dict(self.pull_requests[(f"{owner}/{repo}", pr_number)])
+        if not include_files:
+            del pr_data["files"]
+        return pr_data
+
+    async def iter_pull_request_files(self, owner: str, repo: str, pr_number: int):
+        """Yield the files a page at a time, one call per page"""
+        files = self.pull_requests[(f"{owner}/{repo}", pr_number)]["files"]
+        for start in range(0, len(files), settings.github_per_page):
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+            for file_data in files[start:start + settings.github_per_page]:
+                yield file_data
+
+    async def post_review_comment(self, owner: str, repo: str, pr_number: int,
+                                  file_path: str, line_number: int, comment: str):
+        self.calls += 1
+        self.comments_posted += 1
+        await asyncio.sleep(self.latency)
+
+    async def post_comment(self, owner: str, repo: str, pr_number: int, comment: str):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def create_review(self, owner: str, repo: str, pr_number: int, comments: List[Dict[str, Any]],
+                            body: str = "", commit_id: Optional[str] = None) -> Dict[str, int]:
+        requests = 0 if commit_id else 1
+        requests += max(1, -(-len(comments) // settings.github_review_max_comments))
+        self.calls += requests
+        self.comments_posted += len(comments)
+        await asyncio.sleep(self.latency * requests)
+        return {'requests': requests, 'comments_posted': len(comments)}
+
+def pull_request_object(full_name: str, pr_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The pull request object GitHub returns from the API and sends in webhooks"""
+    owner, name = full_name.split("/")
+    repo_id = zlib.crc32(full_name.encode())
+    return {
+        "id": repo_id * 100000 + pr_data["number"],
+        "number": pr_data["number"],
+        "title": pr_data["title"],
+        "body": pr_data["body"],
+        "state": pr_data["state"],
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "head": pr_data["head"],
+        "user": {"login": "bench", "id": 1, "avatar_url": ""},
+        "base": {"repo": {"id": repo_id, "name": name, "full_name": full_name,
+                          "owner": {"login": owner, "id": 1}}}
+    }
+
+class FakeGitHubAPI:
+    """In-process fake of the GitHub REST endpoints GitHubService uses.
+
+    Serves the synthetic PRs with Link-header pagination, rate-limit
+    headers and ETags (a matching If-None-Match gets a 304 that, as on
+    GitHub, does not count against the limit), so the real client, its
+    pagination, response cache and rate-limit handling run against it. Plug it in with ``GitHubService(client=api.client(),
+    base_url=api.base_url)``.
+    """
+
+    base_url = "http://github.test"
+
+    _ROUTE = re.compile(r"^/repos/(?P<full_name>[^/]+/[^/]+)/(?P<rest>.+)$")
+
+    def __init__(self, pull_requests: Dict[tuple, Dict[str, Any]], latency: float = 0.0,
+                 rate_limit: int = 5000):
+        self.pull_requests = pull_requests  # (full_name, number) -> PR data with files
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset = time.time() + 3600
+        self.calls = 0
+        self.not_modified = 0
+        self.comments_posted = 0
+        self.requests: List[str] = []  # "METHOD path" of every request
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def _json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        headers = {
+            "x-ratelimit-limit": str(self.rate_limit),
+            "x-ratelimit-remaining": str(self.remaining),
+            "x-ratelimit-reset": str(int(self.reset)),
+            **(headers or {})
+        }
+        if body is None:
+            return httpx.Response(status, headers=headers)
+        return httpx.Response(status, json=body, headers=headers)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.requests.append(f"{request.method} {request.url.path}")
+        await asyncio.sleep(self.latency)
+        response = self._route(request)
+        if request.method == "GET" and response.status_code == 200:
+            etag = f'"{hashlib.sha1(response.content).hexdigest()}"'
+            if request.headers.get("if-none-match") == etag:
+                self.not_modified += 1
+                return self._json(304, None, {"etag": etag})
+            response.headers["etag"] = etag
+        # Only requests answered with content use up the rate limit
+        self.remaining = max(0, self.remaining - 1)
+        response.headers["x-ratelimit-remaining"] = str(self.remaining)
+        return response
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        match = self._ROUTE.match(request.url.path)
+        if not match:
+            return self._json(404, {"message": "Not Found"})
+        full_name, rest = match.group("full_name"), match.group("rest")
+        parts = rest.split("/")
+
+        if request.method == "POST" and parts[0] == "hooks":
+            hook_id = self.calls
+            return self._json(201, {
+                "id": hook_id,
+                "url": f"{self.base_url}/repos/{full_name}/hooks/{hook_id}",
+                "events": json.loads(request.content)["events"],
+                "active": True
+            })
+        if request.method == "DELETE" and parts[0] == "hooks":
+            return self._json(204, None)
+
+        pr_data = self.pull_requests.get((full_name, int(parts[1]))) if len(parts) > 1 and parts[1].isdigit() else None
+        if pr_data is None:
+            return self._json(404, {"message": "Not Found"})
+
+        if request.method == "GET" and parts[0] == "pulls" and len(parts) == 2:
+            return self._json(200, pull_request_object(full_name, pr_data))
+        if request.method == "GET" and parts[0] == "pulls" and parts[2:] == ["files"]:
+            return self._files_page(request, pr_data["files"])
+        if request.method == "POST" and parts[0] == "pulls" and parts[2:] == ["reviews"]:
+            self.comments_posted += len(json.loads(request.content).get("comments", []))
+            return self._json(200, {"id": self.calls, "state": "COMMENTED"})
+        if request.method == "POST" and parts[2:] == ["comments"]:
+            if parts[0] == "pulls":
+                self.comments_posted += 1
+            return self._json(201, {"id": self.calls, "body": json.loads(request.content)["body"]})
+        return self._json(404, {"message": "Not Found"})
+
+    def _files_page(self, request: httpx.Request, files: List[Dict[str, Any]]) -> httpx.Response:
+        per_page = int(request.url.params.get("per_page", 30))
+        page = int(request.url.params.get("page", 1))
+        last_page = max(1, -(-len(files) // per_page))
+        headers = {}
+        if last_page > 1:
+            url = request.url.copy_remove_param("page")
+            links = []
+            if page < last_page:
+                links.append(f'<{url.copy_add_param("page", page + 1)}>; rel="next"')
+            links.append(f'<{url.copy_add_param("page", last_page)}>; rel="last"')
+            headers["link"] = ", ".join(links)
+        return self._json(200, files[(page - 1) * per_page:page * per_page], headers)
+
+# Added lines per language; some carry the signals static triage routes on
+_CODE = {
+    "py": [
+        "value = compute(item)",
+        "for row in rows:",
+        "    cursor.execute(\"SELECT * FROM users WHERE id = \" + row.id)",
+        "    results.append(transform(row))",
+        "password = os.environ.get(\"DB_PASSWORD\")",
+        "return {\"status\": status, \"count\": len(results)}",
+        "# Keep the cache warm between requests",
+    ],
+    "js": [
+        "const value = compute(item);",
+        "for (const row of rows) {",
+        "  await fetch(`/api/users/${row.id}`);",
+        "}",
+        "element.innerHTML = userInput;",
+        "return { status, count: results.length };",
+        "// Keep the cache warm between requests",
+    ],
+    "go": [
+        "value := compute(item)",
+        "for _, row := range rows {",
+        "\tdb.Query(\"SELECT * FROM users WHERE id = \" + row.ID)",
+        "}",
+        "token := os.Getenv(\"API_TOKEN\")",
+        "return results, nil",
+        "// Keep the cache warm between requests",
+    ],
+}
+
+# files, hunks per file, added lines per hunk, languages, share of files the classifier skips
+SHAPES = {
+    "small": {"files": 3, "hunks": 1, "lines": 8, "languages": ["py"], "skipped": 0.0},
+    "wide": {"files": 60, "hunks": 1, "lines": 4, "languages": ["py", "js", "go"], "skipped": 0.1},
+    "large": {"files": 4, "hunks": 12, "lines": 60, "languages": ["py", "go"], "skipped": 0.0},
+    "mixed": {"files": 20, "hunks": 3, "lines": 12, "languages": ["py", "js", "go"], "skipped": 0.2},
+}
+
+def make_patch(language: str, hunks: int, lines: int, rng: random.Random) -> str:
+    """A patch of ``hunks`` hunks, each adding ``lines`` lines around one context line"""
+    parts = []
+    start = 1
+    for _ in range(hunks):
+        body = [" def handler(request):"]
+        body += ["+" + rng.choice(_CODE[language]) for _ in range(lines)]
+        parts.append(f"@@ -{start},1 +{start},{lines + 1} @@\n" + "\n".join(body))
+        start += lines + 20
+    return "\n".join(parts)
+
+def make_pull_request(full_name: str, number: int, shape: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """Synthetic PR data in the shape GitHubService.get_pull_request returns"""
+    files: List[Dict[str, Any]] = []
+    for index in range(shape["files"]):
+        if rng.random() < shape["skipped"]:
+            # Lockfiles and vendored code the classifier should drop
+            path = rng.choice(["package-lock.json", f"vendor/lib_{index}/util.go", f"dist/bundle_{index}.min.js"])
+            patch = make_patch("js", 1, shape["lines"], rng)
+        else:
+            language = rng.choice(shape["languages"])
+            path = f"src/pkg_{index % 7}/module_{index}.{language}"
+            patch = make_patch(language, shape["hunks"], shape["lines"], rng)
+        additions = patch.count("\n+")
+        files.append({
+            'filename': path,
+            'status': 'modified',
+            'additions': additions,
+            'deletions': 0,
+            'changes': additions,
+            'sha': f"{number:08x}{index:08x}",
+            'patch': patch
+        })
+
+    return {
+        'number': number,
+        'title': f"Synthetic PR {number}",
+        'body': '',
+        'state': 'open',
+        'head': {'sha': f"head{number:036x}", 'ref': f"bench-{number}"},
+        'repository': {'full_name': full_name},
+        'files': files
+    }
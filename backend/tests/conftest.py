@@ -0,0 +1,12 @@
+import os
+
+# Settings the app requires at import time; tests never reach these services
+for name in (
+    "POSTGRES_URL", "POSTGRES_USER", "POSTGRES_HOST", "POSTGRES_PASSWORD", "POSTGRES_DATABASE",
+    "POSTGRES_PRISMA_URL", "POSTGRES_URL_NON_POOLING", "SECRET_KEY", "SUPABASE_URL",
+    "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_JWT_SECRET",
+    "NEXT_PUBLIC_SUPABASE_URL", "NEXT_PUBLIC_SUPABASE_ANON_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REVIEW_QUEUE_BACKEND", "memory")
@@ -0,0 +1,34 @@
+from app.agents.dedup import FindingDeduplicator, history_entries
+
+def finding(agent_name, file_path, line_number, context_hash, description="SQL injection: query built from user input"):
+    return {'agent_name': agent_name, 'file_path': file_path, 'line_number': line_number,
+            'context_hash': context_hash, 'description': description, 'severity': 'high'}
+
+def test_collapsed_finding_keeps_a_history_key_per_location():
+    findings = FindingDeduplicator(threshold=0.5).deduplicate([
+        finding('security', 'app/users.py', 10, 'ctx-users'),
+        finding('security', 'app/orders.py', 42, 'ctx-orders'),
+        finding('bug', 'app/users.py', 10, 'ctx-users'),
+    ])
+
+    assert len(findings) == 1
+    entries = history_entries(findings[0])
+    assert sorted((entry['file_path'], entry['context_hash']) for entry in entries) == [
+        ('app/orders.py', 'ctx-orders'), ('app/users.py', 'ctx-users')
+    ]
+
+def test_non_representative_location_matches_its_own_later_finding():
+    collapsed = FindingDeduplicator().deduplicate([
+        finding('security', 'app/users.py', 10, 'ctx-users'),
+        finding('security', 'app/orders.py', 42, 'ctx-orders'),
+    ])[0]
+    # A later review that only touches orders.py reports the finding on its own
+    alone = FindingDeduplicator().deduplicate([finding('security', 'app/orders.py', 42, 'ctx-orders')])[0]
+
+    keys = {(entry['fingerprint'], entry['context_hash']) for entry in history_entries(collapsed)}
+    assert (alone['fingerprint'], alone['context_hash']) in keys
+
+def test_history_entries_skip_locations_without_keys():
+    stored = {'fingerprint': 'f1', 'context_hash': 'c1', 'file_path': 'a.py',
+              'locations': [{'file_path': 'a.py', 'line_number': 1}, {'file_path': 'b.py', 'line_number': 2}]}
+    assert history_entries(stored) == [{'fingerprint': 'f1', 'context_hash': 'c1', 'file_path': 'a.py'}]
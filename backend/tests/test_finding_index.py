@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import FindingRecord
+from app.models.finding import FindingState
+from app.services.finding_index import FindingIndex
+
+KEY = ('sql injection in query', 'ctx1')
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    yield factory
+    engine.dispose()
+
+def finding(key=KEY, file_path='app/db.py'):
+    return {'fingerprint': key[0], 'context_hash': key[1], 'file_path': file_path}
+
+def test_record_posted_merges_key_written_after_filter_loaded(sessions):
+    index = FindingIndex(refresh_seconds=300)
+    db = sessions()
+    assert index.lookup(db, 1, [KEY]) == {}  # Filter loaded empty
+
+    other = sessions()
+    FindingIndex().record_posted(other, 1, 7, [finding(file_path='app/old.py')], {})
+    other.commit()
+
+    index.record_posted(db, 1, 8, [finding()], {})
+    db.commit()
+
+    records = db.query(FindingRecord).all()
+    assert len(records) == 1
+    assert records[0].occurrences == 2
+    assert records[0].review_id == 8
+    assert records[0].file_path == 'app/db.py'
+
+def test_insert_merges_into_concurrent_row(sessions):
+    db = sessions()
+    db.query(FindingRecord).all()  # Open the transaction before the other worker commits
+
+    other = sessions()
+    other.add(FindingRecord(repository_id=1, fingerprint=KEY[0], context_hash=KEY[1],
+                            occurrences=3, state=FindingState.RESOLVED))
+    other.commit()
+
+    record = FindingIndex()._insert(db, 1, KEY)
+    record.occurrences += 1
+    db.commit()
+
+    assert db.query(FindingRecord).count() == 1
+    assert db.query(FindingRecord).one().occurrences == 4
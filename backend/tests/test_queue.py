@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.services.queue import InMemoryQueueBackend, ReviewQueue
+
+def make_queue(**kwargs) -> ReviewQueue:
+    options = {'max_attempts': 2, 'visibility_timeout': 60, 'retry_backoff': 0, 'shard_count': 4}
+    options.update(kwargs)
+    return ReviewQueue(backend=InMemoryQueueBackend(), **options)
+
+PAYLOAD = {'repository': {'id': 42}, 'number': 1}
+
+@pytest.mark.asyncio
+async def test_duplicate_job_id_is_not_queued_twice():
+    queue = make_queue()
+    assert await queue.enqueue('pull_request', PAYLOAD, job_id='delivery-1') is not None
+    assert await queue.enqueue('pull_request', PAYLOAD, job_id='delivery-1') is None
+    assert (await queue.stats())['queued'] == 1
+
+@pytest.mark.asyncio
+async def test_null_repository_is_queued():
+    queue = make_queue()
+    job = await queue.enqueue('ping', {'repository': None})
+    assert job is not None
+    assert (await queue.reserve()).id == job.id
+
+@pytest.mark.asyncio
+async def test_unacked_job_is_redelivered_after_visibility_timeout():
+    queue = make_queue(visibility_timeout=0.05)
+    job = await queue.enqueue('pull_request', PAYLOAD)
+
+    first = await queue.reserve()
+    assert first.id == job.id and first.attempts == 1
+    assert await queue.reserve() is None  # Invisible while in flight
+
+    await asyncio.sleep(0.1)
+    second = await queue.reserve()
+    assert second.id == job.id and second.attempts == 2
+
+    await queue.ack(second)
+    assert await queue.stats() == {'queued': 0, 'in_flight': 0, 'dead': 0}
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_job_invisible():
+    queue = make_queue(visibility_timeout=0.1)
+    await queue.enqueue('pull_request', PAYLOAD)
+    job = await queue.reserve()
+
+    await asyncio.sleep(0.06)
+    await queue.heartbeat(job)
+    await asyncio.sleep(0.06)
+    assert await queue.reserve() is None
+
+@pytest.mark.asyncio
+async def test_failing_job_is_dead_lettered_after_max_attempts():
+    queue = make_queue()
+    job = await queue.enqueue('pull_request', PAYLOAD)
+
+    await queue.fail(await queue.reserve(), 'boom')
+    retried = await queue.reserve()
+    assert retried.id == job.id and retried.attempts == 2
+    await queue.fail(retried, 'boom again')
+
+    assert await queue.reserve() is None
+    dead = await queue.dead_letters()
+    assert [(dead_job.id, dead_job.last_error) for dead_job in dead] == [(job.id, 'boom again')]
+    assert await queue.stats() == {'queued': 0, 'in_flight': 0, 'dead': 1}
+
+@pytest.mark.asyncio
+async def test_job_expiring_too_often_is_dead_lettered():
+    queue = make_queue(visibility_timeout=0.02)
+    job = await queue.enqueue('pull_request', PAYLOAD)
+    for _ in range(2):
+        assert await queue.reserve() is not None
+        await asyncio.sleep(0.05)
+
+    assert await queue.reserve() is None
+    dead = await queue.dead_letters()
+    assert [(dead_job.id, dead_job.last_error) for dead_job in dead] == [(job.id, 'Visibility timeout exceeded')]
+
+@pytest.mark.asyncio
+async def test_release_returns_job_without_using_an_attempt():
+    queue = make_queue()
+    job = await queue.enqueue('pull_request', PAYLOAD)
+
+    await queue.release(await queue.reserve())
+    again = await queue.reserve()
+    assert again.id == job.id and again.attempts == 1
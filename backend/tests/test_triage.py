@@ -0,0 +1,58 @@
+import pytest
+
+from app.agents.triage import StaticTriage
+
+EXTENSIONS = {'python': 'py', 'javascript': 'js', 'go': 'go', 'yaml': 'yml'}
+
+def route(language, removed, added):
+    patch = f"@@ -1,{len(removed)} +1,{len(added)} @@\n" + "\n".join(
+        ['-' + line for line in removed] + ['+' + line for line in added]
+    )
+    return StaticTriage().route(f"src/change.{EXTENSIONS[language]}", language, patch)
+
+@pytest.mark.parametrize("language, removed, added", [
+    ('python', ['x = foo(a,b)'], ['x = foo(a, b)']),
+    ('python', ['if x:', '        y()'], ['if x:', '    y()']),
+    ('javascript', ['const a=b+c;'], ['const a = b + c;']),
+    ('go', ['if x {'], ['if x{']),
+])
+def test_whitespace_between_tokens_is_insignificant(language, removed, added):
+    decision = route(language, removed, added)
+    assert decision.agents == set()
+    assert decision.reasons['style'] == 'whitespace-only change'
+
+@pytest.mark.parametrize("language, removed, added", [
+    # Whitespace inside string literals
+    ('python', ['os.system("rm -rf /tmp/x")'], ['os.system("rm -rf / tmp/x")']),
+    ('python', ['q = "DELETE FROM t WHERE id = 1"'], ['q = "DELETE FROM tWHERE id = 1"']),
+    ('go', ['x := "a b"'], ['x := "ab"']),
+    # Tokens merged or split
+    ('python', ['return x'], ['returnx']),
+    # Line joins and splits; ASI makes "return\nx;" return undefined
+    ('javascript', ['return', 'x;'], ['return x;']),
+    ('python', ['x = 1', 'y = 2'], ['x = 1; y = 2']),
+    # Indentation that changes structure
+    ('python', ['if x:', '    y()', 'z()'], ['if x:', '    y()', '    z()']),
+    ('yaml', ['a:', '  b: 1'], ['a:', 'b: 1']),
+])
+def test_significant_whitespace_is_reviewed(language, removed, added):
+    decision = route(language, removed, added)
+    assert decision.wants('style')
+    assert decision.reasons['style'] == 'code change'
+
+def test_string_whitespace_change_keeps_security_pass():
+    decision = route('python', ['os.system("rm -rf /tmp/x")'], ['os.system("rm -rf / tmp/x")'])
+    assert decision.wants('security')
+
+@pytest.mark.parametrize("language, removed, added", [
+    ('python', ['x = 1'], ['x = 1  # note']),
+    ('javascript', ['const a = b;'], ['// explain', 'const a = b;']),
+])
+def test_comment_only_change_goes_to_style(language, removed, added):
+    decision = route(language, removed, added)
+    assert decision.agents == {'style'}
+    assert decision.reasons['security'] == 'comment-only change'
+
+def test_comment_check_keeps_tokens_apart():
+    decision = route('javascript', ['// old', 'return x;'], ['// new', 'returnx;'])
+    assert decision.reasons['style'] == 'code change'